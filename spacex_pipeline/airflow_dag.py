@@ -0,0 +1,24 @@
+# Граф пайплайна как DAG Airflow: файл кладётся (или линкуется) в каталог dags.
+# Задачи те же, что у `python pipeline.py --dag`; каждая открывает своё соединение с БД.
+# Снимки передаются между задачами через зону приземления, поэтому SPACEX_LANDING_DIR должен быть общим для воркеров.
+# Параметры берутся из окружения с теми же значениями по умолчанию, что у pipeline.py (SPACEX_INCREMENTAL=1 - аналог --incremental).
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from pipeline import build_graph
+from taskgraph import to_airflow_dag
+
+dag = to_airflow_dag(
+    build_graph(
+        load_mode=os.getenv("SPACEX_LOAD_MODE", "bulk"),
+        incremental=os.getenv("SPACEX_INCREMENTAL", "0") == "1",
+        engine=os.getenv("SPACEX_TRANSFORM_ENGINE", "sql"),
+    ),
+    dag_id="spacex_pipeline",
+    schedule=os.getenv("SPACEX_DAG_SCHEDULE", "@daily"),
+    start_date=datetime(2025, 1, 1),
+    catchup=False,
+)
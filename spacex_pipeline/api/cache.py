@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.getenv("SPACEX_CACHE_DIR", os.path.join(PIPELINE_DIR, "cache", "http"))
+CACHE_TTL = float(os.getenv("SPACEX_CACHE_TTL", "3600"))
+CACHE_MAX_BYTES = int(os.getenv("SPACEX_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class ResponseCache:
+    # Тело ответа хранится уже разобранным (pickle), поэтому попадание в кэш не требует json-парсинга.
+    # Метаданные (ETag, Last-Modified, время записи/доступа, размер) - в index.json.
+
+    def __init__(self, directory=CACHE_DIR, ttl=CACHE_TTL, max_bytes=CACHE_MAX_BYTES, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, "index.json")
+        self._index = self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self):
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self._index_path)
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def lookup(self, url):
+        with self._lock:
+            meta = self._index.get(self.key(url))
+            return dict(meta) if meta else None
+
+    def is_fresh(self, meta):
+        return meta is not None and time.time() - meta["stored_at"] < self.ttl
+
+    def conditional_headers(self, meta):
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, url, revalidated=False):
+        key = self.key(url)
+        try:
+            with open(self._body_path(key), "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self._index.pop(key, None)
+                self._write_index()
+            return None
+
+        with self._lock:
+            meta = self._index.get(key)
+            if meta:
+                meta["last_access"] = time.time()
+                if revalidated:
+                    meta["stored_at"] = meta["last_access"]
+                    self.revalidated += 1
+                self._write_index()
+            self.hits += 1
+        return data
+
+    def store(self, url, data, etag=None, last_modified=None):
+        key = self.key(url)
+        path = self._body_path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+        now = time.time()
+        with self._lock:
+            self._index[key] = {
+                "url": url, "etag": etag, "last_modified": last_modified,
+                "stored_at": now, "last_access": now, "size": os.path.getsize(path),
+            }
+            self.misses += 1
+            self._evict()
+            self._write_index()
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def _evict(self):
+        now = time.time()
+        # Устаревшие записи без валидаторов нельзя перепроверить условным запросом - удаляем сразу
+        for key, meta in list(self._index.items()):
+            if now - meta["stored_at"] >= self.ttl and not (meta.get("etag") or meta.get("last_modified")):
+                self._remove(key)
+
+        total = sum(meta["size"] for meta in self._index.values())
+        for key, meta in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= meta["size"]
+            self._remove(key)
+
+    def _remove(self, key):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._body_path(key))
+        except OSError:
+            pass
+        logger.info(f"Запись кэша {key[:12]} удалена.")
+
+    def log_stats(self):
+        logger.info(
+            f"HTTP-кэш: попаданий {self.hits} (из них перепроверено {self.revalidated}), "
+            f"промахов {self.misses}."
+        )
@@ -1,31 +1,136 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
+import os
+import random
+import time
+from metrics import stage, record
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-def fetch_data():
-    urls = {
-        "launches": "https://api.spacexdata.com/v4/launches",
-        "rockets": "https://api.spacexdata.com/v4/rockets",
-        "payloads": "https://api.spacexdata.com/v4/payloads"
-    }
+API_BASE_URL = os.getenv("SPACEX_API_URL", "https://api.spacexdata.com/v4")
+ENDPOINTS = ("launches", "rockets", "payloads")
 
-    results = {}
+FETCH_TIMEOUT = float(os.getenv("SPACEX_FETCH_TIMEOUT", "30"))
+FETCH_RETRIES = int(os.getenv("SPACEX_FETCH_RETRIES", "3"))
+FETCH_BACKOFF = float(os.getenv("SPACEX_FETCH_BACKOFF", "0.5"))
+FETCH_BACKOFF_MAX = float(os.getenv("SPACEX_FETCH_BACKOFF_MAX", "10"))
+FETCH_CONCURRENCY = int(os.getenv("SPACEX_FETCH_CONCURRENCY", "3"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def create_session(pool_size=FETCH_CONCURRENCY):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept": "application/json", "Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def backoff_delay(attempt, base=FETCH_BACKOFF, cap=FETCH_BACKOFF_MAX):
+    # "full jitter": случайная пауза в пределах экспоненциально растущего окна
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def fetch_endpoint(session, name, url, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, cache=None):
+    started = time.perf_counter()
+    stats = {"url": url, "attempts": 0, "status": None, "latency": None, "cache": None, "bytes": 0}
+    data = None
+
+    meta = cache.lookup(url) if cache is not None else None
+    if cache is not None and (cache.offline or cache.is_fresh(meta)):
+        data = cache.load(url) if meta else None
+        if data is None and cache.offline:
+            cache.record_miss()
+        stats["cache"] = "hit" if data is not None else "miss"
+        if data is not None:
+            logger.info(f"Данные [{name}] взяты из кэша.")
+        elif cache.offline:
+            logger.error(f"Офлайн-режим: в кэше нет данных [{name}].")
+        if data is not None or cache.offline:
+            stats["latency"] = time.perf_counter() - started
+            return data, stats
 
-    for name, url in urls.items():
+    for attempt in range(retries + 1):
+        stats["attempts"] = attempt + 1
+        headers = cache.conditional_headers(meta) if cache is not None else {}
         try:
-            response = requests.get(url)
-            logger.info(f"Попытка отправить запрос [{name}]. . .")
+            logger.info(f"Попытка отправить запрос [{name}] ({attempt + 1}/{retries + 1}). . .")
+            response = session.get(url, timeout=timeout, headers=headers)
+            # 304 - успешный ответ, а не временная ошибка: он не расходует попытку и не ждёт паузы
+            if response.status_code == 304:
+                data = cache.load(url, revalidated=True) if cache is not None and meta is not None else None
+                if data is not None:
+                    stats["status"] = response.status_code
+                    logger.info(f"Данные [{name}] не изменились (304), взяты из кэша.")
+                    stats["cache"] = "revalidated"
+                    break
+                # тело пропало с диска - сразу повторяем безусловным запросом в рамках той же попытки
+                logger.warning(f"Тело [{name}] отсутствует в кэше, запрос без условных заголовков.")
+                meta = None
+                response = session.get(url, timeout=timeout)
+            stats["status"] = response.status_code
             if response.status_code == 200:
                 logger.info(f"Успешно. Код ответа [{name}]: {response.status_code}")
-                results[name] = response.json()
-            else:
+                data = response.json()
+                stats["bytes"] = len(response.content)
+                if cache is not None:
+                    cache.store(url, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                    stats["cache"] = "miss"
+                break
+            if response.status_code not in RETRY_STATUSES:
                 logger.error(f"Ошибка при получении данных [{name}]: {response.status_code}")
-                results[name] = None
-        except requests.RequestException as e:
-            logger.error(f"Ошибка сети при получении данных [{name}]: {e}")
-            results[name] = None
-    
-    return results.get("launches"), results.get("rockets"), results.get("payloads")
\ No newline at end of file
+                break
+            logger.warning(f"Временная ошибка при получении данных [{name}]: {response.status_code}")
+        except (requests.RequestException, json.JSONDecodeError) as e:
+            logger.warning(f"Ошибка сети при получении данных [{name}]: {e}")
+
+        if attempt < retries:
+            time.sleep(backoff_delay(attempt, backoff))
+    else:
+        logger.error(f"Исчерпаны попытки получения данных [{name}].")
+
+    stats["latency"] = time.perf_counter() - started
+    logger.info(f"Время получения [{name}]: {stats['latency']:.3f} с, попыток: {stats['attempts']}")
+    return data, stats
+
+
+def fetch_data(base_url=None, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES,
+               backoff=FETCH_BACKOFF, concurrency=FETCH_CONCURRENCY, session=None, stats=None, cache=None,
+               endpoints=ENDPOINTS):
+    # endpoints - подмножество ENDPOINTS; для не запрошенных сущностей возвращается None
+    base_url = (base_url or API_BASE_URL).rstrip("/")
+    urls = {name: f"{base_url}/{name}" for name in endpoints}
+    concurrency = max(1, min(concurrency, len(urls)))
+
+    own_session = session is None
+    if own_session:
+        session = create_session(concurrency)
+
+    results = {}
+    try:
+        with stage("fetch_data"), ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="fetch") as pool:
+            futures = {
+                name: pool.submit(fetch_endpoint, session, name, url, timeout, retries, backoff, cache)
+                for name, url in urls.items()
+            }
+            for name, future in futures.items():
+                results[name], endpoint_stats = future.result()
+                record(
+                    rows=len(results[name] or []), bytes=endpoint_stats["bytes"],
+                    retries=max(0, endpoint_stats["attempts"] - 1)
+                )
+                if stats is not None:
+                    stats[name] = endpoint_stats
+    finally:
+        if own_session:
+            session.close()
+        if cache is not None:
+            cache.log_stats()
+
+    return results.get("launches"), results.get("rockets"), results.get("payloads")
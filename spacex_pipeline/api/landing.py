@@ -0,0 +1,240 @@
+import gzip
+import json
+import logging
+import mmap
+import os
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LANDING_DIR = os.getenv("SPACEX_LANDING_DIR", os.path.join(PIPELINE_DIR, "landing"))
+LANDING_FORMATS = ("ndjson", "parquet")
+REPLAY_BATCH_SIZE = int(os.getenv("SPACEX_REPLAY_BATCH_SIZE", "5000"))
+PARQUET_ROW_GROUP_SIZE = 10000
+
+SUFFIXES = {"ndjson": ".ndjson.gz", "parquet": ".parquet"}
+JSON_COLUMNS_KEY = b"spacex.json_columns"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Для формата parquet требуется пакет pyarrow (pip install pyarrow или pip install -r requirements-optional.txt).") from e
+    return pyarrow, pyarrow.parquet
+
+
+def partition_dir(entity, run_at, directory=LANDING_DIR):
+    return os.path.join(directory, entity, f"dt={run_at:%Y-%m-%d}")
+
+
+class SnapshotWriter:
+    # Снимок пишется во временный файл и переименовывается только после полной записи,
+    # поэтому прерванная выгрузка не оставляет в зоне приземления обрезанных файлов.
+
+    def __init__(self, entity, run_at=None, directory=LANDING_DIR, fmt="ndjson"):
+        if fmt not in LANDING_FORMATS:
+            raise ValueError(f"Неизвестный формат снимка: {fmt}")
+        run_at = run_at or datetime.now(timezone.utc)
+        self.entity = entity
+        self.fmt = fmt
+        self.count = 0
+        target_dir = partition_dir(entity, run_at, directory)
+        os.makedirs(target_dir, exist_ok=True)
+        self.path = os.path.join(target_dir, f"{entity}-{run_at:%H%M%S%f}{SUFFIXES[fmt]}")
+        self._tmp = f"{self.path}.tmp"
+        # Parquet: схема колонок выводится по всему снимку, поэтому записи сначала пишутся в промежуточный
+        # NDJSON на диске, а в close() перекладываются в Parquet по группам строк - в памяти не весь снимок
+        self._spool = f"{self.path}.spool.tmp" if fmt == "parquet" else None
+        if self._spool is None:
+            self._file = gzip.open(self._tmp, "wt", encoding="utf-8", compresslevel=6)
+        else:
+            self._file = open(self._spool, "w", encoding="utf-8")
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+            self._file.write("\n")
+            self.count += 1
+
+    def close(self):
+        self._file.close()
+        if self._spool is not None:
+            try:
+                _write_parquet(self._tmp, self._spool)
+            finally:
+                os.remove(self._spool)
+        os.replace(self._tmp, self.path)
+        logger.info(f"[{self.entity}] снимок сохранён: {self.path} ({self.count} записей).")
+        return self.path
+
+    def abort(self):
+        self._file.close()
+        for path in (self._tmp, self._spool):
+            if path and os.path.exists(path):
+                os.remove(path)
+        logger.warning(f"[{self.entity}] выгрузка прервана, снимок не сохранён.")
+
+
+def _column_array(pa, values):
+    # Вложенные объекты, а также колонки со смешанными типами (int/float, bool/int) хранятся как JSON-строки,
+    # чтобы при воспроизведении записи совпадали с ответом API байт в байт после json.dumps
+    if any(isinstance(v, (dict, list)) for v in values):
+        return None
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+    if pa.types.is_floating(array.type) and any(isinstance(v, int) for v in values):
+        return None
+    if pa.types.is_null(array.type):
+        return None
+    return array
+
+
+def _parquet_schema(pa, spool):
+    # Первый проход по промежуточному файлу: тип колонки - общий тип её непустых значений во всех группах
+    # строк; колонка со вложенными объектами, разными типами по группам или без значений хранится как JSON
+    seen = {}
+    for group in _batched(_iter_ndjson(spool), PARQUET_ROW_GROUP_SIZE):
+        for column in dict.fromkeys(key for record in group for key in record):
+            types = seen.setdefault(column, set())
+            values = [record.get(column) for record in group]
+            if all(v is None for v in values):
+                continue
+            array = _column_array(pa, values)
+            types.add(None if array is None else array.type)
+    fields, json_columns = [], []
+    for column, types in seen.items():
+        if len(types) == 1 and None not in types:
+            fields.append(pa.field(column, types.pop()))
+        else:
+            json_columns.append(column)
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields, metadata={JSON_COLUMNS_KEY: json.dumps(json_columns).encode()}), set(json_columns)
+
+
+def _write_parquet(path, spool):
+    pa, pq = _require_pyarrow()
+    schema, json_columns = _parquet_schema(pa, spool)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for group in _batched(_iter_ndjson(spool), PARQUET_ROW_GROUP_SIZE):
+            arrays = []
+            for field in schema:
+                values = [record.get(field.name) for record in group]
+                if field.name in json_columns:
+                    values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def write_snapshot(entity, records, run_at=None, directory=LANDING_DIR, fmt="ndjson"):
+    writer = SnapshotWriter(entity, run_at, directory, fmt)
+    try:
+        writer.write(records)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def land_pages(pages, writer):
+    # Пропускает страницы к загрузчику и параллельно дописывает их в снимок
+    try:
+        for page in pages:
+            writer.write(page)
+            yield page
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def land_sources(sources, run_at=None, directory=LANDING_DIR, fmt="ndjson"):
+    # Все сущности одного прогона получают общую метку времени
+    run_at = run_at or datetime.now(timezone.utc)
+    landed = {}
+    for entity, batches in sources.items():
+        if isinstance(batches, list):
+            write_snapshot(entity, (record for batch in batches for record in batch), run_at, directory, fmt)
+            landed[entity] = batches
+        else:
+            landed[entity] = land_pages(batches, SnapshotWriter(entity, run_at, directory, fmt))
+    return landed
+
+
+def find_snapshot(entity, date=None, directory=LANDING_DIR):
+    # date - "YYYY-MM-DD" или None/"latest" для самого свежего раздела; внутри раздела берётся последний снимок
+    entity_dir = os.path.join(directory, entity)
+    try:
+        partitions = sorted(p for p in os.listdir(entity_dir) if p.startswith("dt="))
+    except FileNotFoundError:
+        partitions = []
+    if date and date != "latest":
+        partitions = [p for p in partitions if p == f"dt={date}"]
+    for partition in reversed(partitions):
+        files = sorted(
+            f for f in os.listdir(os.path.join(entity_dir, partition))
+            if f.endswith(tuple(SUFFIXES.values())) or f.endswith(".ndjson")
+        )
+        if files:
+            return os.path.join(entity_dir, partition, files[-1])
+    raise FileNotFoundError(f"Снимок [{entity}] за {date or 'latest'} не найден в {directory}.")
+
+
+def _iter_ndjson(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            stream = gzip.GzipFile(fileobj=mm, mode="rb") if path.endswith(".gz") else mm
+            for line in iter(stream.readline, b""):
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _iter_parquet(path):
+    pa, pq = _require_pyarrow()
+    with pa.memory_map(path, "r") as source:
+        parquet_file = pq.ParquetFile(source)
+        metadata = parquet_file.schema_arrow.metadata or {}
+        json_columns = set(json.loads(metadata.get(JSON_COLUMNS_KEY, b"[]")))
+        for batch in parquet_file.iter_batches(batch_size=PARQUET_ROW_GROUP_SIZE):
+            for record in batch.to_pylist():
+                for column in json_columns:
+                    if record.get(column) is not None:
+                        record[column] = json.loads(record[column])
+                yield record
+
+
+def iter_snapshot(path):
+    # Файл отображается в память и читается по одной записи: память не зависит от размера снимка
+    if path.endswith(".parquet"):
+        return _iter_parquet(path)
+    return _iter_ndjson(path)
+
+
+def _batched(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def read_snapshot(path, batch_size=REPLAY_BATCH_SIZE):
+    return _batched(iter_snapshot(path), batch_size)
+
+
+def replay_sources(entities, date=None, directory=LANDING_DIR, batch_size=REPLAY_BATCH_SIZE):
+    sources = {}
+    for entity in entities:
+        path = find_snapshot(entity, date, directory)
+        logger.info(f"[{entity}] воспроизведение снимка {path}.")
+        sources[entity] = read_snapshot(path, batch_size)
+    return sources
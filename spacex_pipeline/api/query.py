@@ -0,0 +1,115 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import requests
+
+from api.get_data import (
+    API_BASE_URL, FETCH_TIMEOUT, FETCH_RETRIES, FETCH_BACKOFF, RETRY_STATUSES, backoff_delay, create_session
+)
+
+logger = logging.getLogger(__name__)
+
+QUERY_PAGE_SIZE = int(os.getenv("SPACEX_QUERY_PAGE_SIZE", "200"))
+QUERY_PREFETCH = int(os.getenv("SPACEX_QUERY_PREFETCH", "2"))
+
+
+def post_query(session, url, body, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+    for attempt in range(retries + 1):
+        # Как в get_data.fetch_endpoint: повторяется любая сетевая ошибка (включая обрыв chunked-ответа),
+        # а неповторяемый код ответа поднимается сразу, вне try
+        try:
+            response = session.post(url, json=body, timeout=timeout)
+            if response.status_code == 200:
+                return response.json()
+        except (requests.RequestException, json.JSONDecodeError) as e:
+            logger.warning(f"Ошибка сети при запросе {url}: {e}")
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                raise requests.HTTPError(f"{url}: код ответа {response.status_code}", response=response)
+            logger.warning(f"Временная ошибка запроса {url}: {response.status_code}")
+        if attempt < retries:
+            time.sleep(backoff_delay(attempt, backoff))
+    raise requests.RequestException(f"Исчерпаны попытки запроса {url}")
+
+
+def iter_pages(collection, fields, page_size=QUERY_PAGE_SIZE, base_url=None, session=None, query=None,
+               timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF):
+    url = f"{(base_url or API_BASE_URL).rstrip('/')}/{collection}/query"
+    # id - виртуальное поле, API возвращает его всегда; сортировка по _id делает страницы непересекающимися
+    select = " ".join(f for f in fields if f != "id")
+
+    own_session = session is None
+    if own_session:
+        session = create_session(1)
+    try:
+        page = 1
+        while True:
+            body = {
+                "query": query or {},
+                "options": {"select": select, "sort": {"_id": "asc"}, "page": page, "limit": page_size},
+            }
+            started = time.perf_counter()
+            result = post_query(session, url, body, timeout, retries, backoff)
+            docs = result.get("docs") or []
+            logger.info(
+                f"[{collection}] страница {page}/{result.get('totalPages', '?')}: "
+                f"{len(docs)} записей за {time.perf_counter() - started:.3f} с"
+            )
+            if docs:
+                yield docs
+            if not result.get("hasNextPage") or not docs:
+                break
+            page = result.get("nextPage") or page + 1
+    finally:
+        if own_session:
+            session.close()
+
+
+def prefetch(pages, depth=QUERY_PREFETCH):
+    # Следующие страницы скачиваются в фоновом потоке, пока потребитель пишет текущую в БД
+    buffer = queue.Queue(maxsize=max(1, depth))
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in pages:
+                if not put(item):
+                    return
+            put(done)
+        except Exception as e:
+            put(e)
+        finally:
+            close = getattr(pages, "close", None)
+            if close:
+                close()
+
+    worker = threading.Thread(target=produce, name="query-prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join(timeout=1)
+
+
+def stream_collection(collection, fields, page_size=QUERY_PAGE_SIZE, depth=QUERY_PREFETCH, **kwargs):
+    return prefetch(iter_pages(collection, fields, page_size, **kwargs), depth)
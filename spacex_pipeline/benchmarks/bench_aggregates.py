@@ -0,0 +1,94 @@
+# Дашбордные запросы по сводным таблицам против агрегации по всей истории и обновление сводных таблиц
+# дельтами против полной пересборки.
+# Запуск из каталога spacex_pipeline на отдельной (тестовой) базе - таблицы spacex_data/spacex_analytics перезаписываются:
+#   python -m benchmarks.bench_aggregates --sizes 10000 100000
+import argparse
+import json
+import logging
+import random
+import time
+
+from db.aggregates import refresh_aggregates, launch_success_rates, payload_mass_by_orbit, _contribution_sql, AGGREGATES
+from db.connection import get_connection
+from db.migrations import migrate
+from extract_data import insert_launches_bulk, insert_rockets_bulk, insert_payloads_bulk
+from benchmarks.synthetic import generate_dataset, batched
+from benchmarks.harness import reset_raw_tables
+
+
+def populate(conn, dataset, batch_size):
+    # Согласованный набор: запуски распределены по небольшому числу ракет, как в реальных данных
+    reset_raw_tables(conn)
+    insert_rockets_bulk(conn, dataset["rockets"])
+    for name, insert in (("launches", insert_launches_bulk), ("payloads", insert_payloads_bulk)):
+        for batch in batched(dataset[name], batch_size):
+            insert(conn, batch)
+
+
+def timed(fn, conn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(conn)
+        samples.append(time.perf_counter() - started)
+    return round(min(samples), 4)
+
+
+def scan_query(name):
+    source = AGGREGATES[name][0]
+
+    def run(conn):
+        with conn.cursor() as cur:
+            cur.execute(_contribution_sql(name, f"spacex_data.{source}"))
+            cur.fetchall()
+        conn.commit()
+    return run
+
+
+def change_launches(conn, dataset, changed, seed):
+    # Повторная загрузка части запусков с изменённым исходом: в журнал дельт попадают только они
+    launches = random.Random(seed).sample(dataset["launches"], changed)
+    for launch in launches:
+        launch["success"] = not launch["success"]
+    insert_launches_bulk(conn, launches)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сводных таблиц: чтение и обновление дельтами.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--changed", type=int, default=100, help="сколько запусков меняется между обновлениями")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    conn = get_connection()
+    migrate(conn)
+
+    for size in args.sizes:
+        dataset = generate_dataset(size, args.seed)
+        populate(conn, dataset, args.batch_size)
+        refresh_aggregates(conn, rebuild=True)
+
+        delta_samples = []
+        for attempt in range(args.repeat):
+            change_launches(conn, dataset, min(args.changed, size), args.seed + attempt)
+            delta_samples.append(timed(refresh_aggregates, conn, 1))
+
+        result = {
+            "launches": size,
+            "rocket_year_scan_seconds": timed(scan_query("launches"), conn, args.repeat),
+            "rocket_year_aggregate_seconds": timed(launch_success_rates, conn, args.repeat),
+            "orbit_scan_seconds": timed(scan_query("payloads"), conn, args.repeat),
+            "orbit_aggregate_seconds": timed(payload_mass_by_orbit, conn, args.repeat),
+            "refresh_delta_seconds": min(delta_samples),
+            "refresh_rebuild_seconds": timed(lambda c: refresh_aggregates(c, rebuild=True), conn, args.repeat),
+        }
+        print(json.dumps(result))
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
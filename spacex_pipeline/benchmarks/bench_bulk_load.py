@@ -0,0 +1,55 @@
+# Сравнение построчной и COPY-загрузки insert_launches на синтетических данных.
+# Запуск из каталога spacex_pipeline на отдельной (тестовой) базе - таблицы spacex_data очищаются:
+#   python -m benchmarks.bench_bulk_load --sizes 10000 1000000
+import argparse
+import json
+import logging
+import time
+
+from db.connection import get_connection
+from db.migrations import migrate
+from extract_data import insert_launches, insert_launches_bulk
+from benchmarks.synthetic import generate_launches, batched
+from benchmarks.harness import measured, reset_tables
+
+
+def run(conn, loader, size, batch_size, seed):
+    reset_tables(conn)
+    elapsed = 0.0
+    with measured(loader.__name__) as counters:
+        for batch in batched(generate_launches(size, seed), batch_size):
+            started = time.perf_counter()
+            loader(conn, batch)
+            elapsed += time.perf_counter() - started
+    return {"seconds": round(elapsed, 3), "launches_per_sec": round(size / elapsed, 1),
+            "round_trips": counters["sql_round_trips"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк row vs bulk загрузки запусков.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--skip-row-above", type=int, default=None,
+                        help="не запускать построчный режим для размеров больше указанного")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    conn = get_connection()
+    migrate(conn)
+
+    results = []
+    for size in args.sizes:
+        result = {"launches": size, "bulk": run(conn, insert_launches_bulk, size, args.batch_size, args.seed)}
+        if args.skip_row_above is None or size <= args.skip_row_above:
+            result["row"] = run(conn, insert_launches, size, args.batch_size, args.seed)
+            result["speedup"] = round(result["row"]["seconds"] / result["bulk"]["seconds"], 1)
+        results.append(result)
+        print(json.dumps(result, ensure_ascii=False))
+
+    reset_tables(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
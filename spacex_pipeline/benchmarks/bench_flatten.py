@@ -0,0 +1,117 @@
+# Микробенчмарк разбора документов API в COPY-буферы raw-таблиц без обращения к БД:
+# построчный цикл dict.get (прежний flatten_launches + rows_to_copy_buffer) против колоночного flatten_columns.
+#   python -m benchmarks.bench_flatten --sizes 10000 100000
+import argparse
+import json
+import time
+
+from db.bulk_load import rows_to_copy_buffer, columns_to_copy_buffer
+from db.columnar import flatten_columns, table_types
+from extract_data import RAW_FIELD_MAP, LAUNCH_COLUMNS, LAUNCH_CHILD_COLUMNS, ROCKET_COLUMNS, PAYLOAD_COLUMNS
+from benchmarks.synthetic import generate_launches, generate_rockets, generate_payloads
+
+ROCKET_JSON_COLUMNS = ("height", "diameter", "mass", "payload_weights")
+
+
+def loop_rockets(rockets):
+    rows = [
+        tuple(json.dumps(r.get(col)) if col in ROCKET_JSON_COLUMNS else r.get(col) for col in ROCKET_COLUMNS)
+        for r in rockets
+    ]
+    return {"raw_spacex_rockets_data": rows}
+
+
+def loop_payloads(payloads):
+    return {"raw_spacex_payloads_data": [tuple(p.get(col) for col in PAYLOAD_COLUMNS) for p in payloads]}
+
+
+def loop_launches(launches):
+    launch_rows = []
+    child_rows = {table: [] for table in LAUNCH_CHILD_COLUMNS}
+    for launch in launches:
+        launch_id = launch["id"]
+        launch_rows.append(tuple(launch.get(col) for col in LAUNCH_COLUMNS))
+        fairings = launch.get("fairings")
+        if fairings:
+            child_rows["raw_spacex_fairings_data"].append(
+                (launch_id, fairings.get("reused"), fairings.get("recovery_attempt"), fairings.get("recovered"))
+            )
+        links = launch.get("links") or {}
+        patch = links.get("patch") or {}
+        reddit = links.get("reddit") or {}
+        child_rows["raw_spacex_links_data"].append((
+            launch_id, patch.get("small"), patch.get("large"), links.get("webcast"), links.get("youtube_id"),
+            links.get("article"), links.get("wikipedia"), reddit.get("campaign"), reddit.get("launch"),
+            reddit.get("media"), reddit.get("recovery")
+        ))
+        for fail in launch.get("failures") or []:
+            child_rows["raw_spacex_failures_data"].append(
+                (launch_id, fail.get("time"), fail.get("altitude"), fail.get("reason"))
+            )
+        for core in launch.get("cores") or []:
+            child_rows["raw_spacex_cores_data"].append((
+                launch_id, core.get("core"), core.get("flight"), core.get("gridfins"), core.get("legs"),
+                core.get("reused"), core.get("landing_attempt"), core.get("landing_success"),
+                core.get("landing_type"), core.get("landpad")
+            ))
+        for payload_id in launch.get("payloads") or []:
+            child_rows["raw_spacex_launch_payloads_data"].append((launch_id, payload_id))
+        for crew_id in launch.get("crew") or []:
+            child_rows["raw_spacex_launch_crew_data"].append((launch_id, crew_id))
+        for ship_id in launch.get("ships") or []:
+            child_rows["raw_spacex_launch_ships_data"].append((launch_id, ship_id))
+        for capsule_id in launch.get("capsules") or []:
+            child_rows["raw_spacex_launch_capsules_data"].append((launch_id, capsule_id))
+    return {"raw_spacex_launches_data": launch_rows, **child_rows}
+
+
+LOOPS = {"rockets": loop_rockets, "payloads": loop_payloads, "launches": loop_launches}
+GENERATORS = {"rockets": generate_rockets, "payloads": generate_payloads, "launches": generate_launches}
+
+
+def run_loop(entity, documents):
+    return {table: rows_to_copy_buffer(rows).getvalue() for table, rows in LOOPS[entity](documents).items()}
+
+
+def run_columnar(entity, documents):
+    tables = RAW_FIELD_MAP[entity]
+    arrays = flatten_columns(documents, tables)
+    return {table: columns_to_copy_buffer(arrays[table], table_types(spec)).getvalue() for table, spec in tables.items()}
+
+
+def best_of(fn, repeats):
+    best, result = None, None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк построчного и колоночного разбора документов API.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--entities", nargs="+", choices=tuple(LOOPS), default=list(LOOPS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for entity in args.entities:
+        for size in args.sizes:
+            documents = list(GENERATORS[entity](size, args.seed))
+            loop_seconds, loop_output = best_of(lambda: run_loop(entity, documents), args.repeats)
+            columnar_seconds, columnar_output = best_of(lambda: run_columnar(entity, documents), args.repeats)
+            print(json.dumps({
+                "entity": entity,
+                "documents": size,
+                "loop_seconds": round(loop_seconds, 4),
+                "columnar_seconds": round(columnar_seconds, 4),
+                "speedup": round(loop_seconds / columnar_seconds, 2),
+                # COPY-текст обоих путей должен совпадать байт в байт
+                "identical": loop_output == columnar_output,
+            }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Масштабирование --load-mode parallel по числу процессов на синтетических запусках.
+# Запуск из каталога spacex_pipeline на отдельной (тестовой) базе - таблицы spacex_data очищаются:
+#   python -m benchmarks.bench_parallel_load --size 200000 --workers 1 2 4 8
+import argparse
+import json
+import logging
+import os
+import time
+
+from db.connection import get_connection
+from db.migrations import migrate
+from db.parallel_load import shutdown_workers
+from extract_data import insert_launches_bulk, insert_parallel
+from benchmarks.synthetic import generate_launches, batched
+from benchmarks.harness import reset_tables
+
+
+def run(conn, size, batch_size, workers, partition_by, seed):
+    reset_tables(conn)
+    elapsed = 0.0
+    for batch in batched(generate_launches(size, seed), batch_size):
+        started = time.perf_counter()
+        insert_parallel(conn, batch, insert_launches_bulk, workers, partition_by)
+        elapsed += time.perf_counter() - started
+    return {"workers": workers, "seconds": round(elapsed, 3), "launches_per_sec": round(size / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк параллельной загрузки запусков по разделам.")
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--partition-by", choices=("hash", "date"), default="hash")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    conn = get_connection()
+    migrate(conn)
+
+    baseline = None
+    for workers in args.workers:
+        result = run(conn, args.size, args.batch_size, workers, args.partition_by, args.seed)
+        # Запуск процессов пула входит в замер, как и в реальной загрузке
+        shutdown_workers()
+        baseline = baseline or result["seconds"]
+        result["speedup"] = round(baseline / result["seconds"], 2)
+        result["cpu_count"] = os.cpu_count()
+        print(json.dumps(result, ensure_ascii=False))
+
+    reset_tables(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Сравнение движков трансформации load_data: pandas (чтение в DataFrame и execute_values) и sql (INSERT ... SELECT).
+# Запуск из каталога spacex_pipeline на отдельной (тестовой) базе - таблицы spacex_data/spacex_analytics перезаписываются:
+#   python -m benchmarks.bench_transform --sizes 10000 100000
+import argparse
+import json
+import logging
+import time
+
+from db.connection import get_connection
+from db.migrations import migrate
+from extract_data import insert_launches_bulk, insert_rockets_bulk, insert_payloads_bulk
+from load_data import insert_transformed_data_sql, insert_transformed_data_in_db
+from transform_data import transformed_fact_data, transformed_dimension_data
+from benchmarks.synthetic import generate_launches, generate_rockets, generate_payloads, batched
+from benchmarks.harness import reset_tables
+
+
+def populate(conn, size, batch_size, seed):
+    reset_tables(conn)
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE spacex_data.raw_spacex_rockets_data, spacex_data.raw_spacex_payloads_data;")
+    conn.commit()
+    for batch in batched(generate_launches(size, seed), batch_size):
+        insert_launches_bulk(conn, batch)
+    insert_rockets_bulk(conn, list(generate_rockets(max(4, size // 1000), seed)))
+    for batch in batched(generate_payloads(size, seed), batch_size):
+        insert_payloads_bulk(conn, batch)
+
+
+def run_pandas(conn):
+    fct_df = transformed_fact_data(conn)
+    rockets_df, payloads_df = transformed_dimension_data(conn)
+    insert_transformed_data_sql(conn, fct_df, rockets_df, payloads_df)
+
+
+def timed(fn, conn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(conn)
+        samples.append(time.perf_counter() - started)
+    return round(min(samples), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк движков трансформации pandas vs sql.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    conn = get_connection()
+    migrate(conn)
+
+    for size in args.sizes:
+        populate(conn, size, args.batch_size, args.seed)
+        result = {
+            "launches": size,
+            "pandas_seconds": timed(run_pandas, conn, args.repeat),
+            "sql_seconds": timed(insert_transformed_data_in_db, conn, args.repeat),
+        }
+        result["speedup"] = round(result["pandas_seconds"] / result["sql_seconds"], 1)
+        print(json.dumps(result))
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
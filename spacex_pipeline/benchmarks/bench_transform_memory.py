@@ -0,0 +1,67 @@
+# Пиковый RSS трансформации load_data для движков pandas и chunked при росте raw-таблиц.
+# Каждый замер выполняется в отдельном процессе, чтобы пики не смешивались.
+# Запуск из каталога spacex_pipeline на отдельной (тестовой) базе:
+#   python -m benchmarks.bench_transform_memory --sizes 50000 200000 800000
+import argparse
+import json
+import logging
+import subprocess
+import sys
+import time
+
+from db.connection import get_connection
+from db.migrations import migrate
+from load_data import transform_and_load
+from metrics import peak_rss_mb
+from transform_data import CHUNK_SIZE
+from benchmarks.bench_transform import populate
+
+
+def child(engine, chunk_size):
+    logging.getLogger().setLevel(logging.WARNING)
+    conn = get_connection()
+    started = time.perf_counter()
+    transform_and_load(conn, engine, "truncate", chunk_size, force=True)
+    elapsed = time.perf_counter() - started
+    conn.close()
+    print(json.dumps({"seconds": round(elapsed, 3), "peak_rss_mb": round(peak_rss_mb(), 1)}))
+
+
+def measure(engine, chunk_size):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_transform_memory", "--child", engine, "--chunk-size", str(chunk_size)],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк памяти движков трансформации pandas vs chunked.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50_000, 200_000, 800_000])
+    parser.add_argument("--engines", nargs="+", default=["pandas", "chunked"])
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.chunk_size)
+        return
+
+    logging.getLogger().setLevel(logging.WARNING)
+    conn = get_connection()
+    migrate(conn)
+
+    for size in args.sizes:
+        populate(conn, size, args.batch_size, args.seed)
+        result = {"launches": size, "chunk_size": args.chunk_size}
+        for engine in args.engines:
+            result[engine] = measure(engine, args.chunk_size)
+        print(json.dumps(result))
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Сравнение двух JSON-отчётов benchmarks.suite (например, до и после коммита):
+#   python -m benchmarks.compare base.json new.json
+import argparse
+import json
+
+METRICS = (
+    ("seconds.median", "с, медиана"),
+    ("rows_per_sec", "строк/с"),
+    ("round_trips", "обращений к БД"),
+    ("peak_rss_mb", "пик RSS, МБ"),
+)
+
+
+def metric(stage, path):
+    value = stage
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение двух отчётов бенчмарка.")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{base.get('revision')} -> {new.get('revision')}")
+    for name in sorted(set(base["stages"]) | set(new["stages"])):
+        old_stage, new_stage = base["stages"].get(name), new["stages"].get(name)
+        if old_stage is None or new_stage is None:
+            print(f"{name}: есть только в {'новом' if old_stage is None else 'базовом'} отчёте")
+            continue
+        print(name)
+        for path, label in METRICS:
+            old_value, new_value = metric(old_stage, path), metric(new_stage, path)
+            if old_value is None or new_value is None:
+                continue
+            delta = f"{(new_value - old_value) / old_value * 100:+.1f}%" if old_value else "n/a"
+            print(f"  {label:>16}: {old_value:>12} -> {new_value:>12}  ({delta})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import math
+import subprocess
+from contextlib import contextmanager
+
+from metrics import stage
+
+# Обращения к БД и пиковый RSS бенчмарки считают тем же инструментированием, что и пайплайн:
+# InstrumentedCursor (курсор get_connection) пишет счётчики в этап metrics.stage, RSS - metrics.peak_rss_mb.
+
+
+@contextmanager
+def measured(name):
+    # Счётчики одного замера: этапы накапливают значения между вызовами, поэтому отдаётся прирост
+    with stage(f"bench_{name}") as record:
+        before = dict(record.counters)
+        counters = {}
+        try:
+            yield counters
+        finally:
+            counters.update({key: value - before[key] for key, value in record.counters.items()})
+
+
+def reset_tables(conn):
+    with conn.cursor() as cur:
+        # После секционирования запусков дочерние таблицы не связаны внешними ключами, CASCADE их не затрагивает
+        cur.execute("""
+            TRUNCATE spacex_data.raw_spacex_launches_data,
+                     spacex_data.raw_spacex_fairings_data, spacex_data.raw_spacex_links_data,
+                     spacex_data.raw_spacex_failures_data, spacex_data.raw_spacex_cores_data,
+                     spacex_data.raw_spacex_launch_payloads_data, spacex_data.raw_spacex_launch_crew_data,
+                     spacex_data.raw_spacex_launch_ships_data, spacex_data.raw_spacex_launch_capsules_data;
+        """)
+    conn.commit()
+
+
+def reset_raw_tables(conn):
+    reset_tables(conn)
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE spacex_data.raw_spacex_rockets_data, spacex_data.raw_spacex_payloads_data;")
+        cur.execute("""
+            SELECT to_regclass('spacex_data.extract_record_state') IS NOT NULL
+               AND to_regclass('spacex_data.extract_watermarks') IS NOT NULL;
+        """)
+        if cur.fetchone()[0]:
+            cur.execute("TRUNCATE spacex_data.extract_record_state, spacex_data.extract_watermarks;")
+    conn.commit()
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        rank = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+        result[f"p{p}"] = round(ordered[rank], 4)
+    return result
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
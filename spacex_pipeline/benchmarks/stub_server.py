@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubSpaceXServer:
+    # Локальная заглушка SpaceX API v4: GET /v4/<collection> (gzip, ETag/304)
+    # и POST /v4/<collection>/query с select/sort/page/limit в формате mongoose-paginate.
+
+    def __init__(self, dataset, host="127.0.0.1", port=0):
+        self.dataset = dataset
+        self.requests = 0
+        self._bodies = {}
+        for collection, docs in dataset.items():
+            body = json.dumps(docs, separators=(",", ":")).encode("utf-8")
+            self._bodies[collection] = (body, gzip.compress(body, 1), f'"{hashlib.md5(body).hexdigest()}"')
+        self._sorted = {c: sorted(docs, key=lambda d: d["id"]) for c, docs in dataset.items()}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v4"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub.requests += 1
+                collection = self.path.rstrip("/").split("/")[-1]
+                if collection not in stub._bodies:
+                    return self._send(404)
+                body, compressed, etag = stub._bodies[collection]
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, headers={"ETag": etag})
+                headers = {"Content-Type": "application/json", "ETag": etag}
+                if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    body = compressed
+                    headers["Content-Encoding"] = "gzip"
+                self._send(200, body, headers)
+
+            def do_POST(self):
+                stub.requests += 1
+                parts = self.path.strip("/").split("/")
+                if len(parts) != 3 or parts[2] != "query" or parts[1] not in stub._sorted:
+                    return self._send(404)
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                options = request.get("options") or {}
+                page, limit = int(options.get("page", 1)), int(options.get("limit", 10))
+                docs = stub._sorted[parts[1]]
+                window = docs[(page - 1) * limit: page * limit]
+                select = options.get("select")
+                if select:
+                    fields = set(select.split()) | {"id"}
+                    window = [{k: v for k, v in doc.items() if k in fields} for doc in window]
+                total_pages = (len(docs) + limit - 1) // limit
+                body = json.dumps({
+                    "docs": window, "totalDocs": len(docs), "limit": limit, "totalPages": total_pages,
+                    "page": page, "hasPrevPage": page > 1, "hasNextPage": page < total_pages,
+                    "prevPage": page - 1 if page > 1 else None, "nextPage": page + 1 if page < total_pages else None,
+                }, separators=(",", ":")).encode("utf-8")
+                self._send(200, body, {"Content-Type": "application/json"})
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
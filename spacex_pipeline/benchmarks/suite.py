@@ -0,0 +1,169 @@
+# Сквозной бенчмарк пайплайна: синтетический набор -> локальная заглушка API -> локальный Postgres.
+# Для каждого этапа: время (перцентили по прогонам), задержка по батчам/страницам, строк/с, обращений к БД,
+# пиковый RSS. Результат - JSON, который можно сравнивать между коммитами (benchmarks/compare.py).
+# Запуск из каталога spacex_pipeline на отдельной (тестовой) базе - таблицы spacex_data/spacex_analytics перезаписываются:
+#   python -m benchmarks.suite --launches 50000 --output bench.json
+import argparse
+import json
+import logging
+import statistics
+import time
+from datetime import datetime, timezone
+
+from db.connection import get_connection
+from db.migrations import migrate
+from api.get_data import fetch_data
+from api.query import stream_collection
+from extract_data import (
+    fetch_sources, select_loaders, load_entity, ENTITIES, LOAD_MODES, QUERY_FIELDS
+)
+from load_data import transform_and_load
+from transform_data import TRANSFORM_ENGINES, CHUNK_SIZE
+from benchmarks.synthetic import generate_dataset
+from benchmarks.stub_server import StubSpaceXServer
+from benchmarks.harness import measured, reset_raw_tables, percentiles, git_revision
+from metrics import peak_rss_mb, reset_peak_rss
+
+logger = logging.getLogger(__name__)
+
+
+def measure(name, fn, repeat, setup=None):
+    samples, trips, peaks, rows, batch_latencies = [], [], [], 0, []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        reset_peak_rss()
+        with measured(name) as counters:
+            started = time.perf_counter()
+            rows = fn(batch_latencies)
+            samples.append(time.perf_counter() - started)
+        trips.append(counters["sql_round_trips"])
+        peaks.append(peak_rss_mb())
+
+    median = statistics.median(samples)
+    result = {
+        "runs": repeat,
+        "rows": rows,
+        "seconds": {"min": round(min(samples), 4), "median": round(median, 4), **percentiles(samples)},
+        "rows_per_sec": round(rows / median, 1) if median else None,
+        "round_trips": max(trips),
+        "peak_rss_mb": round(max(peaks), 1),
+    }
+    if batch_latencies:
+        result["batch_latency"] = percentiles(batch_latencies)
+        result["batches"] = len(batch_latencies) // repeat
+    return result
+
+
+def timed_loader(loader, latencies):
+    def wrapper(conn, records):
+        started = time.perf_counter()
+        loader(conn, records)
+        latencies.append(time.perf_counter() - started)
+    return wrapper
+
+
+def analytics_rows(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT count(*) FROM spacex_analytics.fct_launches)
+                 + (SELECT count(*) FROM spacex_analytics.dim_rockets)
+                 + (SELECT count(*) FROM spacex_analytics.dim_payloads);
+        """)
+        rows = cur.fetchone()[0]
+    conn.commit()
+    return rows
+
+
+def run_suite(conn, server, args):
+    stages = {}
+
+    def fetch(latencies):
+        stats = {}
+        launches, rockets, payloads = fetch_data(base_url=server.base_url, stats=stats)
+        latencies.extend(s["latency"] for s in stats.values())
+        return sum(len(x or []) for x in (launches, rockets, payloads))
+
+    stages["fetch"] = measure("fetch", fetch, args.repeat)
+
+    def fetch_stream(latencies):
+        total = 0
+        for entity in ENTITIES:
+            pages = stream_collection(entity, QUERY_FIELDS[entity], args.page_size, base_url=server.base_url)
+            started = time.perf_counter()
+            for page in pages:
+                latencies.append(time.perf_counter() - started)
+                total += len(page)
+                started = time.perf_counter()
+        return total
+
+    stages["fetch_stream"] = measure("fetch_stream", fetch_stream, args.repeat)
+
+    for load_mode in args.load_modes:
+        def extract(latencies, load_mode=load_mode):
+            loaders = select_loaders(load_mode)
+            sources = fetch_sources(args.stream, args.page_size, base_url=server.base_url)
+            total = 0
+            for entity in ENTITIES:
+                loaded, _ = load_entity(conn, entity, sources[entity], timed_loader(loaders[entity], latencies))
+                total += loaded
+            return total
+
+        stages[f"extract_{load_mode}"] = measure(f"extract_{load_mode}", extract, args.repeat,
+                                                  setup=lambda: reset_raw_tables(conn))
+
+    for engine in args.engines:
+        def transform(latencies, engine=engine):
+            transform_and_load(conn, engine, "truncate", args.chunk_size, force=True)
+            return analytics_rows(conn)
+
+        stages[f"transform_{engine}"] = measure(f"transform_{engine}", transform, args.repeat)
+
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк extract/transform/load на синтетических данных.")
+    parser.add_argument("--launches", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--load-modes", nargs="+", choices=LOAD_MODES, default=["bulk"])
+    parser.add_argument("--engines", nargs="+", choices=TRANSFORM_ENGINES, default=list(TRANSFORM_ENGINES))
+    parser.add_argument("--stream", action="store_true", help="извлекать через POST /query вместо полного GET")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--output", help="куда записать JSON с результатами")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    dataset = generate_dataset(args.launches, args.seed)
+    generation_seconds = time.perf_counter() - started
+
+    conn = get_connection()
+    migrate(conn)
+
+    with StubSpaceXServer(dataset) as server:
+        stages = run_suite(conn, server, args)
+        http_requests = server.requests
+    conn.close()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "params": {k: v for k, v in vars(args).items() if k != "output"},
+        "dataset": {name: len(docs) for name, docs in dataset.items()},
+        "generation_seconds": round(generation_seconds, 3),
+        "http_requests": http_requests,
+        "stages": stages,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
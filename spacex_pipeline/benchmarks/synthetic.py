@@ -0,0 +1,155 @@
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+EPOCH = datetime(2006, 3, 24, tzinfo=timezone.utc)
+
+
+def _oid(rnd):
+    return uuid.UUID(int=rnd.getrandbits(128)).hex[:24]
+
+
+def make_launch(rnd, flight_number):
+    launch_id = _oid(rnd)
+    # ~13 минут между запусками: 1M запусков укладываются в date_unix INTEGER (до 2038 года)
+    date = EPOCH + timedelta(minutes=flight_number * 13 + rnd.randint(0, 12))
+    return {
+        "id": launch_id,
+        "flight_number": flight_number,
+        "name": f"Synthetic-{flight_number}",
+        "date_utc": date.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "date_unix": int(date.timestamp()),
+        "date_local": date.isoformat(),
+        "date_precision": "hour",
+        "static_fire_date_utc": None,
+        "static_fire_date_unix": None,
+        "net": False,
+        "window": rnd.choice([0, 60, 3600, None]),
+        "rocket": _oid(rnd),
+        "success": rnd.choice([True, True, True, False, None]),
+        "details": "Synthetic launch\twith\ttabs and \\ backslashes",
+        "launchpad": _oid(rnd),
+        "auto_update": True,
+        "tbd": False,
+        "launch_library_id": None,
+        "upcoming": False,
+        "fairings": {"reused": False, "recovery_attempt": rnd.random() < 0.5, "recovered": None, "ships": []},
+        "links": {
+            "patch": {"small": f"https://images.example/{launch_id}_s.png", "large": None},
+            "reddit": {"campaign": None, "launch": f"https://reddit.example/{launch_id}", "media": None, "recovery": None},
+            "webcast": f"https://youtu.be/{launch_id[:11]}",
+            "youtube_id": launch_id[:11],
+            "article": None,
+            "wikipedia": f"https://en.wikipedia.org/wiki/Synthetic_{flight_number}",
+        },
+        "failures": [{"time": 33, "altitude": None, "reason": "synthetic failure"}] if rnd.random() < 0.05 else [],
+        "cores": [
+            {
+                "core": _oid(rnd), "flight": rnd.randint(1, 15), "gridfins": True, "legs": True,
+                "reused": rnd.random() < 0.7, "landing_attempt": True, "landing_success": rnd.random() < 0.95,
+                "landing_type": rnd.choice(["ASDS", "RTLS", None]), "landpad": _oid(rnd),
+            }
+            for _ in range(rnd.choice([1, 1, 1, 3]))
+        ],
+        "payloads": [_oid(rnd) for _ in range(rnd.randint(1, 3))],
+        "crew": [_oid(rnd) for _ in range(rnd.choice([0, 0, 0, 4]))],
+        "ships": [_oid(rnd) for _ in range(rnd.randint(0, 3))],
+        "capsules": [_oid(rnd) for _ in range(rnd.choice([0, 0, 1]))],
+    }
+
+
+def make_rocket(rnd, index):
+    return {
+        "id": _oid(rnd),
+        "name": f"Synthetic Rocket {index}",
+        "type": "rocket",
+        "active": rnd.random() < 0.5,
+        "stages": 2,
+        "boosters": rnd.choice([0, 2]),
+        "cost_per_launch": rnd.randint(1, 90) * 1_000_000,
+        "success_rate_pct": rnd.randint(40, 100),
+        "first_flight": f"{rnd.randint(2006, 2024)}-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+        "country": "United States",
+        "company": "SpaceX",
+        "height": {"meters": 70, "feet": 229.6},
+        "diameter": {"meters": 3.7, "feet": 12},
+        "mass": {"kg": 549054, "lb": 1207920},
+        "payload_weights": [{"id": "leo", "name": "Low Earth Orbit", "kg": 22800, "lb": 50265}],
+        "flickr_images": [f"https://farm.example/{index}_{i}.jpg" for i in range(rnd.randint(0, 4))],
+        "wikipedia": f"https://en.wikipedia.org/wiki/Synthetic_Rocket_{index}",
+        "description": "Synthetic rocket description",
+    }
+
+
+def make_payload(rnd, index):
+    return {
+        "id": _oid(rnd),
+        "name": f"Synthetic Payload {index}",
+        "type": rnd.choice(["Satellite", "Crew Dragon", "Dragon 2.0"]),
+        "reused": rnd.random() < 0.2,
+        "launch": _oid(rnd),
+        "customers": ["SpaceX"],
+        "norad_ids": [rnd.randint(10000, 60000)],
+        "nationalities": ["United States"],
+        "manufacturers": ["SpaceX"],
+        "mass_kg": round(rnd.uniform(100, 15000), 1) if rnd.random() < 0.9 else None,
+        "mass_lbs": None,
+        "orbit": rnd.choice(["LEO", "GTO", "ISS", "SSO", "PO", "VLEO"]),
+        "reference_system": "geocentric",
+        "regime": rnd.choice(["low-earth", "geostationary", "sun-synchronous"]),
+        "longitude": None,
+        "semi_major_axis_km": round(rnd.uniform(6500, 42000), 2),
+        "eccentricity": round(rnd.uniform(0, 0.1), 5),
+        "periapsis_km": round(rnd.uniform(200, 36000), 2),
+        "apoapsis_km": round(rnd.uniform(200, 36000), 2),
+        "inclination_deg": round(rnd.uniform(0, 98), 2),
+        "period_min": round(rnd.uniform(88, 1440), 2),
+        "lifespan_years": rnd.choice([None, 5, 10, 15]),
+    }
+
+
+def generate_rockets(n, seed=42):
+    rnd = random.Random(seed)
+    for index in range(n):
+        yield make_rocket(rnd, index)
+
+
+def generate_payloads(n, seed=42):
+    rnd = random.Random(seed)
+    for index in range(n):
+        yield make_payload(rnd, index)
+
+
+def generate_launches(n, seed=42, start=1):
+    rnd = random.Random(seed)
+    for flight_number in range(start, start + n):
+        yield make_launch(rnd, flight_number)
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_dataset(n_launches, seed=42):
+    # Ссылочно согласованный набор: launch.rocket ссылается на существующую ракету,
+    # каждый id из launch.payloads - на полезную нагрузку с payload.launch = launch.id
+    rnd = random.Random(seed)
+    rockets = [make_rocket(rnd, index) for index in range(max(4, n_launches // 1000))]
+    launches, payloads = [], []
+    for flight_number in range(1, n_launches + 1):
+        launch = make_launch(rnd, flight_number)
+        launch["rocket"] = rnd.choice(rockets)["id"]
+        for payload_id in launch["payloads"]:
+            payload = make_payload(rnd, len(payloads))
+            payload["id"] = payload_id
+            payload["launch"] = launch["id"]
+            payloads.append(payload)
+        launches.append(launch)
+    return {"launches": launches, "rockets": rockets, "payloads": payloads}
@@ -0,0 +1,151 @@
+import logging
+
+from metrics import record
+
+logger = logging.getLogger(__name__)
+
+# Сводные таблицы в spacex_analytics: имя -> (raw-источник, таблица, ключи, меры).
+# Ключ и мера - (колонка, тип, выражение над строкой источника); меры аддитивны, поэтому изменение строки
+# раскладывается в дельту "минус старый вклад, плюс новый", а пересчёт по всей истории не нужен.
+# Ракеты нет в fct_launches, поэтому источник - raw-таблицы (те же строки, из которых строятся fct/dim).
+# Таблицы, журналы дельт и триггеры создаёт миграция 7 (db/migrations.py) с теми же выражениями: изменение
+# ключей или мер требует новой миграции, которая пересоздаёт функции захвата и помечает агрегат к пересборке.
+AGGREGATES = {
+    "launches": (
+        "raw_spacex_launches_data",
+        "agg_launches_rocket_year",
+        (("rocket", "TEXT", "coalesce(rocket, 'unknown')"), ("year", "INTEGER", "extract(year FROM date_utc)::int")),
+        (
+            ("launches", "BIGINT", "count(*)"),
+            ("successes", "BIGINT", "count(*) FILTER (WHERE success)"),
+            ("failures", "BIGINT", "count(*) FILTER (WHERE NOT success)"),
+            ("upcoming", "BIGINT", "count(*) FILTER (WHERE upcoming)"),
+        ),
+    ),
+    "payloads": (
+        "raw_spacex_payloads_data",
+        "agg_payloads_orbit",
+        (("orbit", "TEXT", "coalesce(orbit, 'unknown')"),),
+        (
+            ("payloads", "BIGINT", "count(*)"),
+            ("mass_kg", "NUMERIC", "coalesce(sum(mass_kg::numeric), 0)"),
+            ("with_mass", "BIGINT", "count(mass_kg)"),
+        ),
+    ),
+}
+AGGREGATE_STATE_TABLE = "spacex_analytics.agg_state"
+
+
+def delta_table(name):
+    return f"spacex_data.agg_delta_{name}"
+
+
+def _contribution_sql(name, rows, sign=""):
+    # Вклад набора строк rows в сводную таблицу, сгруппированный по её ключу
+    _, _, keys, measures = AGGREGATES[name]
+    columns = [expr for _, _, expr in keys] + [f"{sign}({expr})" for _, _, expr in measures]
+    return f"SELECT {', '.join(columns)} FROM {rows} GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}"
+
+
+def _rebuild(cur, name):
+    source, table, keys, measures = AGGREGATES[name]
+    # SHARE блокирует запись в источник до конца транзакции: все дельты, записанные до блокировки,
+    # уже учтены в пересборке и удаляются, новых до commit не появится
+    cur.execute(f"LOCK TABLE spacex_data.{source} IN SHARE MODE;")
+    cur.execute(f"DELETE FROM {delta_table(name)};")
+    # DELETE, а не TRUNCATE: дашборды читают прежние значения до commit, а не ждут блокировки
+    cur.execute(f"DELETE FROM spacex_analytics.{table};")
+    cur.execute(f"INSERT INTO spacex_analytics.{table} {_contribution_sql(name, f'spacex_data.{source}')};")
+    return {"mode": "rebuild", "groups": cur.rowcount}
+
+
+def _apply_deltas(cur, name):
+    _, table, keys, measures = AGGREGATES[name]
+    key_columns = ", ".join(column for column, _, _ in keys)
+    measure_columns = [column for column, _, _ in measures]
+    # DELETE ... RETURNING забирает только дельты, видимые в снимке: записанные параллельной загрузкой
+    # после начала оператора остаются в журнале до следующего обновления
+    cur.execute(f"""
+        WITH consumed AS (
+            DELETE FROM {delta_table(name)} RETURNING *
+        ), applied AS (
+            INSERT INTO spacex_analytics.{table} AS t ({key_columns}, {', '.join(measure_columns)})
+            SELECT {key_columns}, {', '.join(f'sum({column})' for column in measure_columns)}
+            FROM consumed GROUP BY {key_columns}
+            ON CONFLICT ({key_columns}) DO UPDATE SET
+                {', '.join(f'{column} = t.{column} + EXCLUDED.{column}' for column in measure_columns)}
+            RETURNING 1
+        )
+        SELECT (SELECT count(*) FROM consumed), (SELECT count(*) FROM applied);
+    """)
+    consumed, groups = cur.fetchone()
+    # Ключ, из которого ушли все строки, удаляется, а не остаётся с нулями
+    cur.execute(f"DELETE FROM spacex_analytics.{table} WHERE {measure_columns[0]} = 0;")
+    return {"mode": "delta", "deltas": consumed, "groups": groups}
+
+
+def refresh_aggregates(conn, names=None, rebuild=False):
+    # Дельты накапливаются триггерами при загрузке raw-таблиц; здесь они сворачиваются в сводные таблицы.
+    # Стоимость пропорциональна числу изменённых ключей, а не размеру истории; rebuild=True пересобирает целиком.
+    report = {}
+    with conn.cursor() as cur:
+        try:
+            for name in names or AGGREGATES:
+                # FOR UPDATE сериализует параллельные обновления одной сводной таблицы
+                cur.execute(f"SELECT needs_rebuild FROM {AGGREGATE_STATE_TABLE} WHERE name = %s FOR UPDATE;",
+                            (name,))
+                row = cur.fetchone()
+                report[name] = _rebuild(cur, name) if rebuild or row is None or row[0] else _apply_deltas(cur, name)
+                cur.execute(f"""
+                    INSERT INTO {AGGREGATE_STATE_TABLE} (name, needs_rebuild, refreshed_at) VALUES (%s, false, now())
+                    ON CONFLICT (name) DO UPDATE SET needs_rebuild = false, refreshed_at = now();
+                """, (name,))
+                record(rows=report[name]["groups"])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Ошибка при обновлении сводных таблиц: {e}")
+            raise
+
+    for name, result in report.items():
+        if result["mode"] == "rebuild":
+            logger.info(f"[сводные] {AGGREGATES[name][1]}: пересобрана по raw-данным, ключей {result['groups']}.")
+        else:
+            logger.info(f"[сводные] {AGGREGATES[name][1]}: применено дельт {result['deltas']}, "
+                        f"затронуто ключей {result['groups']}.")
+    return report
+
+
+def _fetch_dicts(conn, query, params):
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        columns = [column.name for column in cur.description]
+        rows = [dict(zip(columns, row)) for row in cur.fetchall()]
+    conn.commit()
+    return rows
+
+
+def launch_success_rates(conn, rocket=None, year_from=None, year_to=None, refresh=False):
+    # Быстрый путь для дашбордов: чтение сводной таблицы (ключей - ракеты x годы), без сканирования запусков.
+    # refresh=True сначала применяет накопленные дельты
+    if refresh:
+        refresh_aggregates(conn, ("launches",))
+    return _fetch_dicts(conn, """
+        SELECT rocket, rocket_name, year, launches, successes, failures, upcoming, success_rate
+        FROM spacex_analytics.launch_success_by_rocket_year
+        WHERE (%(rocket)s IS NULL OR rocket = %(rocket)s OR rocket_name = %(rocket)s)
+          AND (%(year_from)s IS NULL OR year >= %(year_from)s)
+          AND (%(year_to)s IS NULL OR year <= %(year_to)s)
+        ORDER BY rocket, year;
+    """, {"rocket": rocket, "year_from": year_from, "year_to": year_to})
+
+
+def payload_mass_by_orbit(conn, orbit=None, refresh=False):
+    if refresh:
+        refresh_aggregates(conn, ("payloads",))
+    return _fetch_dicts(conn, """
+        SELECT orbit, payloads, mass_kg, with_mass, avg_mass_kg
+        FROM spacex_analytics.payload_mass_by_orbit
+        WHERE %(orbit)s IS NULL OR orbit = %(orbit)s
+        ORDER BY mass_kg DESC;
+    """, {"orbit": orbit})
@@ -0,0 +1,181 @@
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _array_literal(values):
+    items = []
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        else:
+            text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{text}"')
+    return "{" + ",".join(items) + "}"
+
+
+def copy_value(value):
+    # Формат COPY ... FROM STDIN (text): \N для NULL, экранирование \t \n \r и \\
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value).translate(_TEXT_ESCAPES)
+    if isinstance(value, dict):
+        return json.dumps(value).translate(_TEXT_ESCAPES)
+    return str(value).translate(_TEXT_ESCAPES)
+
+
+def rows_to_copy_buffer(rows):
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(copy_value(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def _escape_column(texts):
+    # Экранирование всей колонки одним translate: значения склеиваются через NUL, которого не бывает
+    # в тексте PostgreSQL; если NUL всё же встретился, колонка экранируется поштучно
+    escaped = "\x00".join(texts).translate(_TEXT_ESCAPES).split("\x00")
+    if len(escaped) != len(texts):
+        escaped = [text.translate(_TEXT_ESCAPES) for text in texts]
+    return escaped
+
+
+def _with_nulls(values, texts):
+    return ["\\N" if v is None else text for v, text in zip(values, texts)]
+
+
+def _text_column(values):
+    return _with_nulls(values, _escape_column(["" if v is None else str(v) for v in values]))
+
+
+def _number_column(values):
+    return ["\\N" if v is None else str(v) for v in values]
+
+
+def _bool_column(values):
+    return ["\\N" if v is None else ("t" if v else "f") for v in values]
+
+
+_json_encode = json.JSONEncoder().encode
+
+
+def _json_column(values):
+    # Как и построчная вставка (json.dumps(rocket.get(...))), отсутствующее значение пишется как JSON null
+    return _escape_column([_json_encode(v) for v in values])
+
+
+def _array_column(values):
+    return _with_nulls(values, _escape_column(["" if v is None else _array_literal(v) for v in values]))
+
+
+# Конвертеры колонок по типу из DDL: тип проверяется один раз на колонку, а не isinstance-цепочкой на значение
+COPY_CONVERTERS = {
+    "text": _text_column, "timestamp": _text_column, "date": _text_column,
+    "int": _number_column, "bigint": _number_column, "real": _number_column,
+    "bool": _bool_column, "jsonb": _json_column, "text[]": _array_column, "int[]": _array_column,
+}
+
+
+def columns_to_copy_buffer(arrays, types):
+    converted = [COPY_CONVERTERS[t](values) for values, t in zip(arrays, types)]
+    buf = io.StringIO()
+    if converted and converted[0]:
+        buf.write("\n".join(map("\t".join, zip(*converted))))
+        buf.write("\n")
+    buf.seek(0)
+    return buf
+
+
+def create_staging_table(cur, table, schema="spacex_data"):
+    staging = f"stage_{table}"
+    # TRUNCATE: при загрузке несколькими пакетами в одной транзакции staging остаётся от предыдущего пакета.
+    # CREATE TABLE AS, а не LIKE: NOT NULL целевой таблицы (например, date_utc из PK секционированной) проверяется
+    # при вставке из staging, а строки с NULL ещё можно направить в другую таблицу (replace_from_staging)
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS SELECT * FROM {schema}.{table} WITH NO DATA;
+        TRUNCATE {staging};
+    """)
+    return staging
+
+
+def copy_rows(cur, table, columns, rows):
+    cols = ", ".join(f'"{c}"' for c in columns)
+    cur.copy_expert(f"COPY {table} ({cols}) FROM STDIN", rows_to_copy_buffer(rows))
+
+
+def copy_columns(cur, table, columns, types, arrays):
+    cols = ", ".join(f'"{c}"' for c in columns)
+    cur.copy_expert(f"COPY {table} ({cols}) FROM STDIN", columns_to_copy_buffer(arrays, types))
+
+
+def stage_columns(cur, table, columns, types, arrays, schema="spacex_data"):
+    staging = create_staging_table(cur, table, schema)
+    copy_columns(cur, staging, columns, types, arrays)
+    return staging
+
+
+def stage_rows(cur, table, columns, rows, schema="spacex_data"):
+    staging = create_staging_table(cur, table, schema)
+    copy_rows(cur, staging, columns, rows)
+    return staging
+
+
+def upsert_from_staging(cur, table, staging, columns, key="id", schema="spacex_data"):
+    cols = ", ".join(f'"{c}"' for c in columns)
+    updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in columns if c != key)
+    cur.execute(f"""
+        INSERT INTO {schema}.{table} ({cols})
+        SELECT {cols} FROM {staging}
+        ON CONFLICT ("{key}") DO UPDATE SET {updates};
+    """)
+    return cur.rowcount
+
+
+def replace_from_staging(cur, table, staging, columns, key="id", schema="spacex_data", partition_key=None):
+    # Для секционированных таблиц: ключ секционирования входит в PK, поэтому ON CONFLICT ("{key}") невозможен.
+    # Удаление по ключу и вставка также переносят строку в другую секцию, если изменилась её дата.
+    cur.execute(f"""
+        DELETE FROM {schema}.{table} t
+        USING {staging} s
+        WHERE t."{key}" = s."{key}";
+    """)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    where = ""
+    if partition_key:
+        # Строки с NULL в ключе секционирования не проходят PK: они заменяют свою прежнюю версию
+        # в {table}_null_date, как при секционировании (db/migrations.py), а не роняют весь пакет
+        cur.execute(f"""
+            DELETE FROM {schema}.{table}_null_date t
+            USING {staging} s
+            WHERE t."{key}" = s."{key}";
+        """)
+        cur.execute(f"""
+            INSERT INTO {schema}.{table}_null_date ({cols})
+            SELECT {cols} FROM {staging} WHERE "{partition_key}" IS NULL;
+        """)
+        if cur.rowcount:
+            logger.warning(f"[{table}] {cur.rowcount} записей без {partition_key} записаны в {schema}.{table}_null_date.")
+        where = f' WHERE "{partition_key}" IS NOT NULL'
+    cur.execute(f"INSERT INTO {schema}.{table} ({cols}) SELECT {cols} FROM {staging}{where};")
+    return cur.rowcount
+
+
+def replace_children_from_staging(cur, table, staging, columns, parent_staging,
+                                  parent_key="id", fk="launch_id", schema="spacex_data"):
+    cur.execute(f"""
+        DELETE FROM {schema}.{table} t
+        USING {parent_staging} p
+        WHERE t.{fk} = p.{parent_key};
+    """)
+    cols = ", ".join(f'"{c}"' for c in columns)
+    cur.execute(f"INSERT INTO {schema}.{table} ({cols}) SELECT {cols} FROM {staging};")
+    return cur.rowcount
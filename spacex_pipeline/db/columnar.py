@@ -0,0 +1,117 @@
+import gc
+from contextlib import contextmanager
+from itertools import chain, compress, repeat
+from operator import itemgetter
+
+# Источники строк raw-таблицы относительно документа API:
+#   root     - одна строка на документ;
+#   object   - одна строка на документ из вложенного объекта (отсутствующий объект даёт NULL-колонки);
+#   optional - строка только для документов, где вложенный объект непуст;
+#   explode  - строка на каждый элемент вложенного списка объектов;
+#   values   - строка на каждый элемент вложенного списка скаляров.
+SOURCES = ("root", "object", "optional", "explode", "values")
+
+_EMPTY = {}
+
+
+@contextmanager
+def _gc_paused():
+    # Разбор создаёт сотни тысяч кортежей и списков, и циклический сборщик мусора многократно обходит
+    # весь пакет документов. Создаваемые объекты ацикличны, поэтому на время разбора сборщик можно отключить.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _transpose(objects, keys):
+    # Один проход по объектам на уровень вложенности: itemgetter достаёт все нужные ключи за вызов (в C),
+    # zip(*) разворачивает кортежи в колонки. Объекты без части ключей переводят уровень на dict.get.
+    if not objects:
+        return [()] * len(keys)
+    if len(keys) == 1:
+        return [list(map(dict.get, objects, repeat(keys[0])))]
+    try:
+        rows = list(map(itemgetter(*keys), objects))
+    except KeyError:
+        rows = [tuple(map(obj.get, keys)) for obj in objects]
+    return list(zip(*rows))
+
+
+def extract_paths(objects, paths):
+    # paths - пути через точку ("links", "patch.small"); возвращает {путь: колонка значений}
+    heads = {}
+    for path in paths:
+        head, _, rest = path.partition(".")
+        heads.setdefault(head, set())
+        if rest:
+            heads[head].add(rest)
+
+    columns = dict(zip(heads, _transpose(objects, list(heads))))
+    result = {path: columns[path] for path in heads if path in paths}
+    for head, rests in heads.items():
+        if rests:
+            nested = extract_paths([v or _EMPTY for v in columns[head]], rests)
+            result.update({f"{head}.{rest}": column for rest, column in nested.items()})
+    return result
+
+
+def table_columns(spec):
+    source, path, parent_key, fields = spec
+    return ((parent_key,) if parent_key else ()) + tuple(column for column, _, _ in fields)
+
+
+def table_types(spec):
+    source, path, parent_key, fields = spec
+    return (("text",) if parent_key else ()) + tuple(kind for _, _, kind in fields)
+
+
+def _field_paths(fields):
+    return [field_path for _, field_path, _ in fields]
+
+
+def flatten_columns(documents, tables, key="id"):
+    # documents - пакет документов API одной сущности; tables - {таблица: (source, path, parent_key, fields)},
+    # fields - ((колонка, путь через точку, тип из DDL), ...). Возвращает {таблица: [колонка значений, ...]}.
+    with _gc_paused():
+        return _flatten(list(documents), tables, key)
+
+
+def _flatten(documents, tables, key):
+    root_paths = {key}
+    for table, (source, path, parent_key, fields) in tables.items():
+        if source not in SOURCES:
+            raise ValueError(f"Неизвестный источник строк {source} для {table}")
+        root_paths.update(_field_paths(fields) if source == "root" else [path])
+    root = extract_paths(documents, root_paths)
+    keys = root[key]
+
+    result = {}
+    for table, (source, path, parent_key, fields) in tables.items():
+        if source == "root":
+            arrays = [root[p] for p in _field_paths(fields)]
+        elif source == "values":
+            lists = [v or () for v in root[path]]
+            arrays = [list(chain.from_iterable(lists))]
+        else:
+            nested, parents = root[path], keys
+            if source == "object":
+                objects = [v or _EMPTY for v in nested]
+            elif source == "optional":
+                objects, parents = list(compress(nested, nested)), list(compress(keys, nested))
+            else:
+                lists = [v or () for v in nested]
+                objects = list(chain.from_iterable(lists))
+            columns = extract_paths(objects, _field_paths(fields))
+            arrays = [columns[p] for p in _field_paths(fields)]
+
+        if parent_key:
+            if source in ("explode", "values"):
+                parents = list(chain.from_iterable(map(repeat, keys, map(len, lists))))
+            arrays = [parents] + arrays
+        result[table] = arrays
+
+    return result
@@ -1,15 +1,93 @@
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import extensions
+from contextlib import contextmanager
 from dotenv import load_dotenv
+import logging
 import os
+import threading
+from metrics import InstrumentedCursor
 
 load_dotenv()
 
-def get_connection():
-    conn = psycopg2.connect(
+logger = logging.getLogger(__name__)
+
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "4"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+def connection_params(statement_timeout_ms=STATEMENT_TIMEOUT_MS):
+    params = dict(
         host=os.getenv("DB_HOST"),
         port=os.getenv("DB_PORT"),
         dbname=os.getenv("DB_NAME"),
         user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD")
+        password=os.getenv("DB_PASSWORD"),
+        cursor_factory=InstrumentedCursor
     )
+    if statement_timeout_ms:
+        params["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+    return params
+
+
+def get_connection():
+    conn = psycopg2.connect(**connection_params())
     return conn
+
+
+class ConnectionPool:
+    # ThreadedConnectionPool бросает PoolError при исчерпании; семафор заставляет ждать свободное соединение
+
+    def __init__(self, minconn=POOL_MIN, maxconn=POOL_MAX, statement_timeout_ms=STATEMENT_TIMEOUT_MS):
+        self.maxconn = maxconn
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **connection_params(statement_timeout_ms))
+        self._slots = threading.BoundedSemaphore(maxconn)
+        logger.info(f"Пул соединений создан: min={minconn}, max={maxconn}.")
+
+    @staticmethod
+    def is_healthy(conn):
+        if conn.closed:
+            return False
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        self._slots.acquire()
+        try:
+            conn = self._pool.getconn()
+            if not self.is_healthy(conn):
+                logger.warning("Соединение из пула неработоспособно, открываем новое.")
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        self._pool.closeall()
+        logger.info("Пул соединений закрыт.")
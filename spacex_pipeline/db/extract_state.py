@@ -0,0 +1,75 @@
+import hashlib
+import json
+import logging
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(document):
+    canonical = json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def launch_watermark(launches):
+    marks = [l.get("date_unix") if l.get("date_unix") is not None else l.get("flight_number") for l in launches]
+    marks = [m for m in marks if m is not None]
+    return max(marks) if marks else None
+
+
+def load_hashes(conn, entity):
+    with conn.cursor() as cur:
+        cur.execute("SELECT record_id, content_hash FROM spacex_data.extract_record_state WHERE entity = %s;", (entity,))
+        return dict(cur.fetchall())
+
+
+def load_watermark(conn, entity):
+    with conn.cursor() as cur:
+        cur.execute("SELECT watermark FROM spacex_data.extract_watermarks WHERE entity = %s;", (entity,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
+def detect_changes(conn, entity, records, known=None, fields=None):
+    if known is None:
+        known = load_hashes(conn, entity)
+    changed, hashes = [], {}
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+
+    for record in records or []:
+        record_id = record.get("id")
+        if not record_id:
+            continue
+        digest = content_hash({f: record.get(f) for f in fields} if fields else record)
+        previous = known.get(record_id)
+        if previous == digest:
+            counts["skipped"] += 1
+            continue
+        counts["updated" if previous else "inserted"] += 1
+        changed.append(record)
+        hashes[record_id] = digest
+
+    logger.info(
+        f"[{entity}]: новых {counts['inserted']}, изменённых {counts['updated']}, "
+        f"без изменений {counts['skipped']}."
+    )
+    return changed, hashes, counts
+
+
+def save_state(conn, entity, hashes, watermark=None):
+    with conn.cursor() as cur:
+        if hashes:
+            execute_values(cur, """
+                INSERT INTO spacex_data.extract_record_state (entity, record_id, content_hash)
+                VALUES %s
+                ON CONFLICT (entity, record_id) DO UPDATE SET
+                    content_hash = EXCLUDED.content_hash, updated_at = now();
+            """, [(entity, record_id, digest) for record_id, digest in hashes.items()])
+        if watermark is not None:
+            cur.execute("""
+                INSERT INTO spacex_data.extract_watermarks (entity, watermark) VALUES (%s, %s)
+                ON CONFLICT (entity) DO UPDATE SET
+                    watermark = GREATEST(spacex_data.extract_watermarks.watermark, EXCLUDED.watermark),
+                    updated_at = now();
+            """, (entity, watermark))
+    conn.commit()
@@ -0,0 +1,516 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "spacex_data.schema_migrations"
+# Ключ advisory-блокировки: параллельные процессы пайплайна не применяют миграции одновременно
+MIGRATIONS_LOCK_KEY = 7412301
+# Годовые секции по date_utc; даты вне диапазона попадают в секцию DEFAULT
+PARTITION_YEARS = range(2006, 2041)
+
+# Дочерние таблицы запусков, у которых в базовой схеме был FK launch_id ... ON DELETE CASCADE
+LAUNCH_FK_TABLES = ("raw_spacex_fairings_data", "raw_spacex_links_data", "raw_spacex_failures_data", "raw_spacex_cores_data")
+LAUNCH_CHILD_TABLES = (
+    "raw_spacex_fairings_data", "raw_spacex_links_data", "raw_spacex_failures_data", "raw_spacex_cores_data",
+    "raw_spacex_launch_payloads_data", "raw_spacex_launch_crew_data", "raw_spacex_launch_ships_data",
+    "raw_spacex_launch_capsules_data",
+)
+
+
+def _baseline(cur):
+    # Схема, которую до появления миграций создавали extract_create_table, create_state_tables
+    # и create_transformed_tables; IF NOT EXISTS позволяет принять уже существующие базы как есть
+    cur.execute("""
+        CREATE SCHEMA IF NOT EXISTS spacex_data;
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launches_data (
+            id TEXT PRIMARY KEY, flight_number INTEGER, name TEXT, date_utc TIMESTAMP,
+            date_unix INTEGER, date_local TEXT, date_precision TEXT, static_fire_date_utc TIMESTAMP,
+            static_fire_date_unix INTEGER, net BOOLEAN, "window" INTEGER, rocket TEXT,
+            success BOOLEAN, details TEXT, launchpad TEXT, auto_update BOOLEAN,
+            tbd BOOLEAN, launch_library_id TEXT, upcoming BOOLEAN
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_fairings_data (
+            launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
+            reused BOOLEAN, recovery_attempt BOOLEAN, recovered BOOLEAN
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_links_data (
+            launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
+            patch_small TEXT, patch_large TEXT, webcast TEXT, youtube_id TEXT, article TEXT,
+            wikipedia TEXT, reddit_campaign TEXT, reddit_launch TEXT, reddit_media TEXT, reddit_recovery TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_failures_data (
+            launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
+            time INTEGER, altitude INTEGER, reason TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_cores_data (
+            launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
+            core TEXT, flight INTEGER, gridfins BOOLEAN, legs BOOLEAN, reused BOOLEAN,
+            landing_attempt BOOLEAN, landing_success BOOLEAN, landing_type TEXT, landpad TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_payloads_data (launch_id TEXT, payload_id TEXT);
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_crew_data (launch_id TEXT, crew_id TEXT);
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_ships_data (launch_id TEXT, ship_id TEXT);
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_capsules_data (launch_id TEXT, capsule_id TEXT);
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_rockets_data (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            type TEXT,
+            active BOOLEAN,
+            stages INTEGER,
+            boosters INTEGER,
+            cost_per_launch BIGINT,
+            success_rate_pct REAL,
+            first_flight DATE,
+            country TEXT,
+            company TEXT,
+            height JSONB,
+            diameter JSONB,
+            mass JSONB,
+            payload_weights JSONB,
+            flickr_images TEXT[],
+            wikipedia TEXT,
+            description TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_payloads_data (
+            id TEXT PRIMARY KEY,
+            name TEXT,
+            type TEXT,
+            reused BOOLEAN,
+            launch TEXT,
+            customers TEXT[],
+            norad_ids INTEGER[],
+            nationalities TEXT[],
+            manufacturers TEXT[],
+            mass_kg REAL,
+            mass_lbs REAL,
+            orbit TEXT,
+            reference_system TEXT,
+            regime TEXT,
+            longitude REAL,
+            semi_major_axis_km REAL,
+            eccentricity REAL,
+            periapsis_km REAL,
+            apoapsis_km REAL,
+            inclination_deg REAL,
+            period_min REAL,
+            lifespan_years REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.extract_record_state (
+            entity TEXT NOT NULL,
+            record_id TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (entity, record_id)
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_data.extract_watermarks (
+            entity TEXT PRIMARY KEY,
+            watermark BIGINT,
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+
+        CREATE SCHEMA IF NOT EXISTS spacex_analytics;
+
+        CREATE TABLE IF NOT EXISTS spacex_analytics.fct_launches (
+            id TEXT PRIMARY KEY, flight_number INTEGER, name TEXT, date_utc TIMESTAMP,
+            success BOOLEAN, webcast TEXT, wikipedia TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_analytics.dim_rockets (
+            id TEXT PRIMARY KEY, cost_per_launch NUMERIC, first_flight DATE,
+            height JSONB, diameter JSONB, mass JSONB, payload_weights JSONB
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_analytics.dim_payloads (
+            id TEXT PRIMARY KEY, name TEXT, type TEXT, mass_kg NUMERIC, orbit TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_analytics.transform_cache (
+            target TEXT PRIMARY KEY,
+            fingerprint JSONB NOT NULL,
+            target_rows BIGINT NOT NULL,
+            engine TEXT,
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+    """)
+
+
+def _launch_id_indexes(cur):
+    # Без индекса каждое DELETE ... WHERE launch_id = %s и каждый каскад FK - последовательное сканирование
+    for table in LAUNCH_CHILD_TABLES:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {table}_launch_id_idx ON spacex_data.{table} (launch_id);")
+
+
+def _partition_by_date(cur, schema, table):
+    # Секционированная таблица не может иметь уникальный ключ без колонки секционирования,
+    # поэтому первичный ключ становится (id, date_utc), а внешние ключи на (id) удаляются вместе со старой таблицей
+    # (для raw-запусков их заменяют триггеры миграции 8)
+    old = f"{table}_unpartitioned"
+    cur.execute(f"ALTER TABLE {schema}.{table} RENAME TO {old};")
+    cur.execute("""
+        SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p';
+    """, (f"{schema}.{old}",))
+    for (name,) in cur.fetchall():
+        cur.execute(f"ALTER TABLE {schema}.{old} RENAME CONSTRAINT {name} TO {old}_pkey;")
+
+    cur.execute(f"""
+        CREATE TABLE {schema}.{table} (
+            LIKE {schema}.{old} INCLUDING DEFAULTS,
+            PRIMARY KEY (id, date_utc)
+        ) PARTITION BY RANGE (date_utc);
+    """)
+    for year in PARTITION_YEARS:
+        cur.execute(f"""
+            CREATE TABLE {schema}.{table}_y{year} PARTITION OF {schema}.{table}
+            FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01');
+        """)
+    cur.execute(f"CREATE TABLE {schema}.{table}_default PARTITION OF {schema}.{table} DEFAULT;")
+
+    # date_utc входит в первичный ключ и не может быть NULL: такие строки не теряются, а переносятся
+    # в {table}_null_date для ручного разбора, иначе миграция упала бы на первой из них
+    cur.execute(f"SELECT count(*) FROM {schema}.{old} WHERE date_utc IS NULL;")
+    undated = cur.fetchone()[0]
+    if undated:
+        cur.execute(f"""
+            CREATE TABLE {schema}.{table}_null_date AS SELECT * FROM {schema}.{old} WHERE date_utc IS NULL;
+        """)
+        logger.warning(f"[{table}] {undated} строк без date_utc перенесены в {schema}.{table}_null_date.")
+
+    cur.execute(f"INSERT INTO {schema}.{table} SELECT * FROM {schema}.{old} WHERE date_utc IS NOT NULL;")
+    cur.execute(f"DROP TABLE {schema}.{old} CASCADE;")
+
+
+def _partition_raw_launches(cur):
+    _partition_by_date(cur, "spacex_data", "raw_spacex_launches_data")
+
+
+def _partition_fct_launches(cur):
+    _partition_by_date(cur, "spacex_analytics", "fct_launches")
+
+
+def _drop_legacy_version_table(cur):
+    # Версию схемы до миграций вёл pipeline.ensure_schema; теперь её заменяет schema_migrations
+    cur.execute("DROP TABLE IF EXISTS spacex_data.pipeline_schema_version;")
+
+
+def _quarantine_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS spacex_data.load_quarantine (
+            id BIGSERIAL PRIMARY KEY,
+            entity TEXT NOT NULL,
+            record_id TEXT,
+            record TEXT NOT NULL,
+            error TEXT NOT NULL,
+            sqlstate TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS load_quarantine_entity_record_idx
+            ON spacex_data.load_quarantine (entity, record_id);
+    """)
+
+
+def _aggregate_tables(cur):
+    # Сводные таблицы и журналы дельт (db/aggregates.py). Триггеры уровня оператора с переходными таблицами
+    # пишут одну строку на ключ за оператор: минус вклад старых строк, плюс вклад новых.
+    # Выражения ключей и мер совпадают с AGGREGATES на момент этой миграции; их изменение - новая миграция.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS spacex_analytics.agg_state (
+            name TEXT PRIMARY KEY,
+            needs_rebuild BOOLEAN NOT NULL DEFAULT true,
+            refreshed_at TIMESTAMP
+        );
+        INSERT INTO spacex_analytics.agg_state (name) VALUES ('launches'), ('payloads') ON CONFLICT (name) DO NOTHING;
+
+        CREATE TABLE IF NOT EXISTS spacex_analytics.agg_launches_rocket_year (
+            rocket TEXT NOT NULL, year INTEGER NOT NULL, launches BIGINT NOT NULL, successes BIGINT NOT NULL,
+            failures BIGINT NOT NULL, upcoming BIGINT NOT NULL,
+            PRIMARY KEY (rocket, year)
+        );
+        CREATE TABLE IF NOT EXISTS spacex_data.agg_delta_launches (
+            rocket TEXT NOT NULL, year INTEGER NOT NULL, launches BIGINT NOT NULL, successes BIGINT NOT NULL,
+            failures BIGINT NOT NULL, upcoming BIGINT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS spacex_analytics.agg_payloads_orbit (
+            orbit TEXT NOT NULL, payloads BIGINT NOT NULL, mass_kg NUMERIC NOT NULL, with_mass BIGINT NOT NULL,
+            PRIMARY KEY (orbit)
+        );
+        CREATE TABLE IF NOT EXISTS spacex_data.agg_delta_payloads (
+            orbit TEXT NOT NULL, payloads BIGINT NOT NULL, mass_kg NUMERIC NOT NULL, with_mass BIGINT NOT NULL
+        );
+
+        -- TRUNCATE не даёт удалённых строк: сводная таблица пересобирается целиком при следующем обновлении
+        CREATE OR REPLACE FUNCTION spacex_data.agg_invalidate() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE spacex_analytics.agg_state SET needs_rebuild = true WHERE name = TG_ARGV[0];
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION spacex_data.agg_capture_launches() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                INSERT INTO spacex_data.agg_delta_launches
+                SELECT coalesce(rocket, 'unknown'), extract(year FROM date_utc)::int,
+                       -(count(*)), -(count(*) FILTER (WHERE success)), -(count(*) FILTER (WHERE NOT success)),
+                       -(count(*) FILTER (WHERE upcoming))
+                FROM old_rows GROUP BY 1, 2;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO spacex_data.agg_delta_launches
+                SELECT coalesce(rocket, 'unknown'), extract(year FROM date_utc)::int,
+                       (count(*)), (count(*) FILTER (WHERE success)), (count(*) FILTER (WHERE NOT success)),
+                       (count(*) FILTER (WHERE upcoming))
+                FROM new_rows GROUP BY 1, 2;
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION spacex_data.agg_capture_payloads() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                INSERT INTO spacex_data.agg_delta_payloads
+                SELECT coalesce(orbit, 'unknown'),
+                       -(count(*)), -(coalesce(sum(mass_kg::numeric), 0)), -(count(mass_kg))
+                FROM old_rows GROUP BY 1;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO spacex_data.agg_delta_payloads
+                SELECT coalesce(orbit, 'unknown'),
+                       (count(*)), (coalesce(sum(mass_kg::numeric), 0)), (count(mass_kg))
+                FROM new_rows GROUP BY 1;
+            END IF;
+            RETURN NULL;
+        END $$;
+    """)
+    for name, source in (("launches", "raw_spacex_launches_data"), ("payloads", "raw_spacex_payloads_data")):
+        cur.execute(f"""
+            DROP TRIGGER IF EXISTS agg_{name}_insert ON spacex_data.{source};
+            DROP TRIGGER IF EXISTS agg_{name}_update ON spacex_data.{source};
+            DROP TRIGGER IF EXISTS agg_{name}_delete ON spacex_data.{source};
+            DROP TRIGGER IF EXISTS agg_{name}_truncate ON spacex_data.{source};
+            CREATE TRIGGER agg_{name}_insert AFTER INSERT ON spacex_data.{source}
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.agg_capture_{name}();
+            CREATE TRIGGER agg_{name}_update AFTER UPDATE ON spacex_data.{source}
+                REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.agg_capture_{name}();
+            CREATE TRIGGER agg_{name}_delete AFTER DELETE ON spacex_data.{source}
+                REFERENCING OLD TABLE AS old_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.agg_capture_{name}();
+            CREATE TRIGGER agg_{name}_truncate AFTER TRUNCATE ON spacex_data.{source}
+                FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.agg_invalidate('{name}');
+        """)
+
+    cur.execute("""
+        CREATE OR REPLACE VIEW spacex_analytics.launch_success_by_rocket_year AS
+        SELECT a.rocket, r.name AS rocket_name, a.year, a.launches, a.successes, a.failures, a.upcoming,
+               round(a.successes::numeric / nullif(a.successes + a.failures, 0), 4) AS success_rate
+        FROM spacex_analytics.agg_launches_rocket_year a
+        LEFT JOIN spacex_data.raw_spacex_rockets_data r ON r.id = a.rocket;
+
+        CREATE OR REPLACE VIEW spacex_analytics.payload_mass_by_orbit AS
+        SELECT orbit, payloads, mass_kg, with_mass, round(mass_kg / nullif(with_mass, 0), 2) AS avg_mass_kg
+        FROM spacex_analytics.agg_payloads_orbit;
+    """)
+
+
+def _launch_child_integrity(cur):
+    # Замена внешних ключей, удалённых миграцией 3: FK на секционированную таблицу должен ссылаться на весь
+    # ключ (id, date_utc), а date_utc в дочерних таблицах нет. Триггеры уровня оператора по переходным таблицам:
+    # удаление запуска удаляет его дочерние строки (как ON DELETE CASCADE), если запуска с этим id больше нет,
+    # а строка с несуществующим launch_id отклоняется с SQLSTATE 23503, как нарушение FK.
+    # Блокировку KEY SHARE на родителя, как FK, проверка не берёт: параллельные загрузки пишут разные запуски.
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION spacex_data.launch_children_cascade() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            child TEXT;
+        BEGIN
+            FOREACH child IN ARRAY TG_ARGV LOOP
+                EXECUTE format(
+                    'DELETE FROM spacex_data.%I c USING (SELECT DISTINCT id FROM old_rows) o
+                     WHERE c.launch_id = o.id
+                       AND NOT EXISTS (SELECT 1 FROM spacex_data.raw_spacex_launches_data l WHERE l.id = o.id)',
+                    child
+                );
+            END LOOP;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION spacex_data.launch_child_check() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            missing TEXT;
+        BEGIN
+            SELECT n.launch_id INTO missing FROM new_rows n
+            WHERE n.launch_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM spacex_data.raw_spacex_launches_data l WHERE l.id = n.launch_id)
+            LIMIT 1;
+            IF FOUND THEN
+                RAISE EXCEPTION 'запуска % нет в raw_spacex_launches_data (%.launch_id)', missing, TG_TABLE_NAME
+                    USING ERRCODE = 'foreign_key_violation';
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS launch_children_cascade ON spacex_data.raw_spacex_launches_data;
+        CREATE TRIGGER launch_children_cascade AFTER DELETE ON spacex_data.raw_spacex_launches_data
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.launch_children_cascade(
+                'raw_spacex_fairings_data', 'raw_spacex_links_data', 'raw_spacex_failures_data', 'raw_spacex_cores_data'
+            );
+    """)
+    for table in LAUNCH_FK_TABLES:
+        cur.execute(f"""
+            DROP TRIGGER IF EXISTS {table}_launch_check_insert ON spacex_data.{table};
+            DROP TRIGGER IF EXISTS {table}_launch_check_update ON spacex_data.{table};
+            CREATE TRIGGER {table}_launch_check_insert AFTER INSERT ON spacex_data.{table}
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.launch_child_check();
+            CREATE TRIGGER {table}_launch_check_update AFTER UPDATE ON spacex_data.{table}
+                REFERENCING NEW TABLE AS new_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.launch_child_check();
+        """)
+        # Проверка не ретроактивна (как NOT VALID у FK): уже существующие сироты - например, дочерние строки
+        # запусков, перенесённых в raw_spacex_launches_data_null_date, - только сообщаются
+        cur.execute(f"""
+            SELECT count(*) FROM spacex_data.{table} c
+            WHERE c.launch_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM spacex_data.raw_spacex_launches_data l WHERE l.id = c.launch_id);
+        """)
+        orphans = cur.fetchone()[0]
+        if orphans:
+            logger.warning(f"[{table}] {orphans} строк ссылаются на отсутствующие запуски.")
+
+
+def _undated_launches_table(cur):
+    # Запуск без date_utc не может попасть в секционированную таблицу (date_utc входит в PK). Миграция 3
+    # переносила такие строки в raw_spacex_launches_data_null_date только однажды; теперь загрузчики пишут туда
+    # же при каждой загрузке, поэтому таблица нужна всегда. Её id считаются существующими запусками для проверки
+    # launch_id, а удаление из неё, как и из основной таблицы, удаляет дочерние строки.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launches_data_null_date
+            (LIKE spacex_data.raw_spacex_launches_data INCLUDING DEFAULTS);
+        -- LIKE копирует NOT NULL колонок первичного ключа (id, date_utc)
+        ALTER TABLE spacex_data.raw_spacex_launches_data_null_date ALTER COLUMN date_utc DROP NOT NULL;
+        CREATE INDEX IF NOT EXISTS raw_spacex_launches_data_null_date_id_idx
+            ON spacex_data.raw_spacex_launches_data_null_date (id);
+
+        CREATE OR REPLACE FUNCTION spacex_data.launch_children_cascade() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            child TEXT;
+        BEGIN
+            -- Триггер уровня оператора срабатывает и без удалённых строк (построчная загрузка удаляет по id)
+            IF NOT EXISTS (SELECT 1 FROM old_rows) THEN
+                RETURN NULL;
+            END IF;
+            FOREACH child IN ARRAY TG_ARGV LOOP
+                EXECUTE format(
+                    'DELETE FROM spacex_data.%I c USING (SELECT DISTINCT id FROM old_rows) o
+                     WHERE c.launch_id = o.id
+                       AND NOT EXISTS (SELECT 1 FROM spacex_data.raw_spacex_launches_data l WHERE l.id = o.id)
+                       AND NOT EXISTS (SELECT 1 FROM spacex_data.raw_spacex_launches_data_null_date u WHERE u.id = o.id)',
+                    child
+                );
+            END LOOP;
+            RETURN NULL;
+        END $$;
+
+        CREATE OR REPLACE FUNCTION spacex_data.launch_child_check() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            missing TEXT;
+        BEGIN
+            SELECT n.launch_id INTO missing FROM new_rows n
+            WHERE n.launch_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM spacex_data.raw_spacex_launches_data l WHERE l.id = n.launch_id)
+              AND NOT EXISTS (SELECT 1 FROM spacex_data.raw_spacex_launches_data_null_date u WHERE u.id = n.launch_id)
+            LIMIT 1;
+            IF FOUND THEN
+                RAISE EXCEPTION 'запуска % нет в raw_spacex_launches_data (%.launch_id)', missing, TG_TABLE_NAME
+                    USING ERRCODE = 'foreign_key_violation';
+            END IF;
+            RETURN NULL;
+        END $$;
+
+        DROP TRIGGER IF EXISTS launch_children_cascade ON spacex_data.raw_spacex_launches_data_null_date;
+        CREATE TRIGGER launch_children_cascade AFTER DELETE ON spacex_data.raw_spacex_launches_data_null_date
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION spacex_data.launch_children_cascade(
+                'raw_spacex_fairings_data', 'raw_spacex_links_data', 'raw_spacex_failures_data', 'raw_spacex_cores_data'
+            );
+    """)
+
+
+# (версия, описание, функция(cur)); версии только добавляются в конец, применённые миграции не меняются
+MIGRATIONS = (
+    (1, "базовая схема spacex_data и spacex_analytics", _baseline),
+    (2, "индексы launch_id на дочерних таблицах запусков", _launch_id_indexes),
+    (3, "секционирование raw_spacex_launches_data по date_utc", _partition_raw_launches),
+    (4, "секционирование fct_launches по date_utc", _partition_fct_launches),
+    (5, "удаление pipeline_schema_version", _drop_legacy_version_table),
+    (6, "карантин записей, отклонённых при загрузке", _quarantine_table),
+    (7, "сводные таблицы по ракетам, годам и орбитам с журналом дельт", _aggregate_tables),
+    (8, "каскадное удаление и проверка launch_id вместо внешних ключей на запуски", _launch_child_integrity),
+    (9, "запуски без date_utc в raw_spacex_launches_data_null_date при загрузке", _undated_launches_table),
+)
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (MIGRATIONS_TABLE,))
+        version = 0
+        if cur.fetchone()[0]:
+            cur.execute(f"SELECT coalesce(max(version), 0) FROM {MIGRATIONS_TABLE};")
+            version = cur.fetchone()[0]
+    conn.rollback()
+    return version
+
+
+def migrate(conn, target=LATEST_VERSION):
+    # Актуальная схема - один SELECT без DDL; иначе каждая миграция применяется в своей транзакции
+    version = current_version(conn)
+    if version >= target:
+        logger.info(f"Схема актуальна (версия {version}), DDL пропущен.")
+        return version
+
+    with conn.cursor() as cur:
+        try:
+            cur.execute("CREATE SCHEMA IF NOT EXISTS spacex_data;")
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT now()
+                );
+            """)
+            conn.commit()
+
+            for number, description, apply in MIGRATIONS:
+                if number > target:
+                    break
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATIONS_LOCK_KEY,))
+                cur.execute(f"SELECT 1 FROM {MIGRATIONS_TABLE} WHERE version = %s;", (number,))
+                if cur.fetchone():
+                    conn.commit()
+                    continue
+                logger.info(f"Применение миграции {number}: {description}...")
+                apply(cur)
+                cur.execute(f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (%s, %s);",
+                            (number, description))
+                conn.commit()
+                version = number
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Ошибка при применении миграций: {e}")
+            raise
+
+    logger.info(f"Схема обновлена до версии {version}.")
+    return version
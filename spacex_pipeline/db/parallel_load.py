@@ -0,0 +1,127 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from db.connection import get_connection
+from metrics import METRICS, record, stage
+
+logger = logging.getLogger(__name__)
+
+LOAD_WORKERS = int(os.getenv("SPACEX_LOAD_WORKERS", str(os.cpu_count() or 1)))
+PARTITION_STRATEGIES = ("hash", "date")
+# Меньшие пакеты дешевле загрузить в текущем процессе, чем сериализовать в воркеры
+MIN_PARTITION_ROWS = int(os.getenv("SPACEX_MIN_PARTITION_ROWS", "500"))
+PARTITION_STAGE = "load_partition"
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+_worker_conn = None
+
+
+def partition_by_hash(records, partitions, key="id"):
+    # crc32 вместо hash(): одинаковое разбиение в любом процессе и при любом PYTHONHASHSEED
+    buckets = [[] for _ in range(partitions)]
+    for record in records:
+        buckets[zlib.crc32(str(record[key]).encode()) % partitions].append(record)
+    return [bucket for bucket in buckets if bucket]
+
+
+def partition_by_date(records, partitions, date_key="date_unix", key="id"):
+    # Непрерывные диапазоны дат примерно равного размера; записи без даты идут в первый диапазон
+    ordered = sorted(records, key=lambda r: (r.get(date_key) is not None, r.get(date_key) or 0, r[key]))
+    size = -(-len(ordered) // partitions)
+    return [ordered[i:i + size] for i in range(0, len(ordered), size)]
+
+
+def partition_records(records, partitions, strategy="hash"):
+    if strategy not in PARTITION_STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия разбиения: {strategy}")
+    if strategy == "date" and any("date_unix" in r for r in records):
+        return partition_by_date(records, partitions)
+    return partition_by_hash(records, partitions)
+
+
+def _init_worker():
+    # Одно соединение на процесс на всё время жизни пула
+    global _worker_conn
+    _worker_conn = get_connection()
+
+
+def _load_partition(index, loader, records):
+    # Ошибка раздела возвращается как статус, а не исключение: вместе с ней родителю уходят метрики воркера
+    started = time.perf_counter()
+    result = {"partition": index, "pid": os.getpid(), "rows": len(records), "status": "committed", "counts": {}}
+    try:
+        with stage(PARTITION_STAGE):
+            result["counts"] = loader(_worker_conn, records) or {}
+    except Exception as e:
+        result.update(status="failed", error=repr(e))
+    result["seconds"] = time.perf_counter() - started
+    result["stages"] = METRICS.drain()
+    return result
+
+
+def get_executor(workers):
+    # Пул общий для всех сущностей: pipeline.py грузит их из нескольких потоков одновременно
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers:
+            _shutdown()
+            # spawn: pipeline.py вызывает загрузку из потоков, а fork многопоточного процесса небезопасен
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+            )
+            _executor_workers = workers
+            logger.info(f"Пул процессов загрузки запущен: {workers} воркеров.")
+        return _executor
+
+
+def _shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+        logger.info("Пул процессов загрузки остановлен.")
+
+
+def shutdown_workers():
+    with _executor_lock:
+        _shutdown()
+
+
+def run_partitions(loader, partitions, workers):
+    # Каждый раздел фиксируется отдельной транзакцией в своём процессе, поэтому загрузка не атомарна:
+    # при ошибке одного раздела остальные уже зафиксированы. Дожидаемся всех разделов и возвращаем статус
+    # каждого; повторная загрузка тех же записей идемпотентна (bulk-загрузчики заменяют строки по id).
+    # Двухфазный commit (PREPARE TRANSACTION) не используется: он требует max_prepared_transactions > 0.
+    executor = get_executor(workers)
+    futures = [executor.submit(_load_partition, index, loader, partition) for index, partition in enumerate(partitions)]
+    results, broken = [], False
+    for index, future in enumerate(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            # Воркер упал целиком (BrokenProcessPool): метрики раздела потеряны, транзакция откатана сервером
+            broken = True
+            result = {"partition": index, "pid": None, "rows": len(partitions[index]), "status": "failed",
+                      "error": repr(e), "counts": {}, "seconds": 0.0, "stages": {}}
+        stages = result.pop("stages")
+        # Счётчики раздела добавляются к этапам, открытым в вызывающем потоке (load_<сущность> и т.д.),
+        # а этапы воркера (insert_launches_bulk, ...) - в отчёт процесса
+        record(**stages.get(PARTITION_STAGE, {}).get("counters", {}))
+        METRICS.merge(stages)
+        if result["status"] == "committed":
+            logger.info(f"Раздел {index} из {result['rows']} записей загружен процессом {result['pid']} "
+                        f"за {result['seconds']:.3f} с.")
+        else:
+            logger.error(f"Раздел {index} из {result['rows']} записей не загружен: {result['error']}")
+        results.append(result)
+    if broken:
+        # Сломанный пул не принимает задачи: следующая загрузка запустит новый
+        shutdown_workers()
+    return results
@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+import psycopg2
+
+from metrics import record
+
+logger = logging.getLogger(__name__)
+
+ISOLATION_BATCH_SIZE = int(os.getenv("SPACEX_ISOLATION_BATCH_SIZE", "5000"))
+# Если в карантин уходит больше этой доли записей, ошибка скорее системная (схема, код), а не в данных:
+# загрузка откатывается целиком, чтобы не отправить в карантин весь поток
+QUARANTINE_MAX_RATIO = float(os.getenv("SPACEX_QUARANTINE_MAX_RATIO", "0.5"))
+# Ошибки соединения и отмена по statement_timeout не относятся к конкретной записи: их не бисектим
+FATAL_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def quarantine_record(cur, entity, document, error):
+    # Запись хранится JSON-текстом: JSONB не принимает \u0000, а такие записи как раз попадают в карантин
+    cur.execute("""
+        INSERT INTO spacex_data.load_quarantine (entity, record_id, record, error, sqlstate)
+        VALUES (%s, %s, %s, %s, %s);
+    """, (
+        entity, str(document.get("id")) if isinstance(document, dict) else None,
+        json.dumps(document, ensure_ascii=False, default=str), str(error).strip(), getattr(error, "pgcode", None)
+    ))
+    record(quarantined=1)
+    logger.warning(f"[{entity}] запись {document.get('id') if isinstance(document, dict) else '?'} "
+                   f"отправлена в карантин: {str(error).strip().splitlines()[0] if str(error).strip() else error!r}")
+
+
+@contextmanager
+def savepoint(cur, name="record"):
+    cur.execute(f"SAVEPOINT {name};")
+    try:
+        yield
+    except Exception:
+        if not cur.connection.closed:
+            cur.execute(f"ROLLBACK TO SAVEPOINT {name}; RELEASE SAVEPOINT {name};")
+        raise
+    cur.execute(f"RELEASE SAVEPOINT {name};")
+
+
+def _write_or_bisect(cur, entity, records, write, stats):
+    # Пакет пишется под savepoint; при ошибке откатывается только он и делится пополам, пока ошибка
+    # не сузится до одной записи: на каждую плохую запись приходится O(log n) повторных попыток
+    try:
+        with savepoint(cur, "batch"):
+            write(cur, entity, records)
+        stats["written"] += len(records)
+        return
+    except FATAL_ERRORS:
+        raise
+    except Exception as e:
+        stats["bisections"] += 1
+        if len(records) == 1:
+            quarantine_record(cur, entity, records[0], e)
+            stats["quarantined"].append(records[0].get("id") if isinstance(records[0], dict) else None)
+            return
+    middle = len(records) // 2
+    _write_or_bisect(cur, entity, records[:middle], write, stats)
+    _write_or_bisect(cur, entity, records[middle:], write, stats)
+
+
+def _last_error(cur, entity):
+    cur.execute("""
+        SELECT error FROM spacex_data.load_quarantine WHERE entity = %s ORDER BY id DESC LIMIT 1;
+    """, (entity,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def write_isolated(conn, entity, records, write, batch_size=ISOLATION_BATCH_SIZE, max_ratio=QUARANTINE_MAX_RATIO):
+    # write(cur, entity, records) пишет пакет без commit; хорошие записи фиксируются одной транзакцией
+    stats = {"written": 0, "bisections": 0, "quarantined": []}
+    with conn.cursor() as cur:
+        try:
+            for start in range(0, len(records), batch_size):
+                _write_or_bisect(cur, entity, records[start:start + batch_size], write, stats)
+            if len(stats["quarantined"]) > max(1, max_ratio * len(records)):
+                raise RuntimeError(
+                    f"в карантин попало бы {len(stats['quarantined'])} из {len(records)} записей, "
+                    f"последняя ошибка: {_last_error(cur, entity)}"
+                )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"[{entity}] ошибка при загрузке с изоляцией ошибок: {e}")
+            raise
+    if stats["quarantined"]:
+        logger.warning(
+            f"[{entity}] записано {stats['written']}, в карантине {len(stats['quarantined'])}, "
+            f"повторных попыток пакетов: {stats['bisections']}."
+        )
+    return stats
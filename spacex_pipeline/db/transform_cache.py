@@ -0,0 +1,75 @@
+import hashlib
+import logging
+
+from psycopg2.extras import Json
+
+logger = logging.getLogger(__name__)
+
+
+def source_fingerprint(cur, table, schema="spacex_data"):
+    # Число строк, максимальный xmin (сдвигается при любой вставке/обновлении) и сумма хешей ctid: любая
+    # запись или удаление меняет набор физических версий строк. Хеш ctid в ~6 раз дешевле хеша содержимого
+    # строки; VACUUM FULL/CLUSTER переставляют ctid и дают лишний, но безопасный промах.
+    cur.execute(f"""
+        SELECT count(*), coalesce(max(xmin::text::bigint), 0), coalesce(sum(hashtextextended(ctid::text, 0)), 0)
+        FROM {schema}.{table};
+    """)
+    count, marker, checksum = cur.fetchone()
+    return [count, marker, str(checksum)]
+
+
+def target_fingerprint(cur, sources, definition):
+    # definition - текст трансформации: её изменение тоже инвалидирует кэш
+    fingerprint = {table: source_fingerprint(cur, table) for table in sources}
+    fingerprint["__transform__"] = hashlib.md5(definition.encode()).hexdigest()
+    return fingerprint
+
+
+def _target_rows(cur, target):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (f"spacex_analytics.{target}",))
+    if not cur.fetchone()[0]:
+        return None
+    cur.execute(f"SELECT count(*) FROM spacex_analytics.{target};")
+    return cur.fetchone()[0]
+
+
+def plan_targets(conn, target_sources, definitions, force=False):
+    # Возвращает (цели к пересчёту, их отпечатки, отчёт {цель: hit|miss|forced})
+    with conn.cursor() as cur:
+        cur.execute("SELECT target, fingerprint, target_rows FROM spacex_analytics.transform_cache;")
+        cached = {target: (fingerprint, rows) for target, fingerprint, rows in cur.fetchall()}
+
+        stale, fingerprints, report = [], {}, {}
+        for target, sources in target_sources.items():
+            fingerprints[target] = target_fingerprint(cur, sources, definitions[target])
+            if force:
+                report[target] = "forced"
+            elif target in cached and cached[target][0] == fingerprints[target] \
+                    and cached[target][1] == _target_rows(cur, target):
+                report[target] = "hit"
+                continue
+            else:
+                report[target] = "miss"
+            stale.append(target)
+    conn.commit()
+
+    for target, outcome in report.items():
+        logger.info(f"[кэш трансформаций] {target}: {outcome}.")
+    hits = sum(outcome == "hit" for outcome in report.values())
+    logger.info(f"[кэш трансформаций] попаданий {hits} из {len(report)}, к пересчёту: {', '.join(stale) or 'нет'}.")
+    return stale, fingerprints, report
+
+
+def save_fingerprints(conn, fingerprints, engine):
+    # Отпечатки снимаются до трансформации: изменения источников во время прогона дадут промах в следующий раз
+    with conn.cursor() as cur:
+        for target, fingerprint in fingerprints.items():
+            rows = _target_rows(cur, target) or 0
+            cur.execute("""
+                INSERT INTO spacex_analytics.transform_cache (target, fingerprint, target_rows, engine, updated_at)
+                VALUES (%s, %s, %s, %s, now())
+                ON CONFLICT (target) DO UPDATE SET
+                    fingerprint = EXCLUDED.fingerprint, target_rows = EXCLUDED.target_rows,
+                    engine = EXCLUDED.engine, updated_at = EXCLUDED.updated_at;
+            """, (target, Json(fingerprint), rows, engine))
+    conn.commit()
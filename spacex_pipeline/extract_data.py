@@ -1,119 +1,154 @@
 import psycopg2
 from db.connection import get_connection
+from db.bulk_load import stage_columns, upsert_from_staging, replace_from_staging, replace_children_from_staging
+from db.columnar import flatten_columns, table_columns, table_types
+from db.parallel_load import (
+    partition_records, run_partitions, shutdown_workers, LOAD_WORKERS, MIN_PARTITION_ROWS, PARTITION_STRATEGIES
+)
+from db.extract_state import detect_changes, save_state, load_hashes, load_watermark, launch_watermark
+from db.migrations import migrate
+from db.quarantine import quarantine_record, write_isolated, FATAL_ERRORS, ISOLATION_BATCH_SIZE
 from api.get_data import fetch_data
+from api.cache import ResponseCache
+from api.query import stream_collection, QUERY_PAGE_SIZE
+from api.landing import land_sources, replay_sources, LANDING_DIR, LANDING_FORMATS
+import metrics
+from metrics import instrument, rows_arg
+from functools import partial
+import argparse
 import logging
 import json 
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-def extract_create_table(conn):
-    with conn.cursor() as cur:
-        try:
-            cur.execute("CREATE SCHEMA IF NOT EXISTS spacex_data;")
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launches_data (
-                    id TEXT PRIMARY KEY, flight_number INTEGER, name TEXT, date_utc TIMESTAMP,
-                    date_unix INTEGER, date_local TEXT, date_precision TEXT, static_fire_date_utc TIMESTAMP,
-                    static_fire_date_unix INTEGER, net BOOLEAN, "window" INTEGER, rocket TEXT,
-                    success BOOLEAN, details TEXT, launchpad TEXT, auto_update BOOLEAN,
-                    tbd BOOLEAN, launch_library_id TEXT, upcoming BOOLEAN
-                );
-                
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_fairings_data (
-                    launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
-                    reused BOOLEAN, recovery_attempt BOOLEAN, recovered BOOLEAN
-                );
-                
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_links_data (
-                    launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
-                    patch_small TEXT, patch_large TEXT, webcast TEXT, youtube_id TEXT, article TEXT,
-                    wikipedia TEXT, reddit_campaign TEXT, reddit_launch TEXT, reddit_media TEXT, reddit_recovery TEXT
-                );
-                        
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_failures_data (
-                    launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
-                    time INTEGER, altitude INTEGER, reason TEXT
-                );
-                        
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_cores_data (
-                    launch_id TEXT REFERENCES spacex_data.raw_spacex_launches_data(id) ON DELETE CASCADE,
-                    core TEXT, flight INTEGER, gridfins BOOLEAN, legs BOOLEAN, reused BOOLEAN,
-                    landing_attempt BOOLEAN, landing_success BOOLEAN, landing_type TEXT, landpad TEXT
-                );
-                
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_payloads_data (launch_id TEXT, payload_id TEXT);
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_crew_data (launch_id TEXT, crew_id TEXT);
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_ships_data (launch_id TEXT, ship_id TEXT);
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_launch_capsules_data (launch_id TEXT, capsule_id TEXT);
-            """)
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_rockets_data (
-                    id TEXT PRIMARY KEY,
-                    name TEXT,
-                    type TEXT,
-                    active BOOLEAN,
-                    stages INTEGER,
-                    boosters INTEGER,
-                    cost_per_launch BIGINT,
-                    success_rate_pct REAL,
-                    first_flight DATE,
-                    country TEXT,
-                    company TEXT,
-                    height JSONB,
-                    diameter JSONB,
-                    mass JSONB,
-                    payload_weights JSONB,
-                    flickr_images TEXT[],
-                    wikipedia TEXT,
-                    description TEXT
-                );
-            """)
-
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS spacex_data.raw_spacex_payloads_data (
-                    id TEXT PRIMARY KEY,
-                    name TEXT,
-                    type TEXT,
-                    reused BOOLEAN,
-                    launch TEXT,
-                    customers TEXT[],
-                    norad_ids INTEGER[],
-                    nationalities TEXT[],
-                    manufacturers TEXT[],
-                    mass_kg REAL,
-                    mass_lbs REAL,
-                    orbit TEXT,
-                    reference_system TEXT,
-                    regime TEXT,
-                    longitude REAL,
-                    semi_major_axis_km REAL,
-                    eccentricity REAL,
-                    periapsis_km REAL,
-                    apoapsis_km REAL,
-                    inclination_deg REAL,
-                    period_min REAL,
-                    lifespan_years REAL
-                );
-            """)
+LOAD_MODES = ("row", "bulk", "parallel", "isolated")
+ENTITIES = ("rockets", "payloads", "launches")
 
-            conn.commit()
-            logger.info("Все таблицы подготовлены к работе.")
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"Ошибка при подготовке таблиц: {e}")
+ROCKET_COLUMNS = (
+    "id", "name", "type", "active", "stages", "boosters", "cost_per_launch", "success_rate_pct",
+    "first_flight", "country", "company", "height", "diameter", "mass", "payload_weights",
+    "flickr_images", "wikipedia", "description"
+)
+
+PAYLOAD_COLUMNS = (
+    "id", "name", "type", "reused", "launch", "customers", "norad_ids", "nationalities",
+    "manufacturers", "mass_kg", "mass_lbs", "orbit", "reference_system", "regime",
+    "longitude", "semi_major_axis_km", "eccentricity", "periapsis_km",
+    "apoapsis_km", "inclination_deg", "period_min", "lifespan_years"
+)
+
+LAUNCH_COLUMNS = (
+    "id", "flight_number", "name", "date_utc", "date_unix", "date_local", "date_precision",
+    "static_fire_date_utc", "static_fire_date_unix", "net", "window", "rocket",
+    "success", "details", "launchpad", "auto_update", "tbd", "launch_library_id", "upcoming"
+)
+
+LAUNCH_CHILD_COLUMNS = {
+    "raw_spacex_fairings_data": ("launch_id", "reused", "recovery_attempt", "recovered"),
+    "raw_spacex_links_data": (
+        "launch_id", "patch_small", "patch_large", "webcast", "youtube_id", "article",
+        "wikipedia", "reddit_campaign", "reddit_launch", "reddit_media", "reddit_recovery"
+    ),
+    "raw_spacex_failures_data": ("launch_id", "time", "altitude", "reason"),
+    "raw_spacex_cores_data": (
+        "launch_id", "core", "flight", "gridfins", "legs", "reused",
+        "landing_attempt", "landing_success", "landing_type", "landpad"
+    ),
+    "raw_spacex_launch_payloads_data": ("launch_id", "payload_id"),
+    "raw_spacex_launch_crew_data": ("launch_id", "crew_id"),
+    "raw_spacex_launch_ships_data": ("launch_id", "ship_id"),
+    "raw_spacex_launch_capsules_data": ("launch_id", "capsule_id"),
+}
 
+# Поля, которые реально сохраняются в raw-таблицах; используются как проекция в /v4/<collection>/query
+QUERY_FIELDS = {
+    "rockets": ROCKET_COLUMNS,
+    "payloads": PAYLOAD_COLUMNS,
+    "launches": LAUNCH_COLUMNS + (
+        "fairings", "links", "failures", "cores", "payloads", "crew", "ships", "capsules"
+    ),
+}
 
+# Декларативная схема raw-таблиц (повторяет DDL в db/migrations.py) для колоночного разбора пакетов:
+# таблица -> (источник строк, путь к вложенному объекту/списку, колонка ключа родителя, ((колонка, путь, тип), ...))
+RAW_FIELD_MAP = {
+    "rockets": {
+        "raw_spacex_rockets_data": ("root", None, None, (
+            ("id", "id", "text"), ("name", "name", "text"), ("type", "type", "text"), ("active", "active", "bool"),
+            ("stages", "stages", "int"), ("boosters", "boosters", "int"),
+            ("cost_per_launch", "cost_per_launch", "bigint"), ("success_rate_pct", "success_rate_pct", "real"),
+            ("first_flight", "first_flight", "date"), ("country", "country", "text"),
+            ("company", "company", "text"), ("height", "height", "jsonb"), ("diameter", "diameter", "jsonb"),
+            ("mass", "mass", "jsonb"), ("payload_weights", "payload_weights", "jsonb"),
+            ("flickr_images", "flickr_images", "text[]"), ("wikipedia", "wikipedia", "text"),
+            ("description", "description", "text"),
+        )),
+    },
+    "payloads": {
+        "raw_spacex_payloads_data": ("root", None, None, (
+            ("id", "id", "text"), ("name", "name", "text"), ("type", "type", "text"), ("reused", "reused", "bool"),
+            ("launch", "launch", "text"), ("customers", "customers", "text[]"),
+            ("norad_ids", "norad_ids", "int[]"), ("nationalities", "nationalities", "text[]"),
+            ("manufacturers", "manufacturers", "text[]"), ("mass_kg", "mass_kg", "real"),
+            ("mass_lbs", "mass_lbs", "real"), ("orbit", "orbit", "text"),
+            ("reference_system", "reference_system", "text"), ("regime", "regime", "text"),
+            ("longitude", "longitude", "real"), ("semi_major_axis_km", "semi_major_axis_km", "real"),
+            ("eccentricity", "eccentricity", "real"), ("periapsis_km", "periapsis_km", "real"),
+            ("apoapsis_km", "apoapsis_km", "real"), ("inclination_deg", "inclination_deg", "real"),
+            ("period_min", "period_min", "real"), ("lifespan_years", "lifespan_years", "real"),
+        )),
+    },
+    "launches": {
+        "raw_spacex_launches_data": ("root", None, None, (
+            ("id", "id", "text"), ("flight_number", "flight_number", "int"), ("name", "name", "text"),
+            ("date_utc", "date_utc", "timestamp"), ("date_unix", "date_unix", "int"),
+            ("date_local", "date_local", "text"), ("date_precision", "date_precision", "text"),
+            ("static_fire_date_utc", "static_fire_date_utc", "timestamp"),
+            ("static_fire_date_unix", "static_fire_date_unix", "int"), ("net", "net", "bool"),
+            ("window", "window", "int"), ("rocket", "rocket", "text"), ("success", "success", "bool"),
+            ("details", "details", "text"), ("launchpad", "launchpad", "text"),
+            ("auto_update", "auto_update", "bool"), ("tbd", "tbd", "bool"),
+            ("launch_library_id", "launch_library_id", "text"), ("upcoming", "upcoming", "bool"),
+        )),
+        "raw_spacex_fairings_data": ("optional", "fairings", "launch_id", (
+            ("reused", "reused", "bool"), ("recovery_attempt", "recovery_attempt", "bool"),
+            ("recovered", "recovered", "bool"),
+        )),
+        "raw_spacex_links_data": ("object", "links", "launch_id", (
+            ("patch_small", "patch.small", "text"), ("patch_large", "patch.large", "text"),
+            ("webcast", "webcast", "text"), ("youtube_id", "youtube_id", "text"), ("article", "article", "text"),
+            ("wikipedia", "wikipedia", "text"), ("reddit_campaign", "reddit.campaign", "text"),
+            ("reddit_launch", "reddit.launch", "text"), ("reddit_media", "reddit.media", "text"),
+            ("reddit_recovery", "reddit.recovery", "text"),
+        )),
+        "raw_spacex_failures_data": ("explode", "failures", "launch_id", (
+            ("time", "time", "int"), ("altitude", "altitude", "int"), ("reason", "reason", "text"),
+        )),
+        "raw_spacex_cores_data": ("explode", "cores", "launch_id", (
+            ("core", "core", "text"), ("flight", "flight", "int"), ("gridfins", "gridfins", "bool"),
+            ("legs", "legs", "bool"), ("reused", "reused", "bool"), ("landing_attempt", "landing_attempt", "bool"),
+            ("landing_success", "landing_success", "bool"), ("landing_type", "landing_type", "text"),
+            ("landpad", "landpad", "text"),
+        )),
+        "raw_spacex_launch_payloads_data": ("values", "payloads", "launch_id", (("payload_id", None, "text"),)),
+        "raw_spacex_launch_crew_data": ("values", "crew", "launch_id", (("crew_id", None, "text"),)),
+        "raw_spacex_launch_ships_data": ("values", "ships", "launch_id", (("ship_id", None, "text"),)),
+        "raw_spacex_launch_capsules_data": ("values", "capsules", "launch_id", (("capsule_id", None, "text"),)),
+    },
+}
+
+@instrument("insert_rockets", rows=rows_arg(1))
 def insert_rockets(conn, rockets):
     if not rockets:
         logger.warning("Нет данных о ракетах для вставки.")
         return
     
     logger.info(f"Вставка/обновление {len(rockets)} записей о ракетах...")
+    quarantined = []
     with conn.cursor() as cur:
         for rocket in rockets:
+            cur.execute("SAVEPOINT record;")
             try:
                 cur.execute("""
                     INSERT INTO spacex_data.raw_spacex_rockets_data (
@@ -137,22 +172,31 @@ def insert_rockets(conn, rockets):
                     json.dumps(rocket.get('mass')), json.dumps(rocket.get('payload_weights')),
                     rocket.get('flickr_images'), rocket.get('wikipedia'), rocket.get('description')
                 ))
+                cur.execute("RELEASE SAVEPOINT record;")
+            except FATAL_ERRORS:
+                raise
             except Exception as e:
                 logger.error(f"Ошибка при обработке rocket ID {rocket.get('id')}: {e}")
-                conn.rollback()
-                continue
+                # Откатывается только текущая запись, ранее вставленные остаются в транзакции
+                cur.execute("ROLLBACK TO SAVEPOINT record; RELEASE SAVEPOINT record;")
+                quarantine_record(cur, "rockets", rocket, e)
+                quarantined.append(rocket.get("id"))
         conn.commit()
     logger.info("Данные о ракетах успешно загружены.")
+    return {"quarantined": quarantined}
 
 
+@instrument("insert_payloads", rows=rows_arg(1))
 def insert_payloads(conn, payloads):
     if not payloads:
         logger.warning("Нет данных о полезных нагрузках для вставки.")
         return
 
     logger.info(f"Вставка/обновление {len(payloads)} записей о полезных нагрузках...")
+    quarantined = []
     with conn.cursor() as cur:
         for payload in payloads:
+            cur.execute("SAVEPOINT record;")
             try:
                 cur.execute("""
                     INSERT INTO spacex_data.raw_spacex_payloads_data (
@@ -179,14 +223,20 @@ def insert_payloads(conn, payloads):
                     payload.get('eccentricity'), payload.get('periapsis_km'), payload.get('apoapsis_km'),
                     payload.get('inclination_deg'), payload.get('period_min'), payload.get('lifespan_years')
                 ))
+                cur.execute("RELEASE SAVEPOINT record;")
+            except FATAL_ERRORS:
+                raise
             except Exception as e:
                 logger.error(f"Ошибка при обработке payload ID {payload.get('id')}: {e}")
-                conn.rollback()
-                continue
+                cur.execute("ROLLBACK TO SAVEPOINT record; RELEASE SAVEPOINT record;")
+                quarantine_record(cur, "payloads", payload, e)
+                quarantined.append(payload.get("id"))
         conn.commit()
     logger.info("Данные о полезных нагрузках успешно загружены.")
+    return {"quarantined": quarantined}
 
 
+@instrument("insert_launches", rows=rows_arg(1))
 def insert_launches(conn, launches):
     if not launches:
         logger.warning("Нет данных о запусках для вставки.")
@@ -199,31 +249,34 @@ def insert_launches(conn, launches):
         "raw_spacex_launch_ships_data", "raw_spacex_launch_capsules_data"
     ]
 
+    quarantined = []
     with conn.cursor() as cur:
         for launch in launches:
             launch_id = launch.get("id")
             if not launch_id:
                 continue
 
+            cur.execute("SAVEPOINT record;")
             try:
                 for table in child_tables:
                     cur.execute(f"DELETE FROM spacex_data.{table} WHERE launch_id = %s;", (launch_id,))
 
+                # Таблица секционирована по date_utc и PK (id, date_utc): ON CONFLICT (id) невозможен.
+                # Запуск без date_utc пишется в raw_spacex_launches_data_null_date, как в bulk-режиме
                 cur.execute("""
-                    INSERT INTO spacex_data.raw_spacex_launches_data (
+                    DELETE FROM spacex_data.raw_spacex_launches_data WHERE id = %(id)s;
+                    DELETE FROM spacex_data.raw_spacex_launches_data_null_date WHERE id = %(id)s;
+                """, {"id": launch_id})
+                launches_table = "raw_spacex_launches_data"
+                if launch.get("date_utc") is None:
+                    launches_table = "raw_spacex_launches_data_null_date"
+                    logger.warning(f"Запуск {launch_id} без date_utc записан в spacex_data.{launches_table}.")
+                cur.execute(f"""
+                    INSERT INTO spacex_data.{launches_table} (
                         id, flight_number, name, date_utc, date_unix, date_local, date_precision,
                         static_fire_date_utc, static_fire_date_unix, net, "window", rocket,
                         success, details, launchpad, auto_update, tbd, launch_library_id, upcoming
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (id) DO UPDATE SET
-                        flight_number = EXCLUDED.flight_number, name = EXCLUDED.name, date_utc = EXCLUDED.date_utc,
-                        date_unix = EXCLUDED.date_unix, date_local = EXCLUDED.date_local,
-                        date_precision = EXCLUDED.date_precision, static_fire_date_utc = EXCLUDED.static_fire_date_utc,
-                        static_fire_date_unix = EXCLUDED.static_fire_date_unix, net = EXCLUDED.net,
-                        "window" = EXCLUDED.window, rocket = EXCLUDED.rocket, success = EXCLUDED.success,
-                        details = EXCLUDED.details, launchpad = EXCLUDED.launchpad,
-                        auto_update = EXCLUDED.auto_update, tbd = EXCLUDED.tbd,
-                        launch_library_id = EXCLUDED.launch_library_id, upcoming = EXCLUDED.upcoming;
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
                 """, (
                     launch_id, launch.get("flight_number"), launch.get("name"),
                     launch.get("date_utc"), launch.get("date_unix"), launch.get("date_local"),
@@ -247,15 +300,236 @@ def insert_launches(conn, launches):
                 for ship_id in launch.get("ships", []): cur.execute("INSERT INTO spacex_data.raw_spacex_launch_ships_data (launch_id, ship_id) VALUES (%s, %s);", (launch_id, ship_id))
                 for capsule_id in launch.get("capsules", []): cur.execute("INSERT INTO spacex_data.raw_spacex_launch_capsules_data (launch_id, capsule_id) VALUES (%s, %s);", (launch_id, capsule_id))
 
+                cur.execute("RELEASE SAVEPOINT record;")
+            except FATAL_ERRORS:
+                raise
             except Exception as e:
                 logger.error(f"Ошибка при обработке launch ID {launch_id}: {e}")
-                conn.rollback()
-                continue
+                cur.execute("ROLLBACK TO SAVEPOINT record; RELEASE SAVEPOINT record;")
+                quarantine_record(cur, "launches", launch, e)
+                quarantined.append(launch.get("id"))
         
         conn.commit()
     logger.info("Данные о запусках успешно загружены.")
+    return {"quarantined": quarantined}
+
+def _dedupe_by_id(records):
+    # ON CONFLICT DO UPDATE не допускает повторов ключа в одной команде: побеждает последняя запись
+    return list({r["id"]: r for r in records if r.get("id")}.values())
+
+
+def _stage_table(cur, entity, table, arrays):
+    spec = RAW_FIELD_MAP[entity][table]
+    columns = table_columns(spec)
+    return stage_columns(cur, table, columns, table_types(spec), arrays[table]), columns
+
+
+def write_entity(cur, entity, records):
+    # Запись пакета через COPY в staging без commit: общая часть bulk-загрузчиков и изоляции ошибок
+    tables = RAW_FIELD_MAP[entity]
+    parent = next(iter(tables))
+    arrays = flatten_columns(_dedupe_by_id(records), tables)
+    counts = {table: len(columns[0]) for table, columns in arrays.items()}
+    staging, columns = _stage_table(cur, entity, parent, arrays)
+    if entity == "launches":
+        # Запуски без date_utc уходят в raw_spacex_launches_data_null_date: в счётчике только основная таблица
+        counts[parent] = replace_from_staging(cur, parent, staging, columns, partition_key="date_utc")
+    else:
+        upsert_from_staging(cur, parent, staging, columns)
+    for table in list(tables)[1:]:
+        child_staging, columns = _stage_table(cur, entity, table, arrays)
+        inserted = replace_children_from_staging(cur, table, child_staging, columns, staging)
+        logger.info(f"[{table}]: вставлено {inserted} записей.")
+    return counts
+
+
+def _bulk_upsert(conn, entity, records, label):
+    logger.info(f"Пакетная загрузка {len(records)} записей о {label} через COPY...")
+    with conn.cursor() as cur:
+        try:
+            counts = write_entity(cur, entity, records)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Ошибка при пакетной загрузке данных о {label}: {e}")
+            raise
+    logger.info(f"Данные о {label} успешно загружены пакетно.")
+    return counts
+
+
+@instrument("insert_rockets_bulk", rows=rows_arg(1))
+def insert_rockets_bulk(conn, rockets):
+    if not rockets:
+        logger.warning("Нет данных о ракетах для вставки.")
+        return
+    return _bulk_upsert(conn, "rockets", rockets, "ракетах")
+
+
+@instrument("insert_payloads_bulk", rows=rows_arg(1))
+def insert_payloads_bulk(conn, payloads):
+    if not payloads:
+        logger.warning("Нет данных о полезных нагрузках для вставки.")
+        return
+    return _bulk_upsert(conn, "payloads", payloads, "полезных нагрузках")
+
+
+@instrument("insert_launches_bulk", rows=rows_arg(1))
+def insert_launches_bulk(conn, launches):
+    if not launches:
+        logger.warning("Нет данных о запусках для вставки.")
+        return
+    return _bulk_upsert(conn, "launches", launches, "запусках")
+
+
+@instrument("insert_isolated", rows=rows_arg(1))
+def insert_isolated(conn, records, entity, batch_size=ISOLATION_BATCH_SIZE):
+    # Пакеты по batch_size под savepoint; упавший пакет делится пополам до плохих записей, которые уходят
+    # в spacex_data.load_quarantine. Хорошие записи фиксируются, вместо полного перезапуска - O(log n) попыток.
+    if not records:
+        logger.warning(f"Нет данных [{entity}] для вставки.")
+        return
+    logger.info(f"Загрузка {len(records)} записей [{entity}] с изоляцией ошибок (пакеты по {batch_size})...")
+    stats = write_isolated(conn, entity, _dedupe_by_id(records), write_entity, batch_size)
+    return {"quarantined": stats["quarantined"]}
+
+
+def verify_partitioned_load(conn, ids, expected):
+    # Каждая таблица должна содержать ровно столько строк по загруженным id, сколько записали разделы
+    mismatches = []
+    with conn.cursor() as cur:
+        for table, count in expected.items():
+            key = "launch_id" if table in LAUNCH_CHILD_COLUMNS else "id"
+            cur.execute(f"SELECT count(*) FROM spacex_data.{table} WHERE {key} = ANY(%s);", (ids,))
+            actual = cur.fetchone()[0]
+            if actual != count:
+                mismatches.append(f"{table}: ожидалось {count}, найдено {actual}")
+    conn.commit()
+    if mismatches:
+        raise RuntimeError("Проверка согласованности параллельной загрузки не пройдена: " + "; ".join(mismatches))
+
+
+def insert_parallel(conn, records, loader, workers=LOAD_WORKERS, partition_by="hash"):
+    # Дубликаты id снимаются до разбиения (побеждает последняя запись, как в bulk-режиме),
+    # поэтому разделы не пересекаются по ключам и не конфликтуют между собой ни по родителю, ни по дочерним строкам
+    records = _dedupe_by_id(records)
+    if workers <= 1 or len(records) < max(MIN_PARTITION_ROWS, 2):
+        return loader(conn, records)
+
+    partitions = partition_records(records, workers, partition_by)
+    logger.info(f"Параллельная загрузка {len(records)} записей: {len(partitions)} разделов ({partition_by}).")
+    results = run_partitions(loader, partitions, workers)
+    failed = [result for result in results if result["status"] != "committed"]
+    if failed:
+        # Зафиксированные разделы не откатываются (см. run_partitions): повтор загрузки допишет остальные
+        raise RuntimeError(
+            f"Параллельная загрузка не завершена: разделов зафиксировано {len(results) - len(failed)} "
+            f"из {len(results)}, с ошибкой: "
+            + "; ".join(f"{result['partition']} ({result['rows']} записей): {result['error']}" for result in failed)
+        )
+    counts = {}
+    for result in results:
+        for table, count in result["counts"].items():
+            counts[table] = counts.get(table, 0) + count
+    verify_partitioned_load(conn, [r["id"] for r in records], counts)
+    logger.info("Проверка согласованности параллельной загрузки пройдена.")
+    return counts
+
+
+def load_entity(conn, entity, batches, loader, incremental=False):
+    known = load_hashes(conn, entity) if incremental else None
+    previous_watermark = load_watermark(conn, entity) if incremental and entity == "launches" else None
+    report = {"inserted": 0, "updated": 0, "skipped": 0}
+    total = 0
+
+    for records in batches:
+        if not records:
+            continue
+        total += len(records)
+        hashes, watermark = None, None
+        if incremental:
+            watermark = launch_watermark(records) if entity == "launches" else None
+            records, hashes, counts = detect_changes(conn, entity, records, known, QUERY_FIELDS[entity])
+            for key, value in counts.items():
+                report[key] += value
+        result = loader(conn, records) if records else None
+        if incremental:
+            # Загрузчики возвращают id записей, которые не удалось записать (row - откат savepoint записи,
+            # isolated - бисекция пакета). Их хеши не сохраняются ни в БД, ни в known: иначе следующий прогон
+            # (или повтор той же записи на следующей странице) счёл бы их неизменившимися и пропустил
+            if isinstance(result, dict):
+                for record_id in result.get("quarantined", ()):
+                    hashes.pop(record_id, None)
+            known.update(hashes)
+            save_state(conn, entity, hashes, watermark)
+
+    if incremental:
+        if entity == "launches":
+            # Watermark только информационный (докуда дошла лента запусков): у API v4 нет времени изменения
+            # записи, а прошедшие запуски правятся задним числом (success, failures, ссылки, перенос даты
+            # upcoming), поэтому фильтр date_unix >= watermark молча терял бы изменения. Изменения ищутся по хешам.
+            logger.info(f"[{entity}]: watermark {previous_watermark} -> {load_watermark(conn, entity)}")
+        logger.info(
+            f"[{entity}] итого: новых {report['inserted']}, изменённых {report['updated']}, "
+            f"без изменений {report['skipped']}."
+        )
+    return total, report
+
+
+def fetch_sources(stream=False, page_size=QUERY_PAGE_SIZE, use_cache=False, offline=False, base_url=None,
+                  replay=None, land=False, landing_format="ndjson", landing_dir=LANDING_DIR):
+    if replay:
+        # Снимок из зоны приземления вместо обращения к API
+        return replay_sources(ENTITIES, replay, landing_dir)
+    sources = _fetch_sources(stream, page_size, use_cache, offline, base_url)
+    if land:
+        sources = land_sources(sources, directory=landing_dir, fmt=landing_format)
+    return sources
+
+
+def _fetch_sources(stream, page_size, use_cache, offline, base_url):
+    if stream:
+        # Страницы /query загружаются по мере поступления: память ограничена размером страницы
+        return {
+            entity: stream_collection(entity, QUERY_FIELDS[entity], page_size, base_url=base_url)
+            for entity in QUERY_FIELDS
+        }
+    cache = ResponseCache(offline=offline) if use_cache or offline else None
+    launches, rockets, payloads = fetch_data(base_url=base_url, cache=cache)
+    return {"rockets": [rockets], "payloads": [payloads], "launches": [launches]}
+
+
+def fetch_entity(entity, stream=False, page_size=QUERY_PAGE_SIZE, cache=None, base_url=None):
+    # Одна сущность - для графа задач, где каждая сущность извлекается отдельной задачей
+    if stream:
+        return stream_collection(entity, QUERY_FIELDS[entity], page_size, base_url=base_url)
+    launches, rockets, payloads = fetch_data(base_url=base_url, cache=cache, endpoints=(entity,))
+    records = {"launches": launches, "rockets": rockets, "payloads": payloads}[entity]
+    if records is None:
+        raise RuntimeError(f"Не удалось получить данные [{entity}] из API.")
+    return [records]
+
+
+def select_loaders(load_mode, workers=LOAD_WORKERS, partition_by="hash"):
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"Неизвестный режим загрузки: {load_mode}")
+    if load_mode == "parallel":
+        return {
+            entity: partial(insert_parallel, loader=loader, workers=workers, partition_by=partition_by)
+            for entity, loader in select_loaders("bulk").items()
+        }
+    if load_mode == "bulk":
+        return {"rockets": insert_rockets_bulk, "payloads": insert_payloads_bulk, "launches": insert_launches_bulk}
+    if load_mode == "isolated":
+        return {entity: partial(insert_isolated, entity=entity) for entity in ENTITIES}
+    return {"rockets": insert_rockets, "payloads": insert_payloads, "launches": insert_launches}
+
+
+def main(load_mode="row", incremental=False, use_cache=False, offline=False, stream=False,
+         page_size=QUERY_PAGE_SIZE, replay=None, land=False, landing_format="ndjson", landing_dir=LANDING_DIR,
+         workers=LOAD_WORKERS, partition_by="hash"):
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"Неизвестный режим загрузки: {load_mode}")
 
-def main():
     conn = get_connection()
     if not conn:
         logger.error("Не удалось установить соединение с базой данных. Выход.")
@@ -263,22 +537,61 @@ def main():
 
     logger.info("Соединение с базой данных установлено.")
 
-    extract_create_table(conn)
+    migrate(conn)
 
-    launches, rockets, payloads = fetch_data()
+    sources = fetch_sources(stream, page_size, use_cache, offline, replay=replay, land=land,
+                            landing_format=landing_format, landing_dir=landing_dir)
+    loaders = select_loaders(load_mode, workers, partition_by)
 
-    if rockets:
-        insert_rockets(conn, rockets)
-    if payloads:
-        insert_payloads(conn, payloads)
-    if launches:
-        insert_launches(conn, launches)
+    report = {}
+    received = 0
+    try:
+        for entity in ENTITIES:
+            total, entity_report = load_entity(conn, entity, sources[entity], loaders[entity], incremental)
+            received += total
+            if incremental:
+                report[entity] = entity_report
+    finally:
+        shutdown_workers()
 
-    if not any([launches, rockets, payloads]):
+    if not received:
         logger.warning("Данные не были получены из API. Вставка данных не будет выполнена.")
 
     conn.close()
     logger.info("Соединение с базой данных закрыто.")
+    metrics.METRICS.export(prefix="extract")
+    return report
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Извлечение данных SpaceX API в spacex_data.")
+    parser.add_argument("--load-mode", choices=LOAD_MODES, default="row",
+                        help="row - построчные INSERT, bulk - COPY в staging-таблицы и set-based слияние, "
+                             "parallel - bulk по разделам в пуле процессов, "
+                             "isolated - bulk-пакеты под savepoint, плохие записи уходят в карантин")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS,
+                        help="число процессов для --load-mode parallel")
+    parser.add_argument("--partition-by", choices=PARTITION_STRATEGIES, default="hash",
+                        help="разбиение записей на разделы: по хешу id или по диапазонам дат запуска")
+    parser.add_argument("--incremental", action="store_true",
+                        help="пропускать записи, чей хеш содержимого не изменился с прошлого запуска")
+    parser.add_argument("--cache", action="store_true",
+                        help="использовать дисковый кэш ответов API с условными запросами")
+    parser.add_argument("--offline", action="store_true",
+                        help="брать ответы API только из кэша, без обращения к сети")
+    parser.add_argument("--stream", action="store_true",
+                        help="постранично читать POST /v4/<collection>/query и загружать каждую страницу сразу")
+    parser.add_argument("--page-size", type=int, default=QUERY_PAGE_SIZE)
+    parser.add_argument("--land", action="store_true",
+                        help="сохранять полученные ответы API в зону приземления <landing-dir>/<entity>/dt=YYYY-MM-DD/")
+    parser.add_argument("--landing-format", choices=LANDING_FORMATS, default="ndjson",
+                        help="ndjson - NDJSON со сжатием gzip, parquet - колоночный Parquet (нужен pyarrow)")
+    parser.add_argument("--landing-dir", default=LANDING_DIR)
+    parser.add_argument("--replay", nargs="?", const="latest", metavar="YYYY-MM-DD",
+                        help="загрузить последний снимок за дату (по умолчанию самый свежий) вместо обращения к API")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure(args.metrics_dir, args.profile_stage)
+    main(load_mode=args.load_mode, incremental=args.incremental, use_cache=args.cache, offline=args.offline,
+         stream=args.stream, page_size=args.page_size, replay=args.replay, land=args.land,
+         landing_format=args.landing_format, landing_dir=args.landing_dir, workers=args.workers,
+         partition_by=args.partition_by)
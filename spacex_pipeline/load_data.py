@@ -1,58 +1,150 @@
 import logging
+import re
 import pandas as pd
 import psycopg2
 import json # <--- 1. ДОБАВЛЕН ИМПОРТ
+import argparse
 from psycopg2.extras import execute_values
 from db.connection import get_connection
-from transform_data import transformed_fact_data, transformed_dimension_data
+from db.bulk_load import copy_rows
+from db.aggregates import refresh_aggregates
+from db.migrations import migrate
+from db.transform_cache import plan_targets, save_fingerprints
+import metrics
+from metrics import instrument, record, rows_of, stage
+from transform_data import (
+    transformed_fact_data, transformed_dimension_data, transformed_fact_chunks, transformed_dimension_chunks,
+    SQL_TRANSFORMS, TARGET_SOURCES, TRANSFORM_ENGINES, CHUNK_SIZE
+)
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
-def create_transformed_tables(conn):
+WRITE_MODES = ("truncate", "swap")
+SHADOW_SUFFIX = "__new"
+SWAP_LOCK_TIMEOUT = "5s"
+INDEX_DEFINITION = re.compile(
+    r"^(?P<create>CREATE (?:UNIQUE )?INDEX) (?P<name>\S+) ON (?:ONLY )?(?P<table>\S+) (?P<rest>USING .*)$", re.S
+)
+
+def create_shadow_table(cur, table):
+    # Теневая таблица строится рядом с живой: читатели spacex_analytics.{table} не блокируются
+    shadow = f"{table}{SHADOW_SUFFIX}"
+    cur.execute(f"DROP TABLE IF EXISTS spacex_analytics.{shadow};")
+    cur.execute("""
+        SELECT pg_get_partkeydef(p.partrelid) FROM pg_partitioned_table p WHERE p.partrelid = %s::regclass;
+    """, (f"spacex_analytics.{table}",))
+    partkey = cur.fetchone()
+    cur.execute(f"""
+        CREATE TABLE spacex_analytics.{shadow}
+        (LIKE spacex_analytics.{table} INCLUDING ALL EXCLUDING INDEXES)
+        {f"PARTITION BY {partkey[0]}" if partkey else ""};
+    """)
+    if partkey:
+        # Секции теневой таблицы повторяют границы секций живой
+        cur.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass;
+        """, (f"spacex_analytics.{table}",))
+        for partition, bound in cur.fetchall():
+            cur.execute(f"""
+                CREATE TABLE spacex_analytics.{partition}{SHADOW_SUFFIX}
+                PARTITION OF spacex_analytics.{shadow} {bound};
+            """)
+    return shadow
+
+def build_shadow_indexes(cur, table):
+    # Индексы и PK/UNIQUE создаются после заливки данных - это быстрее, чем поддерживать их при вставке
+    shadow = f"{table}{SHADOW_SUFFIX}"
+    cur.execute("""
+        SELECT c.conname, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        WHERE c.conrelid = %s::regclass AND c.contype IN ('p', 'u', 'x');
+    """, (f"spacex_analytics.{table}",))
+    constraints = cur.fetchall()
+    for name, definition in constraints:
+        cur.execute(f"ALTER TABLE spacex_analytics.{shadow} ADD CONSTRAINT {name}{SHADOW_SUFFIX} {definition};")
+
+    cur.execute("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = 'spacex_analytics' AND i.tablename = %s
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname AND c.conrelid = %s::regclass);
+    """, (table, f"spacex_analytics.{table}"))
+    for name, definition in cur.fetchall():
+        cur.execute(shadow_index_definition(definition, name, table))
+
+def shadow_index_definition(definition, name, table):
+    # pg_get_indexdef: "CREATE [UNIQUE] INDEX имя ON [ONLY] схема.таблица USING ...". У индекса секционированной
+    # таблицы стоит ON ONLY; на теневой таблице ONLY убирается, чтобы индекс создался и на всех её секциях
+    match = INDEX_DEFINITION.match(definition)
+    if not match or match["name"] != name or match["table"] != f"spacex_analytics.{table}":
+        raise RuntimeError(f"Не удалось перенести индекс {name} на {table}{SHADOW_SUFFIX}: {definition}")
+    return (f"{match['create']} {name}{SHADOW_SUFFIX} ON spacex_analytics.{table}{SHADOW_SUFFIX} "
+            f"{match['rest']}")
+
+def prepare_target(cur, table, write_mode):
+    if write_mode == "swap":
+        return create_shadow_table(cur, table)
+    cur.execute(f"TRUNCATE TABLE spacex_analytics.{table} RESTART IDENTITY CASCADE;")
+    return table
+
+def swap_shadow_tables(conn, tables):
     with conn.cursor() as cur:
         try:
-            cur.execute("CREATE SCHEMA IF NOT EXISTS spacex_analytics;")
-            
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS spacex_analytics.fct_launches (
-                    id TEXT PRIMARY KEY, flight_number INTEGER, name TEXT, date_utc TIMESTAMP,
-                    success BOOLEAN, webcast TEXT, wikipedia TEXT
-                );
-                        
-                CREATE TABLE IF NOT EXISTS spacex_analytics.dim_rockets (
-                    id TEXT PRIMARY KEY, cost_per_launch NUMERIC, first_flight DATE,
-                    height JSONB, diameter JSONB, mass JSONB, payload_weights JSONB
-                );
-                        
-                CREATE TABLE IF NOT EXISTS spacex_analytics.dim_payloads (
-                    id TEXT PRIMARY KEY, name TEXT, type TEXT, mass_kg NUMERIC, orbit TEXT
-                );
-                """)
+            cur.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}';")
+            for table in tables:
+                shadow = f"{table}{SHADOW_SUFFIX}"
+                # Секции и индексы секций получают имена с суффиксом внутри ("fct_launches_y2020__new_pkey")
+                cur.execute("""
+                    SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = %s::regclass;
+                """, (f"spacex_analytics.{shadow}",))
+                shadow_partitions = [name for (name,) in cur.fetchall()]
+                cur.execute("""
+                    SELECT c.relname FROM pg_index x JOIN pg_class c ON c.oid = x.indexrelid
+                    WHERE x.indrelid = %s::regclass
+                       OR x.indrelid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass);
+                """, (f"spacex_analytics.{shadow}", f"spacex_analytics.{shadow}"))
+                shadow_indexes = [name for (name,) in cur.fetchall()]
+
+                cur.execute(f"DROP TABLE spacex_analytics.{table};")
+                cur.execute(f"ALTER TABLE spacex_analytics.{shadow} RENAME TO {table};")
+                for partition in shadow_partitions:
+                    if SHADOW_SUFFIX in partition:
+                        cur.execute(f"ALTER TABLE spacex_analytics.{partition} "
+                                    f"RENAME TO {partition.replace(SHADOW_SUFFIX, '', 1)};")
+                for index in shadow_indexes:
+                    if SHADOW_SUFFIX in index:
+                        cur.execute(f"ALTER INDEX spacex_analytics.{index} RENAME TO {index.replace(SHADOW_SUFFIX, '', 1)};")
             conn.commit()
-            logger.info("Аналитические таблицы готовы к работе в схеме 'spacex_analytics'.")
+            logger.info(f"Теневые таблицы подменены: {', '.join(tables)}.")
         except Exception as e:
+            logger.error(f"Ошибка при подмене таблиц: {e}")
             conn.rollback()
-            logger.error(f"Ошибка при создании аналитических таблиц: {e}")
             raise
 
-def insert_transformed_data_sql(conn, fct_df, rockets_df, payloads_df):
+@instrument("insert_transformed_data_sql", rows=lambda args, result: sum(rows_of(df) for df in args[1:4]))
+def insert_transformed_data_sql(conn, fct_df, rockets_df, payloads_df, write_mode="truncate"):
+    loaded = []
     with conn.cursor() as cur:
         try:
             if fct_df is not None and not fct_df.empty:
                 logger.info(f"Вставка {len(fct_df)} записей в fct_launches...")
-                cur.execute("TRUNCATE TABLE spacex_analytics.fct_launches RESTART IDENTITY CASCADE;")
+                target = prepare_target(cur, "fct_launches", write_mode)
                 tuples = [tuple(x) for x in fct_df.to_numpy()]
                 cols = ','.join(list(fct_df.columns))
-                query = f"INSERT INTO spacex_analytics.fct_launches ({cols}) VALUES %s"
+                query = f"INSERT INTO spacex_analytics.{target} ({cols}) VALUES %s"
                 execute_values(cur, query, tuples)
+                loaded.append("fct_launches")
                 logger.info("Данные успешно вставлены в fct_launches.")
             else:
-                logger.warning("Нет данных для вставки в fct_launches.")
+                logger.warning("Нет данных для вставки в fct_launches, таблица оставлена без изменений.")
 
             if rockets_df is not None and not rockets_df.empty:
                 logger.info(f"Вставка {len(rockets_df)} записей в dim_rockets...")
-                cur.execute("TRUNCATE TABLE spacex_analytics.dim_rockets RESTART IDENTITY CASCADE;")
+                target = prepare_target(cur, "dim_rockets", write_mode)
                 
                 for col in ['height', 'diameter', 'mass', 'payload_weights']:
                     if col in rockets_df.columns:
@@ -60,23 +152,28 @@ def insert_transformed_data_sql(conn, fct_df, rockets_df, payloads_df):
 
                 tuples = [tuple(x) for x in rockets_df.to_numpy()]
                 cols = ','.join(list(rockets_df.columns))
-                query = f"INSERT INTO spacex_analytics.dim_rockets ({cols}) VALUES %s"
+                query = f"INSERT INTO spacex_analytics.{target} ({cols}) VALUES %s"
                 execute_values(cur, query, tuples)
+                loaded.append("dim_rockets")
                 logger.info("Данные успешно вставлены в dim_rockets.")
             else:
-                logger.warning("Нет данных для вставки в dim_rockets.")
+                logger.warning("Нет данных для вставки в dim_rockets, таблица оставлена без изменений.")
 
             if payloads_df is not None and not payloads_df.empty:
                 logger.info(f"Вставка {len(payloads_df)} записей в dim_payloads...")
-                cur.execute("TRUNCATE TABLE spacex_analytics.dim_payloads RESTART IDENTITY CASCADE;")
+                target = prepare_target(cur, "dim_payloads", write_mode)
                 tuples = [tuple(x) for x in payloads_df.to_numpy()]
                 cols = ','.join(list(payloads_df.columns))
-                query = f"INSERT INTO spacex_analytics.dim_payloads ({cols}) VALUES %s"
+                query = f"INSERT INTO spacex_analytics.{target} ({cols}) VALUES %s"
                 execute_values(cur, query, tuples)
+                loaded.append("dim_payloads")
                 logger.info("Данные успешно вставлены в dim_payloads.")
             else:
-                logger.warning("Нет данных для вставки в dim_payloads.")
+                logger.warning("Нет данных для вставки в dim_payloads, таблица оставлена без изменений.")
 
+            if write_mode == "swap":
+                for table in loaded:
+                    build_shadow_indexes(cur, table)
             conn.commit()
 
         except Exception as e:
@@ -84,31 +181,165 @@ def insert_transformed_data_sql(conn, fct_df, rockets_df, payloads_df):
             conn.rollback()
             raise
 
-def main():
-    conn = None
-    try:
-        conn = get_connection()
-        if not conn:
-            raise ConnectionError("Не удалось получить соединение psycopg2.")
+    if write_mode == "swap" and loaded:
+        swap_shadow_tables(conn, loaded)
+    return loaded
+
+@instrument("insert_transformed_data_in_db", rows=lambda args, result: 0)
+def insert_transformed_data_in_db(conn, write_mode="truncate", targets=None):
+    loaded = []
+    with conn.cursor() as cur:
+        try:
+            for table, (source, columns, select) in SQL_TRANSFORMS.items():
+                if targets is not None and table not in targets:
+                    continue
+                # Как в pandas и chunked: пустой результат трансформации (пустой источник или пустая
+                # связанная таблица в JOIN) не затирает живую таблицу, она остаётся прежней
+                cur.execute(f"SELECT EXISTS ({select});")
+                if not cur.fetchone()[0]:
+                    logger.warning(f"Нет данных для вставки в {table}, таблица оставлена без изменений.")
+                    continue
+                target = prepare_target(cur, table, write_mode)
+                cur.execute(f"INSERT INTO spacex_analytics.{target} ({','.join(columns)}) {select};")
+                logger.info(f"Данные успешно вставлены в {target}: {cur.rowcount} записей.")
+                record(rows=cur.rowcount)
+                loaded.append(table)
+            if write_mode == "swap":
+                for table in loaded:
+                    build_shadow_indexes(cur, table)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при трансформации данных внутри БД: {e}")
+            conn.rollback()
+            raise
 
-        create_transformed_tables(conn)
+    if write_mode == "swap" and loaded:
+        swap_shadow_tables(conn, loaded)
+    return loaded
 
+@instrument("insert_transformed_chunks", rows=lambda args, result: 0)
+def insert_transformed_chunks(conn, chunks_by_table, write_mode="truncate"):
+    loaded = []
+    with conn.cursor() as cur:
+        try:
+            for table, chunks in chunks_by_table.items():
+                target, total = None, 0
+                for chunk in chunks:
+                    if target is None:
+                        target = prepare_target(cur, table, write_mode)
+                    rows = chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+                    copy_rows(cur, f"spacex_analytics.{target}", list(chunk.columns), rows)
+                    total += len(chunk)
+                    record(rows=len(chunk))
+                    logger.info(f"[{table}] чанк {len(chunk)} записей записан, всего {total}.")
+                if target is None:
+                    logger.warning(f"Нет данных для вставки в {table}, таблица оставлена без изменений.")
+                    continue
+                loaded.append(table)
+                logger.info(f"Данные успешно вставлены в {table}: {total} записей.")
+            if write_mode == "swap":
+                for table in loaded:
+                    build_shadow_indexes(cur, table)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при почанковой вставке данных: {e}")
+            conn.rollback()
+            raise
+
+    if write_mode == "swap" and loaded:
+        swap_shadow_tables(conn, loaded)
+    return loaded
+
+def transform_and_load(conn, engine="pandas", write_mode="truncate", chunk_size=CHUNK_SIZE, force=False,
+                       targets=None):
+    if engine not in TRANSFORM_ENGINES:
+        raise ValueError(f"Неизвестный движок трансформации: {engine}")
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"Неизвестный режим записи: {write_mode}")
+
+    # Пересчитываются только цели, у которых изменилась хотя бы одна исходная таблица
+    with stage("transform_cache"):
+        # targets ограничивает прогон частью аналитических таблиц (задачи графа строят их по отдельности)
+        sources = {target: TARGET_SOURCES[target] for target in (targets or TARGET_SOURCES)}
+        definitions = {target: SQL_TRANSFORMS[target][2] for target in sources}
+        targets, fingerprints, report = plan_targets(conn, sources, definitions, force)
+        record(cache_hits=len(report) - len(targets), cache_misses=len(targets))
+    if not targets:
+        logger.info("Исходные данные не изменились, трансформация и загрузка пропущены.")
+        return report
+
+    # loaded - таблицы, которые действительно записаны: отпечаток сохраняется только для них, иначе пропущенная
+    # цель (пустая выборка, ошибка чтения) стала бы попаданием в кэш до следующего --force
+    loaded = []
+    if engine == "sql":
+        logger.info("Трансформация и загрузка данных внутри БД (INSERT ... SELECT)...")
+        loaded = insert_transformed_data_in_db(conn, write_mode, targets)
+
+    elif engine == "chunked":
+        logger.info(f"Почанковая трансформация через серверные курсоры (по {chunk_size} строк)...")
+        rockets_chunks, payloads_chunks = transformed_dimension_chunks(conn, chunk_size)
+        chunks = {"dim_rockets": rockets_chunks, "dim_payloads": payloads_chunks}
+        if "fct_launches" in targets:
+            chunks["fct_launches"] = transformed_fact_chunks(conn, chunk_size)
+        loaded = insert_transformed_chunks(
+            conn, {table: chunks[table] for table in TARGET_SOURCES if table in targets}, write_mode
+        )
+
+    else:
         logger.info("Начало трансформации данных...")
-        fct_df = transformed_fact_data(conn)
-        rockets_df, payloads_df = transformed_dimension_data(conn)
+        fct_df = transformed_fact_data(conn) if "fct_launches" in targets else None
+        rockets_df, payloads_df = None, None
+        if "dim_rockets" in targets or "dim_payloads" in targets:
+            rockets_df, payloads_df = transformed_dimension_data(conn)
+            rockets_df = rockets_df if "dim_rockets" in targets else None
+            payloads_df = payloads_df if "dim_payloads" in targets else None
         logger.info("Трансформация данных завершена.")
-        
+
         if fct_df is not None or rockets_df is not None or payloads_df is not None:
-            insert_transformed_data_sql(conn, fct_df, rockets_df, payloads_df)
+            loaded = insert_transformed_data_sql(conn, fct_df, rockets_df, payloads_df, write_mode)
         else:
             logger.error("Не удалось получить все необходимые данные для вставки.")
-            
+
+    skipped = [target for target in targets if target not in loaded]
+    if skipped:
+        logger.warning(f"Не записаны: {', '.join(skipped)}; отпечатки не сохранены, при следующем прогоне - промах.")
+        for target in skipped:
+            report[target] = "skipped"
+    save_fingerprints(conn, {target: fingerprints[target] for target in loaded}, engine)
+    return report
+
+def main(engine="pandas", write_mode="truncate", chunk_size=CHUNK_SIZE, force=False):
+    conn = None
+    try:
+        conn = get_connection()
+        if not conn:
+            raise ConnectionError("Не удалось получить соединение psycopg2.")
+
+        migrate(conn)
+        transform_and_load(conn, engine, write_mode, chunk_size, force)
+        with stage("aggregates"):
+            refresh_aggregates(conn, rebuild=force)
+
     except Exception as e:
         logger.error(f"Ошибка в главном процессе загрузки: {e}")
     finally:
         if conn:
             conn.close()
             logger.info("Соединение с базой данных закрыто.")
+        metrics.METRICS.export(prefix="load")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Трансформация raw-данных SpaceX в spacex_analytics.")
+    parser.add_argument("--engine", choices=TRANSFORM_ENGINES, default="pandas",
+                        help="pandas - чтение в DataFrame и обратная вставка, sql - INSERT ... SELECT внутри Postgres, "
+                             "chunked - серверные курсоры и COPY по чанкам")
+    parser.add_argument("--write-mode", choices=WRITE_MODES, default="truncate",
+                        help="truncate - TRUNCATE и перезаливка, swap - заливка в теневые таблицы и атомарная подмена")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--force", action="store_true",
+                        help="пересчитать все аналитические таблицы, даже если исходные raw-таблицы не изменились, "
+                             "и пересобрать сводные таблицы вместо применения дельт")
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure(args.metrics_dir, args.profile_stage)
+    main(engine=args.engine, write_mode=args.write_mode, chunk_size=args.chunk_size, force=args.force)
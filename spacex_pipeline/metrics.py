@@ -0,0 +1,288 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.getenv("SPACEX_METRICS_DIR")
+PROFILE_STAGE = os.getenv("SPACEX_PROFILE_STAGE")
+
+COUNTERS = ("rows", "bytes", "sql_round_trips", "sql_seconds", "retries", "cache_hits", "cache_misses", "quarantined")
+
+
+def reset_peak_rss():
+    # Запись "5" в clear_refs сбрасывает VmHWM (Linux >= 4.0), что позволяет мерить пик отдельно по этапам
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageRecord:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self.errors = 0
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def as_dict(self):
+        result = {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "errors": self.errors,
+            **{k: round(v, 4) if isinstance(v, float) else v for k, v in self.counters.items()},
+        }
+        result["rows_per_sec"] = round(self.counters["rows"] / self.wall_seconds, 1) if self.wall_seconds else None
+        return result
+
+
+class RunMetrics:
+    # Этапы вкладываются друг в друга (pipeline.extract -> insert_launches_bulk); счётчики, записанные в потоке,
+    # добавляются ко всем этапам, открытым в этом же потоке.
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = {}
+        self.profile_stage = PROFILE_STAGE
+        self.metrics_dir = METRICS_DIR
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def record(self, **counters):
+        stack = self._stack()
+        if not stack:
+            return
+        with self._lock:
+            for record in stack:
+                for key, value in counters.items():
+                    if value:
+                        record.counters[key] += value
+
+    def drain(self):
+        # Этапы, накопленные в процессе-воркере с прошлого вызова: передаются родителю вместе с результатом
+        with self._lock:
+            stages = {
+                name: {"calls": r.calls, "wall_seconds": r.wall_seconds, "peak_rss_mb": r.peak_rss_mb,
+                       "errors": r.errors, "counters": dict(r.counters)}
+                for name, r in self.stages.items()
+            }
+            self.stages = {}
+        return stages
+
+    def merge(self, stages):
+        # Этапы воркера добавляются к одноимённым этапам процесса; время суммируется по воркерам
+        with self._lock:
+            for name, data in stages.items():
+                record = self.stages.setdefault(name, StageRecord(name))
+                record.calls += data["calls"]
+                record.wall_seconds += data["wall_seconds"]
+                record.peak_rss_mb = max(record.peak_rss_mb, data["peak_rss_mb"])
+                record.errors += data["errors"]
+                for key, value in data["counters"].items():
+                    record.counters[key] += value
+
+    @contextmanager
+    def stage(self, name):
+        with self._lock:
+            record = self.stages.setdefault(name, StageRecord(name))
+            record.calls += 1
+        stack = self._stack()
+        stack.append(record)
+
+        profiler = None
+        if self.profile_stage == name:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception:
+            record.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+                self._dump_profile(profiler, name)
+            stack.pop()
+            with self._lock:
+                record.wall_seconds += elapsed
+                record.peak_rss_mb = max(record.peak_rss_mb, peak_rss_mb())
+
+    def _dump_profile(self, profiler, name):
+        directory = self.metrics_dir or "."
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{name}.prof")
+        profiler.dump_stats(path)
+        logger.info(f"Профиль этапа [{name}] сохранён в {path}.")
+
+    def report(self):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "stages": {name: record.as_dict() for name, record in self.stages.items()},
+        }
+
+    def log_summary(self):
+        for name, record in self.stages.items():
+            data = record.as_dict()
+            logger.info(
+                f"[метрики] {name}: {data['wall_seconds']} с, строк {data['rows']} ({data['rows_per_sec']}/с), "
+                f"обращений к БД {data['sql_round_trips']}, байт {data['bytes']}, повторов {data['retries']}"
+            )
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.report(), indent=2, ensure_ascii=False))
+
+    def write_prometheus(self, path, job="spacex_pipeline"):
+        lines = []
+        gauges = (
+            ("stage_wall_seconds", "wall_seconds", "Время выполнения этапа"),
+            ("stage_rows", "rows", "Обработано строк"),
+            ("stage_rows_per_second", "rows_per_sec", "Строк в секунду"),
+            ("stage_bytes", "bytes", "Объём полезной нагрузки, байт"),
+            ("stage_sql_round_trips", "sql_round_trips", "Обращений к БД"),
+            ("stage_sql_seconds", "sql_seconds", "Время в вызовах БД"),
+            ("stage_retries", "retries", "Повторных попыток"),
+            ("stage_cache_hits", "cache_hits", "Попаданий в кэш"),
+            ("stage_cache_misses", "cache_misses", "Промахов кэша"),
+            ("stage_quarantined", "quarantined", "Записей, отправленных в карантин"),
+            ("stage_errors", "errors", "Этапов, завершившихся ошибкой"),
+            ("stage_peak_rss_megabytes", "peak_rss_mb", "Пиковый RSS процесса на конец этапа"),
+        )
+        stages = self.report()["stages"]
+        for metric, key, help_text in gauges:
+            lines.append(f"# HELP {job}_{metric} {help_text}")
+            lines.append(f"# TYPE {job}_{metric} gauge")
+            for name, data in stages.items():
+                if data.get(key) is not None:
+                    lines.append(f'{job}_{metric}{{stage="{name}"}} {data[key]}')
+        lines.append(f"# TYPE {job}_last_run_timestamp_seconds gauge")
+        lines.append(f"{job}_last_run_timestamp_seconds {time.time():.0f}")
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+    def export(self, directory=None, prefix="run"):
+        directory = directory or self.metrics_dir
+        self.log_summary()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.write_json(os.path.join(directory, f"{prefix}_report.json"))
+        self.write_prometheus(os.path.join(directory, f"{prefix}.prom"))
+        logger.info(f"Отчёт о метриках записан в {directory}.")
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+METRICS = RunMetrics()
+
+
+def stage(name):
+    return METRICS.stage(name)
+
+
+def record(**counters):
+    METRICS.record(**counters)
+
+
+def rows_of(result):
+    if result is None:
+        return 0
+    if isinstance(result, tuple):
+        return sum(rows_of(item) for item in result)
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+def add_arguments(parser):
+    parser.add_argument("--metrics-dir", default=METRICS_DIR,
+                        help="каталог для JSON-отчёта о прогоне и Prometheus textfile")
+    parser.add_argument("--profile-stage", default=PROFILE_STAGE,
+                        help="имя этапа, для которого сохранить cProfile-дамп (<metrics-dir>/<этап>.prof)")
+
+
+def configure(metrics_dir=None, profile_stage=None):
+    METRICS.metrics_dir = metrics_dir
+    METRICS.profile_stage = profile_stage
+
+
+def instrument(name, rows=None):
+    # rows - функция (args, result) -> число строк; по умолчанию считается длина результата
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                result = fn(*args, **kwargs)
+                record(rows=rows(args, result) if rows else rows_of(result))
+                return result
+        return wrapper
+    return decorator
+
+
+def rows_arg(index):
+    return lambda args, result: rows_of(args[index]) if len(args) > index else 0
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record(sql_round_trips=1, sql_seconds=time.perf_counter() - started)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record(sql_round_trips=1, sql_seconds=time.perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        if not self.name:
+            return super().fetchmany(size) if size is not None else super().fetchmany()
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(size) if size is not None else super().fetchmany()
+        finally:
+            record(sql_round_trips=1, sql_seconds=time.perf_counter() - started)
@@ -0,0 +1,223 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from db.connection import get_connection, ConnectionPool, POOL_MIN, POOL_MAX, STATEMENT_TIMEOUT_MS
+from db.aggregates import refresh_aggregates, AGGREGATES
+from db.migrations import migrate
+from extract_data import (
+    fetch_sources, fetch_entity, select_loaders, load_entity, ENTITIES, LOAD_MODES, RAW_FIELD_MAP
+)
+from api.cache import ResponseCache
+from api.query import QUERY_PAGE_SIZE
+from api.landing import SnapshotWriter, find_snapshot, read_snapshot, LANDING_DIR, LANDING_FORMATS
+from db.parallel_load import shutdown_workers, LOAD_WORKERS, PARTITION_STRATEGIES
+from load_data import transform_and_load, WRITE_MODES
+from transform_data import TARGET_SOURCES, TRANSFORM_ENGINES
+from taskgraph import TaskGraph, TASK_RETRIES, TASK_TIMEOUT, TASK_CONCURRENCY
+import metrics
+from metrics import stage
+
+logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def load_entity_pooled(pool, entity, batches, loader, incremental):
+    with pool.connection() as conn, stage(f"load_{entity}"):
+        started = time.perf_counter()
+        total, report = load_entity(conn, entity, batches, loader, incremental)
+        logger.info(f"[{entity}] загружено {total} записей за {time.perf_counter() - started:.3f} с.")
+        return total, report
+
+
+def run(pool, load_mode="bulk", incremental=False, use_cache=False, offline=False, stream=False,
+        page_size=QUERY_PAGE_SIZE, engine="sql", write_mode="swap", replay=None, land=False,
+        landing_format="ndjson", landing_dir=LANDING_DIR, workers=LOAD_WORKERS, partition_by="hash", force=False):
+    loaders = select_loaders(load_mode, workers, partition_by)
+
+    with pool.connection() as conn:
+        migrate(conn)
+
+    started = time.perf_counter()
+    with stage("fetch_sources"):
+        sources = fetch_sources(stream, page_size, use_cache, offline, replay=replay, land=land,
+                                landing_format=landing_format, landing_dir=landing_dir)
+
+    # Сущности независимы до аналитического слоя: каждая грузится на своём соединении из пула
+    report = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(ENTITIES), thread_name_prefix="load") as executor:
+            futures = {
+                entity: executor.submit(load_entity_pooled, pool, entity, sources[entity], loaders[entity], incremental)
+                for entity in ENTITIES
+            }
+            received = 0
+            for entity, future in futures.items():
+                total, report[entity] = future.result()
+                received += total
+    finally:
+        shutdown_workers()
+    logger.info(f"Извлечение и загрузка raw-данных завершены за {time.perf_counter() - started:.3f} с.")
+
+    if not received:
+        logger.warning("Данные не были получены из API. Трансформация не будет выполнена.")
+        return report
+
+    started = time.perf_counter()
+    with pool.connection() as conn, stage("transform_and_load"):
+        transform_and_load(conn, engine, write_mode, force=force)
+    with pool.connection() as conn, stage("aggregates"):
+        refresh_aggregates(conn, rebuild=force)
+    logger.info(f"Трансформация и загрузка аналитики завершены за {time.perf_counter() - started:.3f} с.")
+    return report
+
+
+@contextmanager
+def task_connection(pool):
+    # Без пула (задачи, экспортированные в Airflow, выполняются в отдельных процессах) - своё соединение на задачу
+    if pool is not None:
+        with pool.connection() as conn:
+            yield conn
+        return
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def target_entities(target):
+    # Сущности, чьи raw-таблицы читает трансформация target
+    return [entity for entity, tables in RAW_FIELD_MAP.items() if set(TARGET_SOURCES[target]) & set(tables)]
+
+
+def aggregate_entities():
+    # Сущности, чьи raw-таблицы питают сводные таблицы
+    sources = {source for source, _, _, _ in AGGREGATES.values()}
+    return [entity for entity, tables in RAW_FIELD_MAP.items() if sources & set(tables)]
+
+
+def build_graph(pool=None, load_mode="bulk", incremental=False, use_cache=False, offline=False, stream=False,
+                page_size=QUERY_PAGE_SIZE, engine="sql", write_mode="swap", replay=None,
+                landing_format="ndjson", landing_dir=LANDING_DIR, workers=LOAD_WORKERS, partition_by="hash",
+                force=False, retries=TASK_RETRIES, timeout=TASK_TIMEOUT):
+    # Цепочка на сущность: fetch_<сущность> -> load_<сущность> -> build_<таблица>. Задачи обмениваются
+    # путями к снимкам в зоне приземления, поэтому загрузку можно перезапустить без повторного обращения к API.
+    loaders = select_loaders(load_mode, workers, partition_by)
+    cache = ResponseCache(offline=offline) if use_cache or offline else None
+    graph = TaskGraph("spacex_pipeline")
+    options = {"retries": retries, "timeout": timeout}
+
+    def migrate_task(inputs):
+        with task_connection(pool) as conn:
+            return {"version": migrate(conn)}
+
+    def fetch_task(entity):
+        def run_fetch(inputs):
+            if replay:
+                return {"snapshot": find_snapshot(entity, replay, landing_dir)}
+            writer = SnapshotWriter(entity, directory=landing_dir, fmt=landing_format)
+            try:
+                for batch in fetch_entity(entity, stream, page_size, cache):
+                    writer.write(batch)
+            except BaseException:
+                writer.abort()
+                raise
+            return {"snapshot": writer.close(), "records": writer.count}
+        return run_fetch
+
+    def load_task(entity):
+        def run_load(inputs):
+            batches = read_snapshot(inputs[f"fetch_{entity}"]["snapshot"])
+            with task_connection(pool) as conn:
+                total, report = load_entity(conn, entity, batches, loaders[entity], incremental)
+            return {"records": total, **report}
+        return run_load
+
+    def build_task(target):
+        def run_build(inputs):
+            if not any(result["records"] for result in inputs.values() if "records" in result):
+                logger.warning(f"[{target}] исходные данные не получены, трансформация пропущена.")
+                return {target: "skipped"}
+            with task_connection(pool) as conn:
+                return transform_and_load(conn, engine, write_mode, force=force, targets=(target,))
+        return run_build
+
+    def aggregates_task(inputs):
+        with task_connection(pool) as conn:
+            return refresh_aggregates(conn, rebuild=force)
+
+    graph.add("migrate", migrate_task, **options)
+    for entity in ENTITIES:
+        graph.add(f"fetch_{entity}", fetch_task(entity), **options)
+        graph.add(f"load_{entity}", load_task(entity), ("migrate", f"fetch_{entity}"), **options)
+    for target in TARGET_SOURCES:
+        upstream = [f"load_{entity}" for entity in target_entities(target)]
+        graph.add(f"build_{target}", build_task(target), upstream, **options)
+    graph.add("build_aggregates", aggregates_task, [f"load_{entity}" for entity in aggregate_entities()], **options)
+    return graph
+
+
+def run_dag(pool, run_id=None, concurrency=TASK_CONCURRENCY, **options):
+    graph = build_graph(pool, **options)
+    try:
+        return graph.run(run_id, max_workers=concurrency)
+    finally:
+        shutdown_workers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Полный прогон extract -> transform -> load в одном процессе.")
+    parser.add_argument("--load-mode", choices=LOAD_MODES, default="bulk")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--page-size", type=int, default=QUERY_PAGE_SIZE)
+    parser.add_argument("--engine", choices=TRANSFORM_ENGINES, default="sql")
+    parser.add_argument("--write-mode", choices=WRITE_MODES, default="swap")
+    parser.add_argument("--workers", type=int, default=LOAD_WORKERS)
+    parser.add_argument("--partition-by", choices=PARTITION_STRATEGIES, default="hash")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--land", action="store_true")
+    parser.add_argument("--landing-format", choices=LANDING_FORMATS, default="ndjson")
+    parser.add_argument("--landing-dir", default=LANDING_DIR)
+    parser.add_argument("--replay", nargs="?", const="latest", metavar="YYYY-MM-DD")
+    parser.add_argument("--pool-min", type=int, default=POOL_MIN)
+    parser.add_argument("--pool-max", type=int, default=max(POOL_MAX, len(ENTITIES)))
+    parser.add_argument("--statement-timeout-ms", type=int, default=STATEMENT_TIMEOUT_MS)
+    parser.add_argument("--dag", action="store_true",
+                        help="граф задач: цепочки fetch -> load -> build по сущностям выполняются независимо")
+    parser.add_argument("--run-id", help="идентификатор прогона графа; повторный запуск продолжает с упавших задач")
+    parser.add_argument("--task-retries", type=int, default=TASK_RETRIES)
+    parser.add_argument("--task-timeout", type=float, default=TASK_TIMEOUT)
+    parser.add_argument("--task-concurrency", type=int, default=TASK_CONCURRENCY)
+    metrics.add_arguments(parser)
+    args = parser.parse_args()
+    metrics.configure(args.metrics_dir, args.profile_stage)
+
+    pool = ConnectionPool(args.pool_min, args.pool_max, args.statement_timeout_ms)
+    try:
+        if args.dag:
+            run_dag(pool, args.run_id, args.task_concurrency, load_mode=args.load_mode, incremental=args.incremental,
+                    use_cache=args.cache, offline=args.offline, stream=args.stream, page_size=args.page_size,
+                    engine=args.engine, write_mode=args.write_mode, replay=args.replay,
+                    landing_format=args.landing_format, landing_dir=args.landing_dir, workers=args.workers,
+                    partition_by=args.partition_by, force=args.force, retries=args.task_retries,
+                    timeout=args.task_timeout)
+        else:
+            run(pool, args.load_mode, args.incremental, args.cache, args.offline, args.stream, args.page_size,
+                args.engine, args.write_mode, args.replay, args.land, args.landing_format, args.landing_dir,
+                args.workers, args.partition_by, args.force)
+    except Exception as e:
+        logger.error(f"Ошибка в пайплайне: {e}")
+        raise
+    finally:
+        pool.closeall()
+        metrics.METRICS.export(prefix="pipeline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.getenv("SPACEX_CHECKPOINT_DIR", os.path.join(PIPELINE_DIR, "checkpoints"))
+TASK_RETRIES = int(os.getenv("SPACEX_TASK_RETRIES", "2"))
+TASK_RETRY_DELAY = float(os.getenv("SPACEX_TASK_RETRY_DELAY", "5"))
+TASK_TIMEOUT = float(os.getenv("SPACEX_TASK_TIMEOUT", "3600"))
+TASK_CONCURRENCY = int(os.getenv("SPACEX_TASK_CONCURRENCY", "4"))
+
+
+class Task:
+    # fn(inputs) получает {имя вышестоящей задачи: её результат}; результат должен сериализоваться в JSON,
+    # так как сохраняется в контрольной точке (и в XCom при экспорте в Airflow)
+
+    def __init__(self, name, fn, upstream=(), retries=TASK_RETRIES, retry_delay=TASK_RETRY_DELAY,
+                 timeout=TASK_TIMEOUT):
+        self.name = name
+        self.fn = fn
+        self.upstream = tuple(upstream)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+
+class TaskGraph:
+
+    def __init__(self, name):
+        self.name = name
+        self.tasks = {}
+
+    def add(self, name, fn, upstream=(), **options):
+        # Зависимости должны быть добавлены раньше задачи, поэтому граф всегда ацикличен
+        if name in self.tasks:
+            raise ValueError(f"Задача {name} уже есть в графе {self.name}")
+        for dep in upstream:
+            if dep not in self.tasks:
+                raise ValueError(f"Задача {name} зависит от неизвестной задачи {dep}")
+        self.tasks[name] = Task(name, fn, upstream, **options)
+        return name
+
+    def run(self, run_id=None, checkpoint_dir=CHECKPOINT_DIR, max_workers=TASK_CONCURRENCY):
+        run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = checkpoint_path(self.name, run_id, checkpoint_dir)
+        checkpoint = load_checkpoint(path)
+        states = checkpoint.setdefault("tasks", {})
+        checkpoint["run_id"] = run_id
+
+        results = {
+            name: state["result"] for name, state in states.items()
+            if state.get("status") == "success" and name in self.tasks
+        }
+        logger.info(f"[{self.name}] прогон {run_id}, контрольная точка: {path}.")
+        if results:
+            logger.info(f"[{self.name}] продолжение прогона: пропускаются выполненные задачи {', '.join(results)}.")
+
+        pending = [name for name in self.tasks if name not in results]
+        attempts = {name: 0 for name in pending}
+        not_before = {}
+        running = {}
+        failed = {}
+        hung = False
+
+        def finish(name, status, **fields):
+            states[name] = {"status": status, "attempts": attempts.get(name, 0),
+                            "finished_at": datetime.now(timezone.utc).isoformat(), **fields}
+            save_checkpoint(path, checkpoint)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        try:
+            while pending or running:
+                now = time.monotonic()
+                for name in list(pending):
+                    task = self.tasks[name]
+                    if any(dep in failed for dep in task.upstream):
+                        pending.remove(name)
+                        failed[name] = "upstream_failed"
+                        logger.warning(f"[{self.name}] {name} пропущена: вышестоящая задача завершилась с ошибкой.")
+                        finish(name, "upstream_failed")
+                    elif all(dep in results for dep in task.upstream) and not_before.get(name, 0) <= now:
+                        pending.remove(name)
+                        attempts[name] += 1
+                        inputs = {dep: results[dep] for dep in task.upstream}
+                        future = executor.submit(self._execute, task, inputs, attempts[name])
+                        running[future] = (name, now + task.timeout, now)
+
+                deadlines = [deadline for _, deadline, _ in running.values()]
+                deadlines += [not_before[name] for name in pending if name in not_before]
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                if not running:
+                    time.sleep(timeout or 0)
+                    continue
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    name, _, started = running.pop(future)
+                    task = self.tasks[name]
+                    elapsed = time.monotonic() - started
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        if attempts[name] <= task.retries:
+                            delay = task.retry_delay * 2 ** (attempts[name] - 1)
+                            logger.warning(f"[{self.name}] {name}: ошибка в попытке {attempts[name]} ({e}), "
+                                           f"повтор через {delay:.1f} с.")
+                            not_before[name] = time.monotonic() + delay
+                            pending.append(name)
+                        else:
+                            failed[name] = repr(e)
+                            logger.error(f"[{self.name}] {name}: исчерпаны попытки ({attempts[name]}): {e}")
+                            finish(name, "failed", error=repr(e), seconds=elapsed)
+                        continue
+                    logger.info(f"[{self.name}] {name} выполнена за {elapsed:.3f} с.")
+                    finish(name, "success", result=results[name], seconds=elapsed)
+
+                # Поток нельзя прервать: задача с истёкшим таймаутом помечается упавшей и не повторяется,
+                # чтобы повтор не выполнялся одновременно с ещё работающей попыткой
+                now = time.monotonic()
+                for future, (name, deadline, started) in list(running.items()):
+                    if deadline <= now:
+                        running.pop(future)
+                        hung = True
+                        failed[name] = "timeout"
+                        logger.error(f"[{self.name}] {name}: превышен таймаут {self.tasks[name].timeout} с.")
+                        finish(name, "timeout", seconds=now - started)
+        finally:
+            executor.shutdown(wait=not hung, cancel_futures=True)
+
+        errors = {name: reason for name, reason in failed.items() if reason != "upstream_failed"}
+        if failed:
+            raise RuntimeError(
+                f"Граф {self.name}: задачи завершились с ошибкой ({', '.join(errors)}), "
+                f"пропущены: {', '.join(set(failed) - set(errors)) or 'нет'}. "
+                f"Для продолжения с упавших задач: --run-id {run_id}"
+            )
+        logger.info(f"[{self.name}] прогон {run_id} завершён: {len(results)} задач.")
+        return results
+
+    def _execute(self, task, inputs, attempt):
+        with stage(f"task_{task.name}"):
+            logger.info(f"[{self.name}] {task.name}: попытка {attempt}/{task.retries + 1}.")
+            return task.fn(inputs)
+
+
+def checkpoint_path(graph_name, run_id, directory=CHECKPOINT_DIR):
+    return os.path.join(directory, graph_name, f"{run_id}.json")
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path, checkpoint):
+    # Запись через временный файл: падение процесса не оставляет обрезанную контрольную точку
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _require_airflow():
+    try:
+        from airflow import DAG
+    except ImportError as e:
+        raise RuntimeError("Для экспорта графа требуется Apache Airflow (pip install apache-airflow).") from e
+    try:
+        from airflow.providers.standard.operators.python import PythonOperator
+    except ImportError:
+        from airflow.operators.python import PythonOperator
+    return DAG, PythonOperator
+
+
+def _airflow_callable(task):
+    # Результаты вышестоящих задач приходят через XCom, контрольные точки и повторы берёт на себя Airflow
+    def call(ti=None, **context):
+        return task.fn({dep: ti.xcom_pull(task_ids=dep) for dep in task.upstream})
+    return call
+
+
+def to_airflow_dag(graph, dag_id=None, **dag_kwargs):
+    DAG, PythonOperator = _require_airflow()
+    dag = DAG(dag_id or graph.name, **dag_kwargs)
+    operators = {}
+    for task in graph.tasks.values():
+        operators[task.name] = PythonOperator(
+            task_id=task.name,
+            python_callable=_airflow_callable(task),
+            retries=task.retries,
+            retry_delay=timedelta(seconds=task.retry_delay),
+            retry_exponential_backoff=True,
+            execution_timeout=timedelta(seconds=task.timeout),
+            dag=dag,
+        )
+        for dep in task.upstream:
+            operators[dep] >> operators[task.name]
+    return dag
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Паузы между попытками не выполняются, а записываются
+    recorded = []
+    monkeypatch.setattr("time.sleep", recorded.append)
+    return recorded
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    # Тесты со схемой БД выполняются только на отдельной базе из SPACEX_TEST_DB_NAME (сервер и пользователь -
+    # из DB_HOST/DB_USER/...): схемы spacex_data и spacex_analytics в ней удаляются перед каждым тестом
+    name = os.getenv("SPACEX_TEST_DB_NAME")
+    if not name:
+        pytest.skip("SPACEX_TEST_DB_NAME не задан: тесты на PostgreSQL пропущены")
+    monkeypatch.setenv("DB_NAME", name)
+    from db.connection import get_connection
+
+    conn = get_connection()
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA IF EXISTS spacex_data CASCADE; DROP SCHEMA IF EXISTS spacex_analytics CASCADE;")
+    conn.commit()
+    yield conn
+    conn.close()
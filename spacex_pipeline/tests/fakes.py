@@ -0,0 +1,37 @@
+import json
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+        self.content = json.dumps(payload).encode() if payload is not None else b""
+
+    def json(self):
+        if self._payload is None:
+            raise json.JSONDecodeError("пустое тело", "", 0)
+        return self._payload
+
+
+class FakeSession:
+    # Отдаёт заранее заданные ответы по очереди; исключение в очереди поднимается вместо ответа
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def _next(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def get(self, url, **kwargs):
+        return self._next("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._next("POST", url, **kwargs)
+
+    def close(self):
+        pass
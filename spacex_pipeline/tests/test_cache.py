@@ -0,0 +1,85 @@
+import types
+
+import pytest
+
+from api import cache as cache_module
+from api.cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Управляемое время для TTL и порядка доступа (LRU)
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_store_and_load_round_trip(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), ttl=60, max_bytes=10**6)
+    cache.store("https://api/launches", [{"id": "a"}], etag='"v1"')
+
+    reopened = ResponseCache(str(tmp_path), ttl=60, max_bytes=10**6)
+    meta = reopened.lookup("https://api/launches")
+    assert reopened.load("https://api/launches") == [{"id": "a"}]
+    assert reopened.conditional_headers(meta) == {"If-None-Match": '"v1"'}
+
+
+def test_entry_expires_after_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), ttl=60, max_bytes=10**6)
+    cache.store("https://api/rockets", {"id": "r"}, etag='"v1"')
+    assert cache.is_fresh(cache.lookup("https://api/rockets"))
+
+    clock[0] += 60
+    assert not cache.is_fresh(cache.lookup("https://api/rockets"))
+
+
+def test_revalidated_load_restarts_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), ttl=60, max_bytes=10**6)
+    cache.store("https://api/rockets", {"id": "r"}, etag='"v1"')
+    clock[0] += 120
+    assert cache.load("https://api/rockets", revalidated=True) == {"id": "r"}
+    assert cache.is_fresh(cache.lookup("https://api/rockets"))
+    assert cache.revalidated == 1
+
+
+def test_stale_entry_without_validators_is_purged(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), ttl=60, max_bytes=10**6)
+    cache.store("https://api/plain", {"id": "p"})
+    cache.store("https://api/tagged", {"id": "t"}, last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+    clock[0] += 61
+    cache.store("https://api/new", {"id": "n"})
+
+    assert cache.lookup("https://api/plain") is None
+    assert not (tmp_path / f"{ResponseCache.key('https://api/plain')}.pickle").exists()
+    # Устаревшую запись с Last-Modified ещё можно перепроверить условным запросом
+    assert cache.lookup("https://api/tagged") is not None
+
+
+def test_lru_eviction_over_max_bytes(tmp_path, clock):
+    probe = ResponseCache(str(tmp_path / "probe"))
+    probe.store("https://api/x", "x" * 1000)
+    size = probe.lookup("https://api/x")["size"]
+
+    cache = ResponseCache(str(tmp_path / "cache"), ttl=3600, max_bytes=2 * size)
+    cache.store("https://api/a", "a" * 1000)
+    clock[0] += 1
+    cache.store("https://api/b", "b" * 1000)
+    clock[0] += 1
+    cache.load("https://api/a")
+    clock[0] += 1
+    cache.store("https://api/c", "c" * 1000)
+
+    # b дольше всех не читали - она и вытесняется
+    assert cache.lookup("https://api/b") is None
+    assert cache.load("https://api/a") == "a" * 1000
+    assert cache.load("https://api/c") == "c" * 1000
+
+
+def test_missing_body_drops_index_entry(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path), ttl=60, max_bytes=10**6)
+    cache.store("https://api/gone", {"id": "g"}, etag='"v1"')
+    (tmp_path / f"{ResponseCache.key('https://api/gone')}.pickle").unlink()
+
+    assert cache.load("https://api/gone") is None
+    assert cache.lookup("https://api/gone") is None
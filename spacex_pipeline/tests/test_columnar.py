@@ -0,0 +1,23 @@
+import pytest
+
+from benchmarks.bench_flatten import GENERATORS, run_columnar, run_loop
+
+# Документы с отсутствующими и пустыми вложенными объектами: колоночный разбор переходит на dict.get
+EDGE_CASES = {
+    "launches": [
+        {"id": "bare"},
+        {"id": "nulls", "fairings": None, "links": None, "failures": None, "cores": None, "payloads": None},
+        {"id": "partial", "fairings": {"reused": True}, "links": {"patch": None, "reddit": {"media": "m"}},
+         "failures": [{"reason": "tab\tnew\nline \\ slash"}], "cores": [{"core": "c1"}, {}],
+         "payloads": ["p1", "p2"], "crew": [], "ships": ["s1"], "capsules": ["k1"]},
+    ],
+    "rockets": [{"id": "r1"}, {"id": "r2", "height": {"meters": 70}, "payload_weights": [], "mass": None}],
+    "payloads": [{"id": "p1"}, {"id": "p2", "mass_kg": 1.5, "customers": ["NASA"], "orbit": None}],
+}
+
+
+@pytest.mark.parametrize("entity", sorted(GENERATORS))
+def test_columnar_copy_matches_row_loop(entity):
+    # COPY-текст колоночного разбора (RAW_FIELD_MAP) должен совпадать с построчным циклом байт в байт
+    documents = list(GENERATORS[entity](500, 7)) + EDGE_CASES[entity]
+    assert run_columnar(entity, documents) == run_loop(entity, documents)
@@ -0,0 +1,107 @@
+import requests
+
+from api.get_data import fetch_endpoint, fetch_data
+from benchmarks.stub_server import StubSpaceXServer
+from tests.fakes import FakeResponse, FakeSession
+
+URL = "http://api.test/v4/launches"
+
+
+class FakeCache:
+    offline = False
+
+    def __init__(self, body):
+        self.body = body
+        self.stored = []
+
+    def lookup(self, url):
+        return {"etag": '"v1"'}
+
+    def is_fresh(self, meta):
+        return False
+
+    def conditional_headers(self, meta):
+        return {"If-None-Match": meta["etag"]} if meta else {}
+
+    def load(self, url, revalidated=False):
+        return self.body
+
+    def store(self, url, data, etag=None, last_modified=None):
+        self.stored.append(data)
+
+
+def test_retries_transient_statuses_then_succeeds(sleeps):
+    session = FakeSession(FakeResponse(503), FakeResponse(429), FakeResponse(200, [{"id": "a"}]))
+    data, stats = fetch_endpoint(session, "launches", URL, retries=3)
+    assert data == [{"id": "a"}]
+    assert stats["attempts"] == 3
+    assert stats["status"] == 200
+    assert len(sleeps) == 2
+
+
+def test_gives_up_after_last_attempt(sleeps):
+    session = FakeSession(*(FakeResponse(500) for _ in range(3)))
+    data, stats = fetch_endpoint(session, "launches", URL, retries=2)
+    assert data is None
+    assert stats["attempts"] == 3
+    assert len(session.calls) == 3
+    # после последней попытки паузы нет
+    assert len(sleeps) == 2
+
+
+def test_non_retryable_status_is_not_retried(sleeps):
+    session = FakeSession(FakeResponse(404))
+    data, stats = fetch_endpoint(session, "launches", URL, retries=3)
+    assert data is None
+    assert stats["attempts"] == 1
+    assert sleeps == []
+
+
+def test_timeout_is_passed_to_session_and_retried(sleeps):
+    session = FakeSession(requests.Timeout("read timeout"), FakeResponse(200, []))
+    data, stats = fetch_endpoint(session, "launches", URL, timeout=2.5, retries=1)
+    assert data == []
+    assert stats["attempts"] == 2
+    assert all(kwargs["timeout"] == 2.5 for _, _, kwargs in session.calls)
+
+
+def test_timeout_on_every_attempt_returns_none(sleeps):
+    session = FakeSession(*(requests.Timeout("read timeout") for _ in range(2)))
+    data, stats = fetch_endpoint(session, "launches", URL, retries=1)
+    assert data is None
+    assert stats["attempts"] == 2
+
+
+def test_not_modified_is_terminal_success(sleeps):
+    cache = FakeCache([{"id": "cached"}])
+    session = FakeSession(FakeResponse(304))
+    data, stats = fetch_endpoint(session, "launches", URL, retries=3, cache=cache)
+    assert data == [{"id": "cached"}]
+    assert stats["attempts"] == 1
+    assert stats["cache"] == "revalidated"
+    assert session.calls[0][2]["headers"] == {"If-None-Match": '"v1"'}
+    assert sleeps == []
+
+
+def test_not_modified_without_cached_body_refetches_in_same_attempt(sleeps):
+    cache = FakeCache(None)
+    session = FakeSession(FakeResponse(304), FakeResponse(200, [{"id": "fresh"}]))
+    data, stats = fetch_endpoint(session, "launches", URL, retries=3, cache=cache)
+    assert data == [{"id": "fresh"}]
+    assert stats["attempts"] == 1
+    assert "headers" not in session.calls[1][2]
+    assert cache.stored == [[{"id": "fresh"}]]
+    assert sleeps == []
+
+
+def test_fetch_data_against_stub_server():
+    dataset = {"launches": [{"id": "l1"}], "rockets": [{"id": "r1"}, {"id": "r2"}], "payloads": []}
+    with StubSpaceXServer(dataset) as server:
+        stats = {}
+        launches, rockets, payloads = fetch_data(base_url=server.base_url, stats=stats)
+        assert (launches, rockets, payloads) == (dataset["launches"], dataset["rockets"], [])
+        assert {name: s["status"] for name, s in stats.items()} == {"launches": 200, "rockets": 200, "payloads": 200}
+
+        launches, rockets, payloads = fetch_data(base_url=server.base_url, endpoints=("rockets",))
+        assert launches is None and payloads is None
+        assert rockets == dataset["rockets"]
@@ -0,0 +1,78 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from api import landing
+from api.landing import SnapshotWriter, find_snapshot, land_pages, read_snapshot, write_snapshot
+
+RUN_AT = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+
+RECORDS = [
+    {"id": "a", "flight_number": 1, "success": True, "mass_kg": 1.5, "cores": [{"core": "c1", "reused": False}],
+     "fairings": {"recovered": None}, "details": "Первый"},
+    {"id": "b", "flight_number": 2, "success": None, "mass_kg": 2, "cores": [], "fairings": None},
+    {"id": "c", "flight_number": 3, "success": False, "mass_kg": None, "window": 0, "details": None},
+]
+
+
+def replayed(path, batch_size=2):
+    return [record for batch in read_snapshot(path, batch_size) for record in batch]
+
+
+def dumps(records):
+    return [json.dumps(record, sort_keys=True) for record in records]
+
+
+def test_ndjson_round_trip(tmp_path):
+    path = write_snapshot("launches", RECORDS, RUN_AT, str(tmp_path))
+
+    assert path.endswith(".ndjson.gz")
+    assert find_snapshot("launches", "2024-05-01", str(tmp_path)) == path
+    assert [len(batch) for batch in read_snapshot(path, 2)] == [2, 1]
+    assert replayed(path) == RECORDS
+
+
+def test_land_pages_tees_pages_and_aborts_without_partial_file(tmp_path):
+    pages = iter([RECORDS[:2], RECORDS[2:]])
+    writer = SnapshotWriter("launches", RUN_AT, str(tmp_path))
+    assert list(land_pages(pages, writer)) == [RECORDS[:2], RECORDS[2:]]
+    assert replayed(writer.path) == RECORDS
+
+    def failing():
+        yield RECORDS[:1]
+        raise ConnectionError("обрыв")
+
+    broken = SnapshotWriter("rockets", RUN_AT, str(tmp_path))
+    with pytest.raises(ConnectionError):
+        list(land_pages(failing(), broken))
+    with pytest.raises(FileNotFoundError):
+        find_snapshot("rockets", None, str(tmp_path))
+    assert not list((tmp_path / "rockets").rglob("*.tmp"))
+
+
+def test_parquet_round_trip_restores_json_columns(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    # Несколько групп строк: типы колонок должны согласовываться между группами, а колонка,
+    # впервые появившаяся в последней группе, - попасть в схему
+    monkeypatch.setattr(landing, "PARQUET_ROW_GROUP_SIZE", 2)
+    path = write_snapshot("launches", RECORDS, RUN_AT, str(tmp_path), fmt="parquet")
+
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(path)
+    assert parquet_file.metadata.num_row_groups == 2
+    json_columns = json.loads(parquet_file.schema_arrow.metadata[landing.JSON_COLUMNS_KEY])
+    # mass_kg смешивает float и int, cores/fairings вложенные; success - bool во всех группах,
+    # window (только в последней группе) - целое
+    assert sorted(json_columns) == ["cores", "fairings", "mass_kg"]
+    assert str(parquet_file.schema_arrow.field("window").type) == "int64"
+
+    expected = [{column: record.get(column) for column in parquet_file.schema_arrow.names} for record in RECORDS]
+    assert dumps(replayed(path)) == dumps(expected)
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_parquet_snapshot_without_records(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = write_snapshot("crew", [], RUN_AT, str(tmp_path), fmt="parquet")
+    assert replayed(path) == []
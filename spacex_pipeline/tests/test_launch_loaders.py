@@ -0,0 +1,41 @@
+import pytest
+
+from db.migrations import migrate
+from extract_data import select_loaders
+
+
+def launch(launch_id, date_utc):
+    return {
+        "id": launch_id, "flight_number": 1, "name": launch_id, "date_utc": date_utc, "upcoming": date_utc is None,
+        "fairings": {"reused": False}, "links": {"patch": {}, "reddit": {}}, "failures": [],
+        "cores": [{"core": f"{launch_id}-core"}], "payloads": [f"{launch_id}-payload"],
+    }
+
+
+def rows(conn, query):
+    with conn.cursor() as cur:
+        cur.execute(query)
+        result = sorted(cur.fetchall())
+    conn.commit()
+    return result
+
+
+@pytest.mark.parametrize("load_mode", ["row", "bulk", "isolated"])
+def test_launch_without_date_is_routed_to_side_table(test_db, load_mode):
+    conn = test_db
+    migrate(conn)
+    load = select_loaders(load_mode)["launches"]
+
+    result = load(conn, [launch("dated", "2021-01-01T00:00:00.000Z"), launch("undated", None)])
+
+    assert not (result or {}).get("quarantined")
+    assert rows(conn, "SELECT id FROM spacex_data.raw_spacex_launches_data") == [("dated",)]
+    assert rows(conn, "SELECT id FROM spacex_data.raw_spacex_launches_data_null_date") == [("undated",)]
+    assert rows(conn, "SELECT launch_id FROM spacex_data.raw_spacex_cores_data") == [("dated",), ("undated",)]
+    assert rows(conn, "SELECT count(*) FROM spacex_data.load_quarantine") == [(0,)]
+
+    # Получив дату, запуск переходит в основную таблицу; его дочерние строки заменяются, а не дублируются
+    load(conn, [launch("undated", "2022-06-01T00:00:00.000Z")])
+    assert rows(conn, "SELECT id FROM spacex_data.raw_spacex_launches_data") == [("dated",), ("undated",)]
+    assert rows(conn, "SELECT id FROM spacex_data.raw_spacex_launches_data_null_date") == []
+    assert rows(conn, "SELECT launch_id FROM spacex_data.raw_spacex_cores_data") == [("dated",), ("undated",)]
@@ -0,0 +1,25 @@
+import pytest
+
+from load_data import shadow_index_definition
+
+
+def test_shadow_index_on_partitioned_table_drops_only():
+    definition = ("CREATE INDEX fct_launches_success_idx ON ONLY spacex_analytics.fct_launches "
+                  "USING btree (success) WHERE (success IS NOT NULL)")
+    assert shadow_index_definition(definition, "fct_launches_success_idx", "fct_launches") == (
+        "CREATE INDEX fct_launches_success_idx__new ON spacex_analytics.fct_launches__new "
+        "USING btree (success) WHERE (success IS NOT NULL)"
+    )
+
+
+def test_shadow_unique_index_keeps_definition():
+    definition = "CREATE UNIQUE INDEX dim_payloads_name_key ON spacex_analytics.dim_payloads USING btree (name)"
+    assert shadow_index_definition(definition, "dim_payloads_name_key", "dim_payloads") == (
+        "CREATE UNIQUE INDEX dim_payloads_name_key__new ON spacex_analytics.dim_payloads__new USING btree (name)"
+    )
+
+
+def test_shadow_index_for_other_table_is_rejected():
+    definition = "CREATE INDEX fct_launches_success_idx ON spacex_analytics.fct_launches USING btree (success)"
+    with pytest.raises(RuntimeError):
+        shadow_index_definition(definition, "fct_launches_success_idx", "dim_payloads")
@@ -0,0 +1,39 @@
+import extract_data
+
+
+def run_incremental(monkeypatch, state, batches, failed=()):
+    # Состояние извлечения хранится в словаре вместо spacex_data.extract_record_state
+    loaded = []
+    monkeypatch.setattr(extract_data, "load_hashes", lambda conn, entity: dict(state))
+    monkeypatch.setattr(extract_data, "load_watermark", lambda conn, entity: None)
+    monkeypatch.setattr(extract_data, "save_state",
+                        lambda conn, entity, hashes, watermark=None: state.update(hashes))
+
+    def loader(conn, records):
+        loaded.extend(record["id"] for record in records)
+        return {"quarantined": [record["id"] for record in records if record["id"] in failed]}
+
+    total, report = extract_data.load_entity(None, "rockets", batches, loader, incremental=True)
+    return loaded, report
+
+
+def test_failed_records_are_retried_on_next_run(monkeypatch):
+    state = {}
+    records = [{"id": "r1", "name": "Falcon 1"}, {"id": "r2", "name": "Falcon 9"}]
+
+    loaded, report = run_incremental(monkeypatch, state, [records], failed={"r2"})
+    assert loaded == ["r1", "r2"]
+    assert set(state) == {"r1"}
+
+    loaded, report = run_incremental(monkeypatch, state, [records])
+    assert loaded == ["r2"]
+    assert report["skipped"] == 1
+
+
+def test_failed_record_is_not_skipped_later_in_same_run(monkeypatch):
+    state = {}
+    record = {"id": "r1", "name": "Falcon 1"}
+
+    loaded, report = run_incremental(monkeypatch, state, [[record], [dict(record)]], failed={"r1"})
+    assert loaded == ["r1", "r1"]
+    assert state == {}
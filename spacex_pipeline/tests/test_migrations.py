@@ -0,0 +1,129 @@
+import logging
+import re
+
+import psycopg2
+import pytest
+
+from db.aggregates import AGGREGATES, _contribution_sql
+from db.migrations import (
+    MIGRATIONS, LATEST_VERSION, LAUNCH_FK_TABLES, _aggregate_tables, _launch_child_integrity, _partition_by_date,
+    _undated_launches_table, current_version, migrate,
+)
+
+
+class RecordingCursor:
+    # count - ответ на SELECT count(*) (строки без даты, сироты)
+    def __init__(self, count=0):
+        self.statements = []
+        self.count = count
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchone(self):
+        return (self.count,)
+
+    def fetchall(self):
+        return []
+
+
+def normalized(sql):
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def test_migration_versions_are_sequential():
+    assert [number for number, _, _ in MIGRATIONS] == list(range(1, len(MIGRATIONS) + 1))
+
+
+def test_aggregate_triggers_match_rebuild_query():
+    # Пересборка (AGGREGATES) и захват дельт (замороженный SQL миграции) должны считать вклад одинаково,
+    # иначе сводные таблицы разойдутся с raw-данными после первого инкрементального обновления
+    cur = RecordingCursor()
+    _aggregate_tables(cur)
+    ddl = normalized(" ".join(cur.statements))
+    for name in AGGREGATES:
+        assert normalized(_contribution_sql(name, "new_rows")) in ddl
+        assert normalized(_contribution_sql(name, "old_rows", "-")) in ddl
+
+
+def test_launch_child_integrity_covers_former_foreign_keys():
+    # Каждая таблица, потерявшая FK на запуски при секционировании, получает и каскад, и проверку launch_id
+    cur = RecordingCursor()
+    _launch_child_integrity(cur)
+    ddl = normalized(" ".join(cur.statements))
+    cascade_args = re.search(r"EXECUTE FUNCTION spacex_data.launch_children_cascade\((.+?)\);", ddl).group(1)
+    assert [arg.strip(" '") for arg in cascade_args.split(",")] == list(LAUNCH_FK_TABLES)
+    for table in LAUNCH_FK_TABLES:
+        assert f"CREATE TRIGGER {table}_launch_check_insert AFTER INSERT ON spacex_data.{table}" in ddl
+        assert f"CREATE TRIGGER {table}_launch_check_update AFTER UPDATE ON spacex_data.{table}" in ddl
+
+
+def test_partition_by_date_routes_undated_rows(caplog):
+    cur = RecordingCursor(count=3)
+    with caplog.at_level(logging.WARNING, logger="db.migrations"):
+        _partition_by_date(cur, "spacex_data", "raw_spacex_launches_data")
+    ddl = normalized(" ".join(cur.statements))
+
+    assert ("CREATE TABLE spacex_data.raw_spacex_launches_data_null_date AS SELECT * FROM "
+            "spacex_data.raw_spacex_launches_data_unpartitioned WHERE date_utc IS NULL") in ddl
+    assert ("INSERT INTO spacex_data.raw_spacex_launches_data SELECT * FROM "
+            "spacex_data.raw_spacex_launches_data_unpartitioned WHERE date_utc IS NOT NULL") in ddl
+    assert "3 строк без date_utc" in caplog.text
+
+
+def test_partition_by_date_without_undated_rows_creates_no_side_table():
+    cur = RecordingCursor(count=0)
+    _partition_by_date(cur, "spacex_data", "fct_launches")
+    assert "_null_date" not in " ".join(cur.statements)
+
+
+def test_child_triggers_read_transition_tables():
+    cur = RecordingCursor()
+    _launch_child_integrity(cur)
+    _undated_launches_table(cur)
+    ddl = normalized(" ".join(cur.statements))
+    assert ddl.count("REFERENCING OLD TABLE AS old_rows") == 2
+    assert ddl.count("REFERENCING NEW TABLE AS new_rows") == 2 * len(LAUNCH_FK_TABLES)
+    assert "FROM new_rows n" in ddl and "SELECT DISTINCT id FROM old_rows" in ddl
+
+
+def _count(cur, query):
+    cur.execute(query)
+    return cur.fetchone()[0]
+
+
+def test_migrations_on_database(test_db, caplog):
+    conn = test_db
+    assert migrate(conn, target=2) == 2
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO spacex_data.raw_spacex_launches_data (id, date_utc)
+            VALUES ('dated', '2020-01-01'), ('undated', NULL);
+            INSERT INTO spacex_data.raw_spacex_cores_data (launch_id, core) VALUES ('dated', 'c1'), ('undated', 'c2');
+        """)
+    conn.commit()
+
+    with caplog.at_level(logging.WARNING, logger="db.migrations"):
+        assert migrate(conn) == LATEST_VERSION
+    assert "1 строк без date_utc" in caplog.text
+
+    with conn.cursor() as cur:
+        assert _count(cur, "SELECT count(*) FROM spacex_data.raw_spacex_launches_data_null_date "
+                           "WHERE id = 'undated'") == 1
+        assert _count(cur, "SELECT count(*) FROM spacex_data.raw_spacex_launches_data") == 1
+        # Строки запуска без даты не теряются и не считаются сиротами
+        assert _count(cur, "SELECT count(*) FROM spacex_data.raw_spacex_cores_data") == 2
+
+        with pytest.raises(psycopg2.errors.ForeignKeyViolation):
+            cur.execute("INSERT INTO spacex_data.raw_spacex_cores_data (launch_id) VALUES ('missing');")
+        conn.rollback()
+
+        cur.execute("DELETE FROM spacex_data.raw_spacex_launches_data WHERE id = 'dated';")
+        cur.execute("DELETE FROM spacex_data.raw_spacex_launches_data_null_date WHERE id = 'undated';")
+        assert _count(cur, "SELECT count(*) FROM spacex_data.raw_spacex_cores_data") == 0
+        conn.rollback()
+
+        # Миграция 7 повторяема: заново созданные функции и триггеры не меняют данных и версии
+        _aggregate_tables(cur)
+        conn.commit()
+    assert migrate(conn) == LATEST_VERSION == current_version(conn)
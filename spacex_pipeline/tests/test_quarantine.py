@@ -0,0 +1,117 @@
+import psycopg2
+import pytest
+
+from db.quarantine import write_isolated
+
+
+class SavepointCursor:
+    # Транзакция - список записанных id; savepoint запоминает его длину, откат к нему отбрасывает хвост
+    def __init__(self, conn):
+        self.connection = conn
+        self._row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        conn = self.connection
+        if sql.startswith("SAVEPOINT"):
+            conn.savepoints.append(len(conn.pending))
+        elif sql.startswith("ROLLBACK TO SAVEPOINT"):
+            del conn.pending[conn.savepoints.pop():]
+        elif sql.startswith("RELEASE SAVEPOINT"):
+            conn.savepoints.pop()
+        elif "INSERT INTO spacex_data.load_quarantine" in sql:
+            conn.quarantine.append(params)
+        elif "SELECT error FROM spacex_data.load_quarantine" in sql:
+            self._row = (conn.quarantine[-1][3],) if conn.quarantine else None
+
+    def fetchone(self):
+        return self._row
+
+
+class SavepointConnection:
+    closed = False
+
+    def __init__(self):
+        self.pending, self.savepoints, self.quarantine = [], [], []
+        self.committed = None
+        self.rolled_back = False
+
+    def cursor(self):
+        return SavepointCursor(self)
+
+    def commit(self):
+        self.committed = list(self.pending)
+
+    def rollback(self):
+        self.pending, self.savepoints = [], []
+        self.rolled_back = True
+
+
+def failing_writer(bad_ids, error=psycopg2.DataError):
+    calls = []
+
+    def write(cur, entity, records):
+        calls.append(len(records))
+        cur.connection.pending.extend(r["id"] for r in records)
+        bad = [r["id"] for r in records if r["id"] in bad_ids]
+        if bad:
+            raise error(f"invalid input syntax for type integer: {bad[0]}")
+    write.calls = calls
+    return write
+
+
+def documents(n):
+    return [{"id": f"r{i}"} for i in range(n)]
+
+
+def test_bisection_quarantines_exactly_the_bad_records():
+    conn = SavepointConnection()
+    records = documents(20)
+    write = failing_writer({"r3", "r11"})
+
+    stats = write_isolated(conn, "launches", records, write, batch_size=8)
+
+    assert stats["quarantined"] == ["r3", "r11"]
+    assert stats["written"] == 18
+    assert conn.committed == [r["id"] for r in records if r["id"] not in ("r3", "r11")]
+    assert [params[1] for params in conn.quarantine] == ["r3", "r11"]
+    assert conn.savepoints == []
+    # Пакеты 8 -> 4 -> 2 -> 1 для каждой плохой записи, а не построчный перезапуск
+    assert stats["bisections"] == 8
+    assert len(write.calls) < len(records)
+
+
+def test_ratio_guard_rolls_back_everything():
+    conn = SavepointConnection()
+    records = documents(10)
+    write = failing_writer({f"r{i}" for i in range(6)})
+
+    with pytest.raises(RuntimeError, match="6 из 10"):
+        write_isolated(conn, "payloads", records, write, batch_size=4, max_ratio=0.5)
+
+    assert conn.rolled_back
+    assert conn.committed is None
+
+
+def test_ratio_guard_allows_quarantine_at_the_limit():
+    conn = SavepointConnection()
+    stats = write_isolated(conn, "payloads", documents(10), failing_writer({"r0", "r5"}), max_ratio=0.2)
+    assert stats["quarantined"] == ["r0", "r5"]
+    assert len(conn.committed) == 8
+
+
+def test_fatal_errors_are_reraised_without_bisection():
+    conn = SavepointConnection()
+    write = failing_writer({"r2"}, error=psycopg2.OperationalError)
+
+    with pytest.raises(psycopg2.OperationalError):
+        write_isolated(conn, "rockets", documents(8), write, batch_size=8)
+
+    assert write.calls == [8]
+    assert conn.quarantine == []
+    assert conn.rolled_back and conn.committed is None
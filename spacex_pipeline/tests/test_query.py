@@ -0,0 +1,83 @@
+import pytest
+import requests
+
+from api.query import post_query, iter_pages, stream_collection
+from benchmarks.stub_server import StubSpaceXServer
+from tests.fakes import FakeResponse, FakeSession
+
+URL = "http://api.test/v4/launches/query"
+
+
+def page(docs, number, has_next):
+    return FakeResponse(200, {"docs": docs, "page": number, "totalPages": number + has_next,
+                              "hasNextPage": has_next, "nextPage": number + 1 if has_next else None})
+
+
+def test_post_query_retries_transient_status(sleeps):
+    session = FakeSession(FakeResponse(502), FakeResponse(200, {"docs": []}))
+    assert post_query(session, URL, {}, retries=2) == {"docs": []}
+    assert len(session.calls) == 2
+    assert len(sleeps) == 1
+
+
+@pytest.mark.parametrize("error", [
+    requests.ConnectionError("сброс соединения"),
+    requests.exceptions.ChunkedEncodingError("обрыв chunked-ответа"),
+    requests.Timeout("read timeout"),
+])
+def test_post_query_retries_network_errors(sleeps, error):
+    session = FakeSession(error, FakeResponse(200, {"docs": [{"id": "a"}]}))
+    assert post_query(session, URL, {}, timeout=1.5, retries=1) == {"docs": [{"id": "a"}]}
+    assert all(kwargs["timeout"] == 1.5 for _, _, kwargs in session.calls)
+
+
+def test_post_query_gives_up_after_last_attempt(sleeps):
+    session = FakeSession(*(FakeResponse(503) for _ in range(3)))
+    with pytest.raises(requests.RequestException, match="Исчерпаны попытки"):
+        post_query(session, URL, {}, retries=2)
+    assert len(session.calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_post_query_does_not_retry_client_error(sleeps):
+    session = FakeSession(FakeResponse(400))
+    with pytest.raises(requests.HTTPError):
+        post_query(session, URL, {}, retries=3)
+    assert len(session.calls) == 1
+    assert sleeps == []
+
+
+def test_iter_pages_stops_on_empty_last_page(sleeps):
+    # API сообщает hasNextPage, но следующая страница пуста: чтение заканчивается, пустая страница не отдаётся
+    session = FakeSession(page([{"id": "a"}, {"id": "b"}], 1, True), page([], 2, True))
+    pages = list(iter_pages("launches", ("id", "name"), page_size=2, base_url="http://api.test/v4", session=session))
+    assert pages == [[{"id": "a"}, {"id": "b"}]]
+    assert [kwargs["json"]["options"]["page"] for _, _, kwargs in session.calls] == [1, 2]
+
+
+def test_iter_pages_select_excludes_virtual_id(sleeps):
+    session = FakeSession(page([], 1, False))
+    assert list(iter_pages("launches", ("id", "name", "date_utc"), base_url="http://api.test/v4",
+                           session=session)) == []
+    _, url, kwargs = session.calls[0]
+    assert url == URL
+    assert kwargs["json"]["options"]["select"] == "name date_utc"
+    assert kwargs["json"]["options"]["sort"] == {"_id": "asc"}
+
+
+def test_stream_collection_against_stub_server():
+    docs = [{"id": f"{i:03d}", "name": f"launch {i}", "details": "x"} for i in range(7, 0, -1)]
+    with StubSpaceXServer({"launches": docs}) as server:
+        pages = list(stream_collection("launches", ("id", "name"), page_size=3, base_url=server.base_url))
+    assert [len(p) for p in pages] == [3, 3, 1]
+    records = [doc for p in pages for doc in p]
+    assert [doc["id"] for doc in records] == sorted(doc["id"] for doc in docs)
+    assert all(set(doc) == {"id", "name"} for doc in records)
+
+
+def test_stream_collection_reraises_fetch_error(sleeps):
+    session = FakeSession(page([{"id": "a"}], 1, True), FakeResponse(404))
+    pages = stream_collection("launches", ("id",), base_url="http://api.test/v4", session=session)
+    assert next(pages) == [{"id": "a"}]
+    with pytest.raises(requests.HTTPError):
+        next(pages)
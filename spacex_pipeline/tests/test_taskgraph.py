@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+from taskgraph import TaskGraph, checkpoint_path, load_checkpoint
+
+FAST = {"retry_delay": 0.01, "timeout": 5}
+
+
+def flaky(failures, result):
+    # Падает первые failures вызовов, затем возвращает result
+    calls = []
+
+    def fn(inputs):
+        calls.append(inputs)
+        if len(calls) <= failures:
+            raise ConnectionError(f"сбой {len(calls)}")
+        return result
+    fn.calls = calls
+    return fn
+
+
+def checkpoint(tmp_path, graph, run_id):
+    return load_checkpoint(checkpoint_path(graph.name, run_id, str(tmp_path)))["tasks"]
+
+
+def test_task_is_retried_until_success(tmp_path):
+    graph = TaskGraph("g")
+    fetch = flaky(2, {"rows": 3})
+    graph.add("fetch", fetch, retries=2, **FAST)
+    graph.add("load", lambda inputs: inputs["fetch"]["rows"] * 2, upstream=("fetch",), **FAST)
+
+    results = graph.run("r1", str(tmp_path), max_workers=2)
+
+    assert results == {"fetch": {"rows": 3}, "load": 6}
+    assert len(fetch.calls) == 3
+    state = checkpoint(tmp_path, graph, "r1")
+    assert state["fetch"]["status"] == "success" and state["fetch"]["attempts"] == 3
+
+
+def test_exhausted_retries_mark_downstream_upstream_failed(tmp_path):
+    graph = TaskGraph("g")
+    fetch = flaky(10, None)
+    load = flaky(0, "loaded")
+    graph.add("fetch", fetch, retries=1, **FAST)
+    graph.add("load", load, upstream=("fetch",), **FAST)
+    graph.add("build", flaky(0, "built"), upstream=("load",), **FAST)
+    graph.add("other", flaky(0, "ok"), **FAST)
+
+    with pytest.raises(RuntimeError, match="--run-id r2"):
+        graph.run("r2", str(tmp_path))
+
+    state = checkpoint(tmp_path, graph, "r2")
+    assert len(fetch.calls) == 2
+    assert state["fetch"]["status"] == "failed" and state["fetch"]["attempts"] == 2
+    assert state["load"]["status"] == "upstream_failed"
+    assert state["build"]["status"] == "upstream_failed"
+    assert state["other"]["status"] == "success"
+    assert load.calls == []
+
+
+def test_timed_out_task_is_not_retried(tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def hang(inputs):
+        calls.append(inputs)
+        release.wait(5)
+
+    graph = TaskGraph("g")
+    graph.add("slow", hang, retries=3, retry_delay=0.01, timeout=0.1)
+    try:
+        with pytest.raises(RuntimeError, match="slow"):
+            graph.run("r3", str(tmp_path))
+    finally:
+        release.set()
+
+    assert len(calls) == 1
+    assert checkpoint(tmp_path, graph, "r3")["slow"]["status"] == "timeout"
+
+
+def test_rerun_with_same_run_id_resumes_from_checkpoint(tmp_path):
+    fetch = flaky(0, {"rows": 5})
+    load = flaky(1, "loaded")
+
+    def build():
+        graph = TaskGraph("g")
+        graph.add("fetch", fetch, **FAST)
+        graph.add("load", load, upstream=("fetch",), retries=0, **FAST)
+        return graph
+
+    with pytest.raises(RuntimeError):
+        build().run("r4", str(tmp_path))
+    results = build().run("r4", str(tmp_path))
+
+    # fetch не перезапускается: её результат берётся из контрольной точки и передаётся в load
+    assert len(fetch.calls) == 1
+    assert load.calls == [{"fetch": {"rows": 5}}, {"fetch": {"rows": 5}}]
+    assert results == {"fetch": {"rows": 5}, "load": "loaded"}
+    assert checkpoint(tmp_path, build(), "r4")["load"]["status"] == "success"
+
+
+def test_add_rejects_unknown_upstream():
+    graph = TaskGraph("g")
+    with pytest.raises(ValueError):
+        graph.add("load", flaky(0, None), upstream=("fetch",))
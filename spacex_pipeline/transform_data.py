@@ -2,11 +2,59 @@ import psycopg2
 import logging
 import pandas as pd
 import json
+import os
 from db.connection import get_connection
+from metrics import instrument
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
 
+TRANSFORM_ENGINES = ("pandas", "sql", "chunked")
+CHUNK_SIZE = int(os.getenv("SPACEX_TRANSFORM_CHUNK_SIZE", "50000"))
+
+# Компактные типы для движка "chunked": категории вместо object-строк, nullable bool/int, datetime64 вместо объектов
+FCT_DTYPES = {"flight_number": "Int32", "date_utc": "datetime64[ns]", "success": "boolean"}
+DIM_ROCKETS_DTYPES = {"cost_per_launch": "Int64", "first_flight": "datetime64[ns]"}
+DIM_PAYLOADS_DTYPES = {"type": "category", "orbit": "category"}
+
+# Движок "sql": те же проекции и соединение, но выполняются внутри Postgres как INSERT ... SELECT.
+# target -> (исходная таблица для проверки на пустоту, колонки, SELECT)
+SQL_TRANSFORMS = {
+    "fct_launches": (
+        "raw_spacex_launches_data",
+        ("id", "flight_number", "name", "date_utc", "success", "webcast", "wikipedia"),
+        """
+            SELECT l.id, l.flight_number, l.name, l.date_utc, l.success, k.webcast, k.wikipedia
+            FROM spacex_data.raw_spacex_launches_data l
+            JOIN spacex_data.raw_spacex_links_data k ON k.launch_id = l.id
+        """,
+    ),
+    "dim_rockets": (
+        "raw_spacex_rockets_data",
+        ("id", "cost_per_launch", "first_flight", "height", "diameter", "mass", "payload_weights"),
+        """
+            SELECT id, cost_per_launch, first_flight, height, diameter, mass, payload_weights
+            FROM spacex_data.raw_spacex_rockets_data
+        """,
+    ),
+    "dim_payloads": (
+        "raw_spacex_payloads_data",
+        ("id", "name", "type", "mass_kg", "orbit"),
+        """
+            SELECT id, name, type, mass_kg, orbit
+            FROM spacex_data.raw_spacex_payloads_data
+        """,
+    ),
+}
+
+# Исходные raw-таблицы каждой аналитической таблицы: по их отпечаткам решается, нужен ли пересчёт
+TARGET_SOURCES = {
+    "fct_launches": ("raw_spacex_launches_data", "raw_spacex_links_data"),
+    "dim_rockets": ("raw_spacex_rockets_data",),
+    "dim_payloads": ("raw_spacex_payloads_data",),
+}
+
+@instrument("transformed_fact_data")
 def transformed_fact_data(conn):
     try:
         logger.info("Считывание данных для таблицы фактов...")
@@ -35,6 +83,7 @@ def transformed_fact_data(conn):
         logger.error(f"Ошибка при обработке данных для таблицы фактов: {e}")
         return None
         
+@instrument("transformed_dimension_data")
 def transformed_dimension_data(conn):
     try:
         logger.info("Считывание данных для таблиц измерений...")
@@ -54,4 +103,72 @@ def transformed_dimension_data(conn):
             
     except Exception as e:
         logger.error(f"Ошибка при считывании данных для таблиц измерений: {e}")
-        return None, None
\ No newline at end of file
+        return None, None
+
+
+def compact_frame(df, dtypes):
+    return df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+
+
+def iter_query_chunks(conn, name, query, chunk_size=CHUNK_SIZE, dtypes=None):
+    # Именованный (серверный) курсор: в памяти клиента одновременно не больше chunk_size строк
+    with conn.cursor(name=name) as cur:
+        cur.itersize = chunk_size
+        cur.execute(query)
+        columns = None
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if columns is None and cur.description is not None:
+                columns = [d.name for d in cur.description]
+            if not rows:
+                break
+            df = pd.DataFrame.from_records(rows, columns=columns)
+            yield compact_frame(df, dtypes) if dtypes else df
+
+
+def transformed_fact_chunks(conn, chunk_size=CHUNK_SIZE):
+    # Оба потока отсортированы по id в побайтовой collation "C", что совпадает с порядком сравнения строк
+    # в Python; поэтому links подчитываются ровно до последнего id текущего чанка launches (merge join).
+    launches = iter_query_chunks(conn, "fct_launches_src", """
+        SELECT id, flight_number, name, date_utc, success
+        FROM spacex_data.raw_spacex_launches_data
+        ORDER BY id COLLATE "C"
+    """, chunk_size)
+    links = iter_query_chunks(conn, "fct_links_src", """
+        SELECT launch_id, webcast, wikipedia
+        FROM spacex_data.raw_spacex_links_data
+        WHERE launch_id IS NOT NULL
+        ORDER BY launch_id COLLATE "C"
+    """, chunk_size)
+
+    pending = pd.DataFrame(columns=["launch_id", "webcast", "wikipedia"])
+    links_done = False
+    for launches_df in launches:
+        last_id = launches_df["id"].iloc[-1]
+        while not links_done and (pending.empty or pending["launch_id"].iloc[-1] <= last_id):
+            next_links = next(links, None)
+            if next_links is None:
+                links_done = True
+            else:
+                pending = next_links if pending.empty else pd.concat([pending, next_links], ignore_index=True)
+
+        in_chunk = pending["launch_id"] <= last_id
+        links_df, pending = pending[in_chunk], pending[~in_chunk]
+        fct_df = pd.merge(launches_df, links_df, left_on="id", right_on="launch_id", how="inner")
+        fct_df.drop(columns=["launch_id"], inplace=True)
+        if not fct_df.empty:
+            yield compact_frame(fct_df, FCT_DTYPES)
+
+
+def transformed_dimension_chunks(conn, chunk_size=CHUNK_SIZE):
+    # JSONB читается как текст: без разбора в dict на клиенте и без обратного json.dumps при вставке
+    rockets = iter_query_chunks(conn, "dim_rockets_src", """
+        SELECT id, cost_per_launch, first_flight,
+               height::text AS height, diameter::text AS diameter, mass::text AS mass,
+               payload_weights::text AS payload_weights
+        FROM spacex_data.raw_spacex_rockets_data
+    """, chunk_size, DIM_ROCKETS_DTYPES)
+    payloads = iter_query_chunks(conn, "dim_payloads_src", """
+        SELECT id, name, type, mass_kg, orbit FROM spacex_data.raw_spacex_payloads_data
+    """, chunk_size, DIM_PAYLOADS_DTYPES)
+    return rockets, payloads